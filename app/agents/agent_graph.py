@@ -1,20 +1,51 @@
 import os
 import json
+import time
+import uuid
+import hashlib
+import inspect
+import threading
 
 from dotenv import load_dotenv
+
+if __name__ == "__main__":
+    # Load .env before the agent modules below read their configuration
+    load_dotenv()
+
 from typing import Callable
-from langchain_openai import ChatOpenAI
+from contextlib import contextmanager
 from langgraph.graph import StateGraph, END
 from agents.state_types import State
-from agents.command_parser import parse_command_node
+from agents.command_parser import parse_command_node, async_parse_command_node, parser_stats
+from services.memory import DEFAULT_USER
+from services.metrics import NodeMetrics, current_node, metrics_callback, registry
+from services.llm_scheduler import llm_scheduler, PRIORITY_INTERACTIVE, PRIORITY_SUMMARY, PRIORITY_BULK
 from agents.tools import (
     tool_store_interest_node, 
     fetch_news_node,
+    dedup_news_node,
     build_tools_filter_news_node,
     tool_list_interests_node, 
     tool_remove_interest_node,
     scrape_content_node,
+    prepare_content_node,
     build_summarize_node,
+    serve_digest_node,
+    route_digest,
+    skip_seen_news_node,
+    request_deadline,
+    store_digest_node,
+)
+from agents.pipeline import PIPELINE_ENABLED, build_pipeline_node, build_async_pipeline_node
+from services.verdict_cache import verdict_cache
+from services.summary_cache import summary_cache
+from services.scraper import scraper
+from services.checkpoint_store import CHECKPOINT_DURABILITY, checkpoint_saver, thread_config
+from agents.async_tools import (
+    afetch_news_node,
+    build_async_tools_filter_news_node,
+    ascrape_content_node,
+    build_async_summarize_node,
 )
 
 def add_visited_node(state: State, node_name: str) -> State:
@@ -23,10 +54,41 @@ def add_visited_node(state: State, node_name: str) -> State:
     state["visited_nodes"].append(node_name)
     return state
 
+def record_node_metrics(state: State, metrics: NodeMetrics) -> State:
+    """Store one node's measurements in the state and the process-wide registry."""
+    metrics.finish()
+    registry.observe(metrics)
+    if "node_metrics" not in state or state["node_metrics"] is None:
+        state["node_metrics"] = []
+    state["node_metrics"].append(metrics.as_dict())
+    return state
+
 def make_node(fn: Callable[[State], State], node_name: str) -> Callable[[State], State]:
+    """
+    Wrap a node to track the visited path and time it. LLM callbacks and HTTP
+    helpers attribute their calls to the node through the current_node context.
+    """
+    if inspect.iscoroutinefunction(fn):
+        async def awrapped(state: State) -> State:
+            add_visited_node(state, node_name)
+            metrics = NodeMetrics(node_name)
+            token = current_node.set(metrics)
+            try:
+                state = await fn(state)
+            finally:
+                current_node.reset(token)
+            return record_node_metrics(state, metrics)
+        return awrapped
+
     def wrapped(state: State) -> State:
         add_visited_node(state, node_name)
-        return fn(state)
+        metrics = NodeMetrics(node_name)
+        token = current_node.set(metrics)
+        try:
+            state = fn(state)
+        finally:
+            current_node.reset(token)
+        return record_node_metrics(state, metrics)
     return wrapped
 
 def unknown_command_node(state: State) -> State:
@@ -38,26 +100,24 @@ API_KEY = os.environ.get("API_KEY")
 SERVER_URL = os.environ.get("SERVER_URL")
 MODEL_ID = os.environ.get("MODEL_ID")
 
-llm = ChatOpenAI(
-    model=MODEL_ID,
-    openai_api_key=API_KEY,
-    openai_api_base=SERVER_URL,
-    max_tokens=2048,
-    temperature=0.7,
-    top_p=0.9,
-    streaming=True,  # Habilitar streaming
-)
-
-graph = StateGraph(State)
-graph.add_node("parse_command", make_node(parse_command_node(llm), "parse_command"))
-graph.add_node("list_interests", make_node(tool_list_interests_node, "list_interests"))
-graph.add_node("remove_interest", make_node(tool_remove_interest_node, "remove_interest"))
-graph.add_node("store_interest", make_node(tool_store_interest_node, "store_interest"))
-graph.add_node("fetch_news", make_node(fetch_news_node, "fetch_news"))
-graph.add_node("filter_news", make_node(build_tools_filter_news_node(llm), "filter_news"))
-graph.add_node("scrape_content", make_node(scrape_content_node, "scrape_content"))
-graph.add_node("summarize", make_node(build_summarize_node(llm), "summarize"))
-graph.add_node("unknown_command", make_node(unknown_command_node, "unknown_command"))
+def build_llm():
+    """
+    Chat client for the vLLM server. langchain_openai is imported here
+    because it is one of the slowest imports of the app.
+    """
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(
+        model=MODEL_ID,
+        openai_api_key=API_KEY,
+        openai_api_base=SERVER_URL,
+        max_tokens=2048,
+        temperature=0.7,
+        top_p=0.9,
+        streaming=True,  # Habilitar streaming
+        stream_usage=True,  # Token usage for streamed calls, read by the metrics callback
+        callbacks=[metrics_callback],
+        max_retries=0,  # Retries are handled by the LLM scheduler
+    )
 
 def route_action(state: State) -> str:
     action = state.get("action")
@@ -72,154 +132,595 @@ def route_action(state: State) -> str:
     else:
         return "unknown_command"
 
-graph.add_conditional_edges(
-    "parse_command",
-    route_action,
-    {
-        "store_interest": "store_interest",
-        "fetch_news": "fetch_news",
-        "list_interests": "list_interests",
-        "remove_interest": "remove_interest",
-        "unknown_command": "unknown_command",
-    },
-)
-graph.add_edge("store_interest", END)
-graph.add_edge("fetch_news", "filter_news")
-graph.add_edge("filter_news", "scrape_content")
-graph.add_edge("scrape_content", "summarize")
-graph.add_edge("summarize", END)
-graph.add_edge("list_interests", END)
-graph.add_edge("remove_interest", END)
-graph.add_edge("unknown_command", END)
+def build_graph(llm, async_nodes: bool = False, scheduler=llm_scheduler, pipelined: bool = PIPELINE_ENABLED,
+                checkpointer=None):
+    """
+    Build and compile the agent graph.
+    With a checkpointer, the state is saved after every node, and runs must
+    be given a thread (see prepare_run) so they can be resumed.
+    With async_nodes the LLM and network nodes are their async variants, and
+    the compiled graph must be driven with astream/ainvoke.
+    With pipelined, filtering, scraping, preparation and summarization run
+    as one pipeline node where each article moves on independently.
+    LLM calls go through the scheduler (unless it is None), with command
+    parsing ahead of summarization, and summarization ahead of bulk filtering.
+    """
+    if scheduler is not None:
+        parse_llm = scheduler.bind(llm, PRIORITY_INTERACTIVE)
+        filter_llm = scheduler.bind(llm, PRIORITY_BULK)
+        summary_llm = scheduler.bind(llm, PRIORITY_SUMMARY)
+    else:
+        parse_llm = filter_llm = summary_llm = llm
+
+    if async_nodes:
+        parse_node = async_parse_command_node(parse_llm)
+        fetch_node = afetch_news_node
+        filter_node = build_async_tools_filter_news_node(filter_llm)
+        scrape_node = ascrape_content_node
+        summarize_node = build_async_summarize_node(summary_llm)
+        pipeline_node = build_async_pipeline_node(filter_llm, summary_llm)
+    else:
+        parse_node = parse_command_node(parse_llm)
+        fetch_node = fetch_news_node
+        filter_node = build_tools_filter_news_node(filter_llm)
+        scrape_node = scrape_content_node
+        summarize_node = build_summarize_node(summary_llm)
+        pipeline_node = build_pipeline_node(filter_llm, summary_llm)
+
+    graph = StateGraph(State)
+    graph.add_node("parse_command", make_node(parse_node, "parse_command"))
+    graph.add_node("list_interests", make_node(tool_list_interests_node, "list_interests"))
+    graph.add_node("remove_interest", make_node(tool_remove_interest_node, "remove_interest"))
+    graph.add_node("store_interest", make_node(tool_store_interest_node, "store_interest"))
+    graph.add_node("serve_digest", make_node(serve_digest_node, "serve_digest"))
+    graph.add_node("fetch_news", make_node(fetch_node, "fetch_news"))
+    graph.add_node("dedup_news", make_node(dedup_news_node, "dedup_news"))
+    graph.add_node("skip_seen_news", make_node(skip_seen_news_node, "skip_seen_news"))
+    if pipelined:
+        graph.add_node("pipeline", make_node(pipeline_node, "pipeline"))
+    else:
+        graph.add_node("filter_news", make_node(filter_node, "filter_news"))
+        graph.add_node("scrape_content", make_node(scrape_node, "scrape_content"))
+        graph.add_node("prepare_content", make_node(prepare_content_node, "prepare_content"))
+        graph.add_node("summarize", make_node(summarize_node, "summarize"))
+    graph.add_node("store_digest", make_node(store_digest_node, "store_digest"))
+    graph.add_node("unknown_command", make_node(unknown_command_node, "unknown_command"))
 
-graph.set_entry_point("parse_command")
+    graph.add_conditional_edges(
+        "parse_command",
+        route_action,
+        {
+            "store_interest": "store_interest",
+            "fetch_news": "serve_digest",
+            "list_interests": "list_interests",
+            "remove_interest": "remove_interest",
+            "unknown_command": "unknown_command",
+        },
+    )
+    graph.add_edge("store_interest", END)
+    graph.add_conditional_edges(
+        "serve_digest",
+        route_digest,
+        {
+            "served": END,
+            "fetch_news": "fetch_news",
+        },
+    )
+    graph.add_edge("fetch_news", "dedup_news")
+    graph.add_edge("dedup_news", "skip_seen_news")
+    if pipelined:
+        graph.add_edge("skip_seen_news", "pipeline")
+        graph.add_edge("pipeline", "store_digest")
+    else:
+        graph.add_edge("skip_seen_news", "filter_news")
+        graph.add_edge("filter_news", "scrape_content")
+        graph.add_edge("scrape_content", "prepare_content")
+        graph.add_edge("prepare_content", "summarize")
+        graph.add_edge("summarize", "store_digest")
+    graph.add_edge("store_digest", END)
+    graph.add_edge("list_interests", END)
+    graph.add_edge("remove_interest", END)
+    graph.add_edge("unknown_command", END)
+
+    graph.set_entry_point("parse_command")
 
-my_graph = graph.compile()
+    return graph.compile(checkpointer=checkpointer)
 
-def process_command_stream(message: str):
+class AppContext:
     """
-    Process a user command and stream events from the graph.
-    Returns tuples compatible with Gradio interface: (partial_response, visited_nodes, news_info, summaries_info)
+    Lazily built LLM client and compiled graphs, shared by the whole process.
+    Nothing is created at import time: each piece is built on first use, or
+    all at once by warm_up, so the UI starts quickly and a broken LLM
+    configuration shows up in the readiness status instead of an import error.
     """
-    inputs: State = {"user_input": message}
-    last_state = None
-    last_response = ""
-    filter_news_info = ""  # Separate variable to preserve filter info
-    current_summaries = []
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._llm = None
+        self._graph = None
+        self._async_graph = None
+        self.warmup_started = None
+        self.warmup_seconds = None
+        self.warmup_steps = {}
+        self.error = None
+
+    @property
+    def llm(self):
+        with self._lock:
+            if self._llm is None:
+                self._llm = build_llm()
+            return self._llm
+
+    @property
+    def graph(self):
+        with self._lock:
+            if self._graph is None:
+                self._graph = build_graph(self.llm, checkpointer=checkpoint_saver)
+            return self._graph
+
+    @property
+    def async_graph(self):
+        with self._lock:
+            if self._async_graph is None:
+                self._async_graph = build_graph(self.llm, async_nodes=True, checkpointer=checkpoint_saver)
+            return self._async_graph
+
+    @property
+    def ready(self) -> bool:
+        return self.warmup_seconds is not None and self.error is None
+
+    def warm_up(self) -> bool:
+        """Build everything a request needs ahead of time. Returns whether it succeeded."""
+        self.warmup_started = time.time()
+        started = time.perf_counter()
+        for step, fn in (
+            ("llm", lambda: self.llm),
+            ("graph", lambda: self.graph),
+            ("async_graph", lambda: self.async_graph),
+            ("scraper", scraper.warm_up),
+        ):
+            step_started = time.perf_counter()
+            try:
+                fn()
+            except Exception as e:
+                self.error = f"{step}: {e}"
+                print(f"[DEBUG] Warm-up failed at {step}: {e}")
+                break
+            self.warmup_steps[step] = round(time.perf_counter() - step_started, 3)
+        self.warmup_seconds = round(time.perf_counter() - started, 3)
+        return self.error is None
+
+    def status(self) -> dict:
+        """Readiness report: ready once warm_up has finished without errors."""
+        if self.warmup_started is None:
+            state = "cold"
+        elif self.warmup_seconds is None:
+            state = "warming_up"
+        else:
+            state = "failed" if self.error else "ready"
+        return {
+            "ready": self.ready,
+            "state": state,
+            "error": self.error,
+            "warmup_seconds": self.warmup_seconds,
+            "steps": dict(self.warmup_steps),
+        }
+
+    def stats(self) -> dict:
+        return {"ready": int(self.ready), "warmup_seconds": self.warmup_seconds}
+
+
+app_context = AppContext()
+
+registry.register_collector("command_parser", parser_stats)
+registry.register_collector("verdict_cache", verdict_cache.stats)
+registry.register_collector("summary_cache", summary_cache.stats)
+registry.register_collector("llm_scheduler", llm_scheduler.stats)
+registry.register_collector("startup", app_context.stats)
+if checkpoint_saver is not None:
+    registry.register_collector("checkpoints", checkpoint_saver.stats)
+
+_running_threads = set()
+_running_lock = threading.Lock()
+
+
+def request_thread_id(user_id: str, message: str, refresh: bool = False) -> str:
+    """Checkpoint thread of a request: retrying the same command resumes its unfinished run."""
+    command = " ".join(message.lower().split())
+    return f"{user_id}:{hashlib.sha1(f'{refresh}:{command}'.encode('utf-8')).hexdigest()[:16]}"
+
+
+@contextmanager
+def claim_thread(thread_id: str):
+    """Reserve a thread for one run; an identical request already running gets a private thread."""
+    with _running_lock:
+        if thread_id in _running_threads:
+            thread_id = f"{thread_id}:{uuid.uuid4().hex[:8]}"
+        _running_threads.add(thread_id)
+    try:
+        yield thread_id
+    finally:
+        with _running_lock:
+            _running_threads.discard(thread_id)
+
+
+def prepare_run(graph, inputs: State, thread_id: str):
+    """
+    (input, config) to run the graph with. If the thread has an unfinished
+    run (it failed, or the client went away), it is resumed after its last
+    completed node with the new request's deadline; otherwise the leftovers
+    of a finished run are dropped and the inputs start a new run.
+    """
+    if graph.checkpointer is None:
+        return inputs, None
+    config = thread_config(thread_id)
+    snapshot = graph.get_state(config)
+    if snapshot.next:
+        print(f"[DEBUG] Resuming run {thread_id} at {', '.join(snapshot.next)}")
+        graph.update_state(config, {"deadline": inputs.get("deadline")})
+        return None, config
+    if snapshot.values:
+        graph.checkpointer.delete_thread(thread_id)
+    return inputs, config
+
+
+async def aprepare_run(graph, inputs: State, thread_id: str):
+    """Async variant of prepare_run."""
+    if graph.checkpointer is None:
+        return inputs, None
+    config = thread_config(thread_id)
+    snapshot = await graph.aget_state(config)
+    if snapshot.next:
+        print(f"[DEBUG] Resuming run {thread_id} at {', '.join(snapshot.next)}")
+        await graph.aupdate_state(config, {"deadline": inputs.get("deadline")})
+        return None, config
+    if snapshot.values:
+        await graph.checkpointer.adelete_thread(thread_id)
+    return inputs, config
+
+
+def finish_run(graph, config):
+    """A completed run has nothing left to resume: free its checkpoints."""
+    if config is not None:
+        graph.checkpointer.delete_thread(config["configurable"]["thread_id"])
+
+
+async def afinish_run(graph, config):
+    """Async variant of finish_run."""
+    if config is not None:
+        await graph.checkpointer.adelete_thread(config["configurable"]["thread_id"])
+
+def format_freshness(timestamp: float) -> str:
+    """Absolute UTC time and age of a timestamp, e.g. '12:30 UTC, 5 min ago'."""
+    age = max(0, int(time.time() - timestamp))
+    if age < 60:
+        ago = "just now"
+    elif age < 3600:
+        ago = f"{age // 60} min ago"
+    elif age < 86400:
+        ago = f"{age // 3600} h ago"
+    else:
+        ago = f"{age // 86400} days ago"
+    return f"{time.strftime('%Y-%m-%d %H:%M UTC', time.gmtime(timestamp))}, {ago}"
+
+
+def filter_line(title: str, matched, relevance=None) -> str:
+    """One line of the news filter display."""
+    match_status = f"✅ MATCH ({', '.join(matched)})" if matched else "❌ NO MATCH"
+    if relevance is not None:
+        match_status += f" [relevance {relevance:.2f}]"
+    return f"{match_status}: {title}\n"
+
+
+def format_summary_header(n: dict) -> str:
+    """Markdown for an article's title and source line."""
+    title = n.get('title', 'No title')
+    source = n.get('source', 'Unknown source')
+    url = n.get('url', '')
+    added = f" · added {format_freshness(n['added'])}" if n.get("added") else ""
     
-    for event_type, value in my_graph.stream(inputs, stream_mode=["values", "custom"]):  
+    # Format: Title and source with link, then line break, then summary
+    summary_text = f"**{title}**\n"
+    if url:
+        summary_text += f"*{source}* - [Link to article]({url}){added}\n\n"
+    else:
+        summary_text += f"*{source}*{added}\n\n"
+    return summary_text
+
+
+def format_summary_footer(n: dict) -> str:
+    """Markdown listing the other outlets that reported the same story."""
+    alternates = n.get("alternates")
+    if not alternates:
+        return ""
+    links = ", ".join(f"[{a.get('source') or 'Link'}]({a['url']})" for a in alternates if a.get("url"))
+    return f"\n*Also reported by:* {links}\n"
+
+
+def format_summary(n: dict, default_summary: str) -> str:
+    """Format one article summary as Markdown."""
+    return format_summary_header(n) + f"{n.get('summary', default_summary)}\n" + format_summary_footer(n)
+
+
+def format_node_metrics(node_metrics) -> str:
+    """Markdown table with the timing breakdown of the visited nodes."""
+    if not node_metrics:
+        return ""
+    rows = [
+        "| Node | Wall (ms) | LLM calls | Tokens (in/out) | TTFT (ms) | HTTP (n / ms) |",
+        "|---|---:|---:|---:|---:|---:|",
+    ]
+    for m in node_metrics:
+        ttft = m["ttft_ms"] if m["ttft_ms"] is not None else "-"
+        rows.append(
+            f"| {m['node']} | {m['wall_ms']} | {m['llm_calls']} | {m['prompt_tokens']}/{m['completion_tokens']}"
+            f" | {ttft} | {m['http_requests']} / {m['http_ms']} |"
+        )
+    total = sum(m["wall_ms"] for m in node_metrics)
+    rows.append(f"| **Total** | **{round(total, 1)}** | | | | |")
+    return "\n".join(rows)
+
+
+class CommandStreamRenderer:
+    """
+    Turns graph stream events into tuples compatible with the Gradio interface:
+    (partial_response, visited_nodes, news_info, summaries_info, timing_info).
+    Shared by the sync and async command streams.
+    """
+
+    def __init__(self):
+        self.last_state = None
+        self.last_response = ""
+        self.filter_news_info = ""  # Separate variable to preserve filter info
+        self.current_summaries = []
+        # Streaming state: per-article text and cached Markdown, so a delta
+        # only re-renders the article it touches
+        self.streamed = {}  # idx -> {"article", "header", "footer", "text", "done"}
+        self.rendered = {}  # idx -> Markdown
+        self.verdicts = {}  # idx -> filter info line, for pipelined runs
+
+    def handle(self, event_type, value):
+        """Process one (event_type, value) stream event; returns a tuple to yield, or None."""
         if event_type == "values":
-            last_state = value  # Store the last state
-            visited_nodes = value.get("visited_nodes", [])
-            last_node = visited_nodes[-1] if visited_nodes else None
-            
-            # Update response based on current state
-            if "result" in value and value["result"]:
-                last_response = value["result"]
-            
-            # Handle specific node responses
-            if last_node == "filter_news":
-                # Extract filter info from current state's all_news_filtered
-                if "all_news_filtered" in value and value["all_news_filtered"]:
-                    all_news = value["all_news_filtered"]
-                    filter_info = []
-                    matched_count = 0
-                    for n in all_news:
-                        title = n.get('title', 'No title')
-                        match_status = "✅ MATCH" if n.get("matched_interests") else "❌ NO MATCH"
-                        if n.get("matched_interests"):
-                            matched_count += 1
-                        filter_info.append(f"{match_status}: {title}\n")
-                    
-                    filter_news_info = "\n".join(filter_info)
-                    last_response = f"Filtered {len(all_news)} news articles. {matched_count} matched your interests."
-                else:
-                    if not filter_news_info:  # Only set if not already set above
-                        filter_news_info = "No news articles were processed."
-                        last_response = "No news articles found to filter."
-                    
-            elif last_node == "summarize":
-                # Show all completed summaries
-                news = value.get("news", [])
-                if news:
-                    summaries = []
-                    for n in news:
-                        title = n.get('title', 'No title')
-                        source = n.get('source', 'Unknown source')
-                        url = n.get('url', '')
-                        summary = n.get('summary', 'No summary available')
-                        
-                        # Format: Title and source with link, then line break, then summary
-                        summary_text = f"**{title}**\n"
-                        if url:
-                            summary_text += f"*{source}* - [Link to article]({url})\n\n"
-                        else:
-                            summary_text += f"*{source}*\n\n"
-                        summary_text += f"{summary}\n"
-                        
-                        summaries.append(summary_text)
-                    current_summaries = summaries
-                    last_response = f"✅ Completed summaries for {len(news)} news articles"
-                    
-            elif last_node == "store_interest":
-                last_response = value.get("result", "Interest stored successfully")
-                
-            elif last_node == "list_interests":
-                last_response = value.get("result", "Listed interests")
+            return self._handle_values(value)
+        return self._handle_custom(value)
+
+    def _handle_values(self, value):
+        self.last_state = value  # Store the last state
+        visited_nodes = value.get("visited_nodes", [])
+        last_node = visited_nodes[-1] if visited_nodes else None
+        
+        # Update response based on current state
+        if "result" in value and value["result"]:
+            self.last_response = value["result"]
+        
+        # Handle specific node responses
+        if last_node == "dedup_news":
+            stats = value.get("dedup_stats")
+            if stats:
+                self.last_response = (
+                    f"Fetched {stats['articles']} news articles, "
+                    f"{stats['clusters']} distinct stories after merging near-duplicates."
+                )
+        
+        elif last_node == "skip_seen_news":
+            stats = value.get("digest_stats")
+            if stats and stats["skipped"]:
+                self.last_response = (
+                    f"{stats['new']} new stories since the last digest,"
+                    f" {stats['skipped']} already processed."
+                )
+
+        elif last_node == "filter_news":
+            # Extract filter info from current state's all_news_filtered
+            if "all_news_filtered" in value and value["all_news_filtered"]:
+                all_news = value["all_news_filtered"]
+                self.filter_news_info = "\n".join(
+                    filter_line(n.get('title', 'No title'), n.get("matched_interests"), n.get("relevance"))
+                    for n in all_news
+                )
+                matched_count = sum(1 for n in all_news if n.get("matched_interests"))
+                self.last_response = f"Filtered {len(all_news)} news articles. {matched_count} matched your interests."
+                stats = value.get("prefilter_stats")
+                if stats:
+                    self.last_response += (
+                        f" Pre-filter: {stats['rejected']} rejected, {stats['accepted']} accepted,"
+                        f" {stats['sent_to_llm']} sent to the LLM ({stats['llm_calls_saved']} LLM calls saved)."
+                    )
+                cache_stats = value.get("verdict_cache_stats")
+                if cache_stats:
+                    self.last_response += (
+                        f" Verdict cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses,"
+                        f" {cache_stats['entries']} entries."
+                    )
+            else:
+                if not self.filter_news_info:  # Only set if not already set above
+                    self.filter_news_info = "No news articles were processed."
+                    self.last_response = "No news articles found to filter."
                 
-            elif last_node == "remove_interest":
-                last_response = value.get("result", "Interest removed")
+        elif last_node == "scrape_content":
+            stats = value.get("scrape_stats")
+            if stats:
+                self.last_response = (
+                    f"Scraped {stats['ok']}/{stats['total']} articles ({stats['cached']} from cache)."
+                )
+                if stats.get("skipped"):
+                    self.last_response += f" {stats['skipped']} skipped at the deadline."
+                if stats["failed"]:
+                    failures = "; ".join(f"{url}: {error}" for url, error in list(stats["errors"].items())[:3])
+                    self.last_response += f" {stats['failed']} failed: {failures}"
+
+        elif last_node == "prepare_content":
+            stats = value.get("compression_stats")
+            if stats and stats["articles"]:
+                self.last_response = (
+                    f"Prepared {stats['articles']} articles for summarization: {stats['compressed']} compressed,"
+                    f" {stats['map_reduce']} split for map-reduce (~{stats['tokens_in']} → ~{stats['tokens_out']} tokens)."
+                )
+
+        elif last_node == "summarize":
+            if "pipeline" in visited_nodes and value.get("all_news_filtered"):
+                # The pipeline fills in every stage at once: show the final verdicts
+                self.filter_news_info = "\n".join(
+                    filter_line(n.get('title', 'No title'), n.get("matched_interests"), n.get("relevance"))
+                    for n in value["all_news_filtered"]
+                )
+            # Show all completed summaries
+            news = value.get("news", [])
+            if news:
+                self.current_summaries = [format_summary(n, 'No summary available') for n in news]
+                self.last_response = f"✅ Completed summaries for {len(news)} news articles"
                 
-            elif last_node == "unknown_command":
-                last_response = value.get("result", "Command not recognized. Please try another request.")
+        elif last_node == "serve_digest" and value.get("digest_served"):
+            news = value.get("news", [])
+            self.current_summaries = [format_summary(n, 'No summary available') for n in news]
+            self.last_response = (
+                f"📰 Your digest ({len(news)} articles), updated {format_freshness(value['digest_updated'])}."
+                " Say \"refresh news\" for a fresh run."
+            )
+
+        elif last_node == "store_digest" and value.get("digest_updated"):
+            news = value.get("news", [])
+            self.current_summaries = [format_summary(n, 'No summary available') for n in news]
+            added = value.get("digest_stats", {}).get("added", 0)
+            self.last_response = (
+                f"✅ Digest updated {format_freshness(value['digest_updated'])}:"
+                f" {added} new articles, {len(news)} in total."
+            )
+
+        elif last_node == "store_interest":
+            self.last_response = value.get("result", "Interest stored successfully")
             
-            yield (last_response, visited_nodes, filter_news_info, "")
+        elif last_node == "list_interests":
+            self.last_response = value.get("result", "Listed interests")
             
-        else:
-            # Handle partial summaries during streaming - token by token
-            partial_data = value.get("partial_summaries", (None, None, None))
-            if partial_data[1] and isinstance(partial_data[1], list):  # List of partial summaries
-                summaries = []
-                for i, n in enumerate(partial_data[1]):
-                    title = n.get('title', 'No title')
-                    source = n.get('source', 'Unknown source')
-                    url = n.get('url', '')
-                    summary = n.get('summary', 'Generating...')
-                    
-                    # Format: Title and source with link, then line break, then summary
-                    summary_text = f"**{title}**\n"
-                    if url:
-                        summary_text += f"*{source}* - [Link to article]({url})\n\n"
-                    else:
-                        summary_text += f"*{source}*\n\n"
-                    summary_text += f"{summary}\n"
-                    
-                    summaries.append(summary_text)
-                
-                current_summaries = summaries
-                article_idx = partial_data[0]
-                total_articles = partial_data[2] if len(partial_data) > 2 else len(partial_data[1])
-                # Send real-time token updates
-                yield (f"📝 Generating summaries... (Article {article_idx + 1}/{total_articles})", 
-                      last_state.get("visited_nodes", []) if last_state else [], 
-                      filter_news_info,
-                      "\n".join(current_summaries))  # Send current summaries with each token
+        elif last_node == "remove_interest":
+            self.last_response = value.get("result", "Interest removed")
+            
+        elif last_node == "unknown_command":
+            self.last_response = value.get("result", "Command not recognized. Please try another request.")
+        
+        return (self.last_response, visited_nodes, self.filter_news_info, "", self.timing())
 
-    # Final yield with complete state
-    if last_state:
-        final_response = last_state.get("result", last_response)
+    def _handle_custom(self, value):
+        verdict = value.get("filter_verdict")
+        if verdict:
+            # Pipelined runs report each verdict as soon as it is known
+            self.verdicts[verdict["idx"]] = filter_line(verdict["title"], verdict["matched"], verdict.get("relevance"))
+            self.filter_news_info = "\n".join(self.verdicts[i] for i in sorted(self.verdicts))
+            matched_count = sum(1 for line in self.verdicts.values() if line.startswith("✅"))
+            return (f"🔎 Classified {len(self.verdicts)} news articles, {matched_count} matched your interests...",
+                    self.last_state.get("visited_nodes", []) if self.last_state else [],
+                    self.filter_news_info,
+                    "\n".join(self.current_summaries),
+                    self.timing())
+        progress = value.get("scrape_progress")
+        if progress:
+            status = f" (failed: {progress['url']})" if progress["error"] else ""
+            return (f"🌐 Scraped {progress['done']}/{progress['total']} articles{status}",
+                    self.last_state.get("visited_nodes", []) if self.last_state else [],
+                    self.filter_news_info,
+                    "\n".join(self.current_summaries),
+                    self.timing())
+        # Apply a summary delta and re-render only the article it changed
+        delta = value.get("summary_delta")
+        if not delta:
+            return None
+        idx = delta["idx"]
+        entry = self.streamed.get(idx)
+        if entry is None:
+            article = delta.get("article") or {}
+            entry = self.streamed[idx] = {
+                "header": format_summary_header(article),
+                "footer": format_summary_footer(article),
+                "text": "",
+                "done": False,
+            }
+        if delta["op"] == "append":
+            entry["text"] += delta["text"]
+        elif delta["op"] == "done":
+            entry["text"] = delta["text"]
+            entry["done"] = True
+        suffix = "\n" if entry["done"] else "...\n"
+        self.rendered[idx] = entry["header"] + entry["text"] + suffix + entry["footer"]
+        self.current_summaries = [self.rendered[i] for i in sorted(self.rendered)]
+        # Send real-time token updates
+        return (f"📝 Generating summaries... (Article {idx + 1}/{delta['total']})", 
+                self.last_state.get("visited_nodes", []) if self.last_state else [], 
+                self.filter_news_info,
+                "\n".join(self.current_summaries),  # Send current summaries with each update
+                self.timing())
+
+    def final(self):
+        """Final tuple with the complete state, or None if the graph produced no state."""
+        if not self.last_state:
+            return None
+        final_response = self.last_state.get("result", self.last_response)
         # Use current_summaries for final display if available
-        final_summaries_display = "\n".join(current_summaries) if current_summaries else ""
-        yield (final_response, last_state.get("visited_nodes", []), filter_news_info, final_summaries_display)
+        final_summaries_display = "\n".join(self.current_summaries) if self.current_summaries else ""
+        return (final_response, self.last_state.get("visited_nodes", []), self.filter_news_info, final_summaries_display, self.timing())
+
+    def timing(self) -> str:
+        """Timing breakdown of the nodes completed so far."""
+        return format_node_metrics(self.last_state.get("node_metrics") if self.last_state else None)
+
+
+def process_command_stream(message: str, user_id: str = DEFAULT_USER, refresh: bool = False, thread_id: str = None):
+    """
+    Process a user command and stream events from the graph.
+    With refresh, news requests bypass the precomputed digest. News runs get
+    the DIGEST_DEADLINE deadline, if configured.
+    Runs are checkpointed on thread_id (by default derived from the user and
+    command), so a retry after a failure or disconnect resumes the run.
+    Returns tuples compatible with Gradio interface: (partial_response, visited_nodes, news_info, summaries_info, timing_info)
+    """
+    inputs: State = {"user_input": message, "user_id": user_id, "refresh": refresh, "deadline": request_deadline()}
+    renderer = CommandStreamRenderer()
+    graph = app_context.graph
+    with claim_thread(thread_id or request_thread_id(user_id, message, refresh)) as thread_id:
+        run_input, config = prepare_run(graph, inputs, thread_id)
+        durability = CHECKPOINT_DURABILITY if config else None
+        for event_type, value in graph.stream(run_input, config, stream_mode=["values", "custom"], durability=durability):
+            update = renderer.handle(event_type, value)
+            if update:
+                yield update
+        finish_run(graph, config)
+
+    # Final yield with complete state
+    final = renderer.final()
+    if final:
+        yield final
+
+
+async def aprocess_command_stream(message: str, user_id: str = DEFAULT_USER, refresh: bool = False,
+                                  thread_id: str = None):
+    """
+    Async variant of process_command_stream driving the async graph with astream,
+    so concurrent requests share the event loop instead of blocking a thread each.
+    """
+    inputs: State = {"user_input": message, "user_id": user_id, "refresh": refresh, "deadline": request_deadline()}
+    renderer = CommandStreamRenderer()
+    graph = app_context.async_graph
+    with claim_thread(thread_id or request_thread_id(user_id, message, refresh)) as thread_id:
+        run_input, config = await aprepare_run(graph, inputs, thread_id)
+        durability = CHECKPOINT_DURABILITY if config else None
+        async for event_type, value in graph.astream(run_input, config, stream_mode=["values", "custom"], durability=durability):
+            update = renderer.handle(event_type, value)
+            if update:
+                yield update
+        await afinish_run(graph, config)
+
+    final = renderer.final()
+    if final:
+        yield final
 
 def main():
     """
     Test function for debugging the agent graph.
     This function is kept for testing purposes but not used as main entry point.
     """
-    load_dotenv()
     print("🧪 Testing filter news display...")
-    for partial_response, visited_nodes, news_info, summaries_info in process_command_stream("Show me the news"):
+    for partial_response, visited_nodes, news_info, summaries_info, timing_info in process_command_stream("Show me the news"):
         print("=" * 50)
         print(f"Visited Nodes: {' → '.join(visited_nodes) if visited_nodes else 'None'}")
         print(f"Response: {partial_response}")
@@ -229,6 +730,8 @@ def main():
             print("News Filter Info: EMPTY")
         if summaries_info:
             print(f"Summaries Info:\n{summaries_info[:200]}{'...' if len(summaries_info) > 200 else ''}")
+        if timing_info:
+            print(f"Timing:\n{timing_info}")
         print("=" * 50)
 
 if __name__ == "__main__":
@@ -0,0 +1,197 @@
+import asyncio
+from typing import AsyncGenerator, Dict, List, Tuple
+from langgraph.config import get_stream_writer
+from agents.state_types import State
+from agents.tools import (
+    NEWS_FETCH_SIZE,
+    FILTER_BATCH_SIZE,
+    PREFILTER_ENABLED,
+    VERDICT_CACHE_ENABLED,
+    DIGEST_TOP_K,
+    SUMMARIZE_MAX_IN_FLIGHT,
+    SUMMARY_CACHE_ENABLED,
+    SUMMARY_PROMPT,
+    REDUCE_PROMPT,
+    SummaryProgress,
+    chunk_prompts,
+    interest_prompt,
+    parse_relevance,
+    batch_prompt,
+    parse_batch_verdicts,
+    plan_filter,
+    complete_filter,
+    plan_summaries,
+    scrape_progress,
+    scrape_results_to_state,
+    past_deadline,
+    SKIPPED_SUMMARIES,
+)
+from services.news import afetch_news
+from services.verdict_cache import verdict_cache
+from services.scraper import scraper
+from services.summary_cache import summary_cache
+from services.article_store import ArticleBody, article_store
+
+# Async variants of the news pipeline nodes. They share prompts, caches and
+# bookkeeping with agents.tools, but await the LLM and HTTP calls so one
+# event loop can serve many digests at once. The cache-backed helpers read
+# and commit SQLite, so they run in worker threads to keep the loop free.
+
+
+# ===============================================================================
+# NEWS FETCHING NODE
+# ===============================================================================
+
+async def afetch_news_node(state: State) -> State:
+    """Fetch news articles from the news service."""
+    state["news"] = await afetch_news(page_size=NEWS_FETCH_SIZE, language="en")
+    return state
+
+
+# ===============================================================================
+# NEWS FILTERING NODE
+# ===============================================================================
+
+async def aclassify_article(llm, article, interests) -> Tuple[Dict[str, float], str]:
+    """Async variant of classify_article."""
+    res = await llm.ainvoke(interest_prompt(article, interests))
+    return parse_relevance(res.content, interests), res.content
+
+
+async def aclassify_news_batch(llm, articles, interests) -> List[Tuple[Dict[str, float], str]]:
+    """Async variant of classify_news_batch."""
+    verdicts = None
+    try:
+        res = await llm.ainvoke(batch_prompt(articles, interests))
+        verdicts = parse_batch_verdicts(res.content, interests, len(articles))
+    except Exception as e:
+        print(f"[DEBUG] Error in aclassify_news_batch: {e}")
+    if verdicts is None:
+        verdicts = [None] * len(articles)
+    fallbacks = await asyncio.gather(*[
+        aclassify_article(llm, a, interests) for a, v in zip(articles, verdicts) if v is None
+    ])
+    fallbacks = iter(fallbacks)
+    return [(v, "Batch classification") if v is not None else next(fallbacks) for v in verdicts]
+
+
+async def aclassify_news(llm, articles, interests, batch_size) -> List[Tuple[Dict[str, float], str]]:
+    """Classify articles concurrently, in batches when batch_size > 1."""
+    if batch_size > 1:
+        batches = [articles[i:i + batch_size] for i in range(0, len(articles), batch_size)]
+        results = await asyncio.gather(*[aclassify_news_batch(llm, b, interests) for b in batches])
+        return [v for batch_verdicts in results for v in batch_verdicts]
+    return list(await asyncio.gather(*[aclassify_article(llm, n, interests) for n in articles]))
+
+
+def build_async_tools_filter_news_node(
+    llm,
+    batch_size: int = FILTER_BATCH_SIZE,
+    prefilter: bool = PREFILTER_ENABLED,
+    cache=verdict_cache if VERDICT_CACHE_ENABLED else None,
+    top_k: int = DIGEST_TOP_K,
+):
+    """Async variant of build_tools_filter_news_node."""
+    async def node(state: State) -> State:
+        plan = await asyncio.to_thread(plan_filter, state, prefilter, cache)
+        if plan is None:
+            return state
+        groups = list(plan["groups"].items())
+        group_results = await asyncio.gather(*[
+            aclassify_news(llm, [plan["news"][idx] for idx in idxs], list(missing), batch_size)
+            for missing, idxs in groups
+        ])
+        results = {missing: res for (missing, _), res in zip(groups, group_results)}
+        return await asyncio.to_thread(complete_filter, state, plan, results, batch_size, cache, top_k)
+
+    return node
+
+
+# ===============================================================================
+# CONTENT SCRAPING AND PROCESSING NODES
+# ===============================================================================
+
+async def ascrape_content_node(state: State) -> State:
+    """Async variant of scrape_content_node."""
+    writer = get_stream_writer()
+    urls = list(dict.fromkeys(n["url"] for n in state.get("news", []) if not n.get("skipped")))
+    results = {}
+    async for result in scraper.ascrape_stream(urls, state.get("deadline")):
+        results[result.url] = result
+        scrape_progress(writer, result, len(results), len(urls))
+    return scrape_results_to_state(state, results)
+
+
+# ===============================================================================
+# ARTICLE SUMMARIZATION NODES
+# ===============================================================================
+
+async def asummarize_article_stream(llm, text, template=SUMMARY_PROMPT) -> AsyncGenerator[str, None]:
+    """Async variant of summarize_article_stream."""
+    try:
+        prompt = [
+            {
+                "role": "user",
+                "content": template.format(text=text)
+            },
+        ]
+        async for chunk in llm.astream(prompt):
+            yield getattr(chunk, 'content', None)
+    except Exception as e:
+        print(f"[DEBUG] Error en asummarize_article_stream: {e}")
+        yield None
+
+
+async def asummarize_chunks_stream(llm, chunks) -> AsyncGenerator[str, None]:
+    """Async variant of summarize_chunks_stream."""
+    replies = await llm.abatch(chunk_prompts(chunks), return_exceptions=True)
+    partials = [r.content for r in replies if not isinstance(r, Exception) and r.content]
+    if not partials:
+        print(f"[DEBUG] Error en asummarize_chunks_stream: {replies[0] if replies else 'no chunks'}")
+        yield None
+        return
+    async for token in asummarize_article_stream(llm, "\n\n".join(partials), REDUCE_PROMPT):
+        yield token
+
+
+async def agenerate_summary(llm, body: ArticleBody, key, cache, on_token):
+    """Async variant of generate_summary."""
+    summary, failed = "", False
+    chunks = body.chunks
+    tokens = asummarize_chunks_stream(llm, chunks) if chunks else asummarize_article_stream(llm, body.content)
+    async for token in tokens:
+        if token is None:
+            failed = True
+            continue
+        summary += token
+        on_token(token)
+    if cache and summary and not failed:
+        await asyncio.to_thread(cache.put, key, summary)
+
+
+def build_async_summarize_node(
+    llm,
+    max_in_flight: int = SUMMARIZE_MAX_IN_FLIGHT,
+    cache=summary_cache if SUMMARY_CACHE_ENABLED else None,
+):
+    """Async variant of build_summarize_node."""
+    model_id = getattr(llm, "model_name", None) or ""
+
+    async def node(state: State):
+        progress = SummaryProgress(state.get("news", []), get_stream_writer())
+        semaphore = asyncio.Semaphore(max(1, max_in_flight))
+
+        async def summarize(news_idx, body, key):
+            async with semaphore:
+                if past_deadline(state):
+                    progress.news_list[news_idx]["skipped"] = "deadline"
+                    progress.complete(news_idx, SKIPPED_SUMMARIES["deadline"])
+                    return
+                await agenerate_summary(llm, body, key, cache, lambda token: progress.add_token(news_idx, token))
+            progress.complete(news_idx)
+
+        jobs = await asyncio.to_thread(plan_summaries, progress, article_store(state), cache, model_id)
+        await asyncio.gather(*[summarize(*job) for job in jobs])
+        return state
+
+    return node
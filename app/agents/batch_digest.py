@@ -0,0 +1,316 @@
+"""
+Headless batch digest runner.
+
+Reads users from a JSONL file, one {"user_id": ..., "interests": [...]} per
+line ("interests" defaults to the user's stored ones), and writes one JSON
+line per user with the summarized articles and per-stage timing.
+
+News is fetched and deduplicated once per run. Users are then processed in
+chunks: their filters run in parallel, the union of the articles they
+matched is scraped once, and each user's digest is summarized and written
+out as soon as it is done. With the shared filter, articles are classified
+once against the union of the users' interests and each user's matches are
+derived from it, so classification cost grows with the number of distinct
+interests instead of the number of users. Users already written to the output are skipped,
+so a crashed run is resumed by running the same command again.
+
+    cd app && python -m agents.batch_digest users.jsonl --output digests.jsonl --workers 8
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import as_completed
+from dotenv import load_dotenv
+
+# Load .env before the agent modules read their configuration
+load_dotenv()
+
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from langgraph.graph import StateGraph, END
+from agents.state_types import State
+from agents.agent_graph import app_context, make_node
+from agents.tools import (
+    VERDICT_CACHE_ENABLED,
+    SUMMARY_CACHE_ENABLED,
+    SHARED_FILTER_ENABLED,
+    PREFILTER_ENABLED,
+    InterestUnion,
+    state_interests,
+    user_filter,
+    build_shared_filter_news_node,
+    fetch_news_node,
+    dedup_news_node,
+    build_tools_filter_news_node,
+    scrape_results_to_state,
+    prepare_content_node,
+    build_summarize_node,
+)
+from services.scraper import scraper
+from services.verdict_cache import verdict_cache
+from services.summary_cache import summary_cache
+from services.digest_store import DIGEST_ARTICLE_FIELDS
+from services.llm_scheduler import llm_scheduler, PRIORITY_SUMMARY, PRIORITY_BULK
+
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", "8"))
+BATCH_CHUNK_SIZE = int(os.environ.get("BATCH_CHUNK_SIZE", "50"))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("users", help="JSONL file of users and their interests")
+    parser.add_argument("--output", default="digests.jsonl", help="JSONL file the digests are appended to")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Users processed in parallel")
+    parser.add_argument("--chunk-size", type=int, default=BATCH_CHUNK_SIZE, help="Users sharing one scrape round")
+    parser.add_argument("--no-shared-filter", dest="shared", action="store_false", default=SHARED_FILTER_ENABLED,
+                        help="Classify the news separately for every user")
+    return parser.parse_args(argv)
+
+
+def build_stage_graph(*nodes):
+    """Compile a linear graph running the given (name, node) pairs in order."""
+    graph = StateGraph(State)
+    for name, fn in nodes:
+        graph.add_node(name, make_node(fn, name))
+    for (name, _), (following, _) in zip(nodes, nodes[1:]):
+        graph.add_edge(name, following)
+    graph.add_edge(nodes[-1][0], END)
+    graph.set_entry_point(nodes[0][0])
+    return graph.compile()
+
+
+def read_users(path):
+    """Users of the input file, in order and without duplicates (the last entry wins)."""
+    users = {}
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                user = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"[DEBUG] Skipping line {line_number} of {path}: {e}")
+                continue
+            if not isinstance(user, dict) or not user.get("user_id"):
+                print(f"[DEBUG] Skipping line {line_number} of {path}: no user_id")
+                continue
+            users[str(user["user_id"])] = user
+    return list(users.values())
+
+
+def finished_users(path):
+    """Users with a successful digest in a previous run's output; failed ones are retried."""
+    done = set()
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Line cut short by a crash
+                if record.get("status") == "ok":
+                    done.add(record["user_id"])
+    except FileNotFoundError:
+        pass
+    return done
+
+
+class DigestWriter:
+    """Appends one JSON line per user, flushed right away so a crash loses nothing written."""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._file = open(path, "a+")
+        # Terminate a line left incomplete by a crash
+        self._file.seek(0, 2)
+        if self._file.tell():
+            self._file.seek(self._file.tell() - 1)
+            if self._file.read(1) != "\n":
+                self._file.write("\n")
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def node_timing(state):
+    """Per-node wall time of one user's run, in milliseconds."""
+    timing = {f"{m['node']}_ms": m["wall_ms"] for m in state.get("node_metrics") or []}
+    timing["total_ms"] = round(sum(m["wall_ms"] for m in state.get("node_metrics") or []), 1)
+    return timing
+
+
+def digest_record(user_id, state, started):
+    articles = [{f: n.get(f) for f in DIGEST_ARTICLE_FIELDS} for n in state.get("news", []) if not n.get("skipped")]
+    return {
+        "user_id": user_id,
+        "status": "ok",
+        "interests": state.get("interests"),
+        "matched": sum(1 for n in state.get("all_news_filtered", []) if n.get("matched_interests")),
+        "articles": articles,
+        "timing": {**node_timing(state), "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)},
+        "finished": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def error_record(user_id, error):
+    return {"user_id": user_id, "status": "error", "error": f"{type(error).__name__}: {error}"}
+
+
+class BatchDigestRunner:
+    """
+    Runs the digest pipeline for many users, sharing the fetched news and
+    the scraped articles between them.
+    """
+
+    def __init__(
+        self,
+        llm=None,
+        workers: int = BATCH_WORKERS,
+        chunk_size: int = BATCH_CHUNK_SIZE,
+        scheduler=llm_scheduler,
+        prefilter: bool = PREFILTER_ENABLED,
+        verdicts_cache=verdict_cache if VERDICT_CACHE_ENABLED else None,
+        summaries_cache=summary_cache if SUMMARY_CACHE_ENABLED else None,
+        shared: bool = SHARED_FILTER_ENABLED,
+    ):
+        llm = llm if llm is not None else app_context.llm
+        filter_llm = scheduler.bind(llm, PRIORITY_BULK) if scheduler is not None else llm
+        summary_llm = scheduler.bind(llm, PRIORITY_SUMMARY) if scheduler is not None else llm
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.shared = shared
+        self.fetch_graph = build_stage_graph(("fetch_news", fetch_news_node), ("dedup_news", dedup_news_node))
+        self.filter_graph = build_stage_graph(("filter_news", build_tools_filter_news_node(filter_llm, prefilter=prefilter, cache=verdicts_cache)))
+        self.shared_filter_graph = build_stage_graph(
+            ("shared_filter_news", build_shared_filter_news_node(filter_llm, prefilter=prefilter, cache=verdicts_cache))
+        )
+        self.derive_filter = make_node(self._derive_filter, "filter_news")
+        self.union = self.shared_news = self.masks = None
+        # No store_digest: records hold this run's articles only, and the
+        # interactive users' digests are left alone
+        self.summarize_graph = build_stage_graph(
+            ("prepare_content", prepare_content_node),
+            ("summarize", build_summarize_node(summary_llm, cache=summaries_cache)),
+        )
+        self.scraped = {}
+        self.stats = {
+            "users": 0, "ok": 0, "failed": 0, "resumed": 0, "articles_scraped": 0,
+            "fetch_ms": 0.0, "classify_ms": 0.0, "scrape_ms": 0.0,
+        }
+
+    def fetch(self):
+        started = time.perf_counter()
+        news = self.fetch_graph.invoke({"news": []}).get("news", [])
+        self.stats["fetch_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return news
+
+    def classify_shared(self, users, news):
+        """Score the news once against the union of the users' interests."""
+        started = time.perf_counter()
+        self.union = InterestUnion(state_interests(self.user_state(u, [])) for u in users)
+        state = self.shared_filter_graph.invoke({"interests": self.union.interests, "news": news})
+        self.shared_news = state.get("all_news_filtered", [])
+        self.masks = [self.union.article_mask(n["relevance_scores"]) for n in self.shared_news]
+        self.stats["distinct_interests"] = len(self.union.interests)
+        self.stats["classify_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    def _derive_filter(self, state: State) -> State:
+        return user_filter(state, self.shared_news, self.union, self.masks)
+
+    def user_state(self, user, news) -> State:
+        state: State = {"user_id": str(user["user_id"]), "news": list(news), "visited_nodes": [], "node_metrics": []}
+        if user.get("interests") is not None:
+            state["interests"] = [str(i) for i in user["interests"]]
+        # Resolved once, so the filter and the record see the same interests
+        state["interests"] = state_interests(state)
+        return state
+
+    def scrape_matched(self, states):
+        """Scrape the articles matched by any user of the chunk that no earlier chunk scraped."""
+        relevance = {}
+        for state in states:
+            for n in state.get("news", []):
+                if not n.get("skipped"):
+                    relevance[n["url"]] = max(relevance.get(n["url"], 0.0), n.get("relevance") or 0.0)
+        # Most relevant first, as in the interactive scrape
+        urls = sorted((url for url in relevance if url not in self.scraped), key=lambda url: -relevance[url])
+        started = time.perf_counter()
+        for result in scraper.scrape_stream(urls):
+            self.scraped[result.url] = result
+        self.stats["articles_scraped"] += len(urls)
+        self.stats["scrape_ms"] = round(self.stats["scrape_ms"] + (time.perf_counter() - started) * 1000, 1)
+
+    def summarize(self, state, started):
+        results = {n["url"]: self.scraped[n["url"]] for n in state.get("news", []) if n["url"] in self.scraped}
+        state = self.summarize_graph.invoke(scrape_results_to_state(state, results))
+        return digest_record(state["user_id"], state, started)
+
+    def run_chunk(self, users, news, executor, writer):
+        started = {str(u["user_id"]): time.perf_counter() for u in users}
+        filter_user = self.derive_filter if self.shared else self.filter_graph.invoke
+        futures = {executor.submit(filter_user, self.user_state(u, news)): str(u["user_id"]) for u in users}
+        states = []
+        for future in as_completed(futures):
+            try:
+                states.append(future.result())
+            except Exception as e:
+                print(f"[DEBUG] Error filtering news for {futures[future]}: {e}")
+                self.record(writer, error_record(futures[future], e))
+
+        self.scrape_matched(states)
+
+        futures = {executor.submit(self.summarize, s, started[s["user_id"]]): s["user_id"] for s in states}
+        for future in as_completed(futures):
+            try:
+                record = future.result()
+            except Exception as e:
+                print(f"[DEBUG] Error summarizing news for {futures[future]}: {e}")
+                record = error_record(futures[future], e)
+            self.record(writer, record)
+
+    def record(self, writer, record):
+        writer.write(record)
+        self.stats["ok" if record["status"] == "ok" else "failed"] += 1
+
+    def run(self, users, output):
+        """Write the digest of every user not already finished in output. Returns the run stats."""
+        done = finished_users(output)
+        pending = [u for u in users if str(u["user_id"]) not in done]
+        self.stats.update(users=len(users), resumed=len(users) - len(pending))
+        if not pending:
+            return self.stats
+        started = time.perf_counter()
+        news = self.fetch()
+        if self.shared:
+            self.classify_shared(pending, news)
+        writer = DigestWriter(output)
+        try:
+            with ContextThreadPoolExecutor(max_workers=self.workers) as executor:
+                for i in range(0, len(pending), self.chunk_size):
+                    self.run_chunk(pending[i:i + self.chunk_size], news, executor, writer)
+                    print(f"[DEBUG] Batch digests: {self.stats['ok'] + self.stats['failed']}/{len(pending)} users done", file=sys.stderr)
+        finally:
+            writer.close()
+        self.stats["elapsed_s"] = round(time.perf_counter() - started, 2)
+        return self.stats
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    users = read_users(args.users)
+    runner = BatchDigestRunner(workers=args.workers, chunk_size=args.chunk_size, shared=args.shared)
+    stats = runner.run(users, args.output)
+    print(json.dumps(stats))
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,6 @@
+import re
+import threading
+from collections import OrderedDict
 from agents.state_types import State
 
 SYSTEM_PROMPT = """
@@ -10,6 +13,8 @@ If the message is to list interests, reply as follows:
 {"action": "list_interests"}
 If the message is to show news, reply as follows:
 {"action": "fetch_news"}
+If the message is to refresh or update the news, reply as follows:
+{"action": "fetch_news", "refresh": True}
 If the message cannot be interpreted as any of the above actions, reply as follows:
 {"action": "unknown"}
 Examples:
@@ -20,25 +25,173 @@ Examples:
 """.strip()
 
 
-def parse_command_node(llm):
+FAST_PATH_MIN_CONFIDENCE = 0.9
+# The only state keys a parsed command may set
+PARSED_FIELDS = ("action", "interest", "refresh")
+LLM_MEMO_SIZE = 256
+
+_INTEREST_WORDS = r"(?:interests?|topics?|list)"
+# (pattern, action, confidence): patterns run on the normalized message and
+# may capture the interest as the named group "interest", and mark a forced
+# news refresh with the named group "refresh".
+FAST_PATH_RULES = [
+    (re.compile(rf"^(?:show|list|display|see|view|get)(?: me)?(?: all)?(?: my| the)? {_INTEREST_WORDS}$", re.I), "list_interests", 1.0),
+    (re.compile(rf"^(?:what are )?my {_INTEREST_WORDS}\??$", re.I), "list_interests", 0.95),
+    (re.compile(r"^(?:show|give|get|fetch|display|see)(?: me)?(?: the| my| today'?s| latest)? (?:news|headlines|digest)(?: today)?$", re.I), "fetch_news", 1.0),
+    (re.compile(r"^(?:news|headlines|what'?s new)\??$", re.I), "fetch_news", 0.95),
+    (re.compile(r"^(?P<refresh>refresh|update|reload)(?: my| the)? (?:news|headlines|digest)$", re.I), "fetch_news", 1.0),
+    (re.compile(r"^(?:show|give|get|fetch)(?: me)?(?: the)? (?P<refresh>fresh|new) (?:news|headlines|digest)$", re.I), "fetch_news", 1.0),
+    (re.compile(rf"^(?:add|store|save|follow|track) (?P<interest>.+?)(?: (?:to|in|into) (?:my|the) {_INTEREST_WORDS})?$", re.I), "store_interest", 1.0),
+    (re.compile(rf"^(?:remove|delete|drop|unfollow|forget) (?P<interest>.+?)(?: from (?:my|the) {_INTEREST_WORDS})?$", re.I), "remove_interest", 1.0),
+]
+
+_stats_lock = threading.Lock()
+PARSER_STATS = {"fast_path": 0, "memo": 0, "llm": 0}
+
+
+def normalize_command(message: str) -> str:
+    """Collapse whitespace and strip trailing punctuation from a command."""
+    return " ".join(message.split()).rstrip(".!")
+
+
+def fast_parse(message: str):
+    """
+    Resolve a command with the deterministic grammar.
+    Returns (parsed_action, confidence), or (None, 0.0) if no rule applies.
+    """
+    text = normalize_command(message)
+    for pattern, action, confidence in FAST_PATH_RULES:
+        match = pattern.match(text)
+        if not match:
+            continue
+        parsed = {"action": action}
+        if "refresh" in pattern.groupindex:
+            # Bypass the precomputed digest
+            parsed["refresh"] = True
+        if "interest" in pattern.groupindex:
+            interest = match.group("interest").strip(" '\"")
+            if not interest:
+                continue
+            parsed["interest"] = interest
+            # Commands that mention news are ambiguous, e.g. "Add news about AI"
+            if re.search(r"\bnews\b", interest, re.I):
+                confidence = min(confidence, 0.5)
+        return parsed, confidence
+    return None, 0.0
+
+
+def parser_stats() -> dict:
+    """Counts per resolution path and the fast-path hit rate."""
+    with _stats_lock:
+        stats = dict(PARSER_STATS)
+    total = sum(stats.values())
+    stats["fast_path_hit_rate"] = stats["fast_path"] / total if total else 0.0
+    return stats
+
+
+def _count(path: str):
+    with _stats_lock:
+        PARSER_STATS[path] += 1
+
+
+class CommandMemo:
+    """Small thread-safe LRU of normalized input -> parsed action."""
+
+    def __init__(self, size: int = LLM_MEMO_SIZE):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            parsed = self._items.get(key)
+            if parsed is not None:
+                self._items.move_to_end(key)
+            return parsed
+
+    def put(self, key, parsed):
+        with self._lock:
+            self._items[key] = parsed
+            if len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+
+def resolve_without_llm(state: State, memo: CommandMemo, min_confidence: float) -> bool:
+    """Try the grammar, then the memo. Returns True if the state was resolved."""
+    message = state["user_input"]
+    parsed, confidence = fast_parse(message)
+    path = "fast_path"
+    if not parsed or confidence < min_confidence:
+        parsed = memo.get(normalize_command(message))
+        path = "memo"
+    if parsed is None:
+        return False
+    _count(path)
+    state["parse_path"] = path
+    state.update(parsed)
+    return True
+
+
+def command_prompt(message: str):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": message},
+    ]
+
+
+def apply_llm_reply(state: State, memo: CommandMemo, content: str):
+    """
+    Parse the LLM's dict-literal reply into the state and memoize it. Only
+    PARSED_FIELDS are taken, so a reply cannot set user_id or interests.
     """
-    Returns a node that uses the LLM to parse the user's command.
+    import ast
+    content = content.strip()
+    parsed = ast.literal_eval(content) if content.startswith("{") and content.endswith("}") else None
+    if isinstance(parsed, dict) and "action" in parsed:
+        parsed = {k: parsed[k] for k in PARSED_FIELDS if k in parsed}
+        state.update(parsed)
+        memo.put(normalize_command(state["user_input"]), parsed)
+    else:
+        state["action"] = "unknown"
+
+
+def parse_command_node(llm, min_confidence: float = FAST_PATH_MIN_CONFIDENCE, memo_size: int = LLM_MEMO_SIZE):
+    """
+    Returns a node that parses the user's command.
+    The deterministic grammar is tried first; inputs it cannot resolve with
+    at least min_confidence go to the LLM, whose answers are memoized per
+    normalized input.
     """
+    memo = CommandMemo(memo_size)
+
     def node(state: State) -> State:
-        message = state["user_input"]
-        prompt = [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": message},
-        ]
-        import ast
+        if resolve_without_llm(state, memo, min_confidence):
+            return state
+        _count("llm")
+        state["parse_path"] = "llm"
+        try:
+            result = llm.invoke(command_prompt(state["user_input"]))
+            apply_llm_reply(state, memo, result.content)
+        except Exception:
+            state["action"] = "unknown"
+        return state
+    return node
+
+
+def async_parse_command_node(llm, min_confidence: float = FAST_PATH_MIN_CONFIDENCE, memo_size: int = LLM_MEMO_SIZE):
+    """
+    Async variant of parse_command_node.
+    """
+    memo = CommandMemo(memo_size)
+
+    async def node(state: State) -> State:
+        if resolve_without_llm(state, memo, min_confidence):
+            return state
+        _count("llm")
+        state["parse_path"] = "llm"
         try:
-            result = llm.invoke(prompt)
-            content = result.content.strip()
-            if content.startswith("{") and content.endswith("}"):
-                parsed = ast.literal_eval(content)
-                state.update(parsed)
-            else:
-                state["action"] = "unknown"
+            result = await llm.ainvoke(command_prompt(state["user_input"]))
+            apply_llm_reply(state, memo, result.content)
         except Exception:
             state["action"] = "unknown"
         return state
@@ -0,0 +1,80 @@
+import os
+import time
+import threading
+from services.memory import list_users, load_interests
+from services.digest_store import digest_key
+from services.checkpoint_store import CHECKPOINT_DURABILITY
+from agents.agent_graph import prepare_run, finish_run
+
+DIGEST_SCHEDULER_ENABLED = os.environ.get("DIGEST_SCHEDULER_ENABLED", "1") == "1"
+DIGEST_REFRESH_INTERVAL = int(os.environ.get("DIGEST_REFRESH_INTERVAL", "900"))
+
+
+class DigestScheduler:
+    """
+    Background thread that periodically runs the news pipeline for every
+    distinct stored interest set, so "Show me the news" can be served from
+    the precomputed digest. Runs are incremental: the digest nodes only
+    classify and summarize articles the digest has not processed yet.
+    """
+
+    def __init__(self, graph, interval: float = DIGEST_REFRESH_INTERVAL):
+        self.graph = graph
+        self.interval = interval
+        self.runs = 0
+        self.errors = 0
+        self.last_run = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def interest_sets(self):
+        """Map each distinct non-empty interest set to one user holding it."""
+        sets = {}
+        for user_id in list_users():
+            interests = load_interests(user_id)
+            if interests:
+                sets.setdefault(digest_key(interests), user_id)
+        return sets
+
+    def refresh(self, key, user_id):
+        """
+        Update the digest of interest set `key` with the latest news, run as
+        `user_id` who has that set. Each set has its own checkpoint thread, so
+        a run that failed is resumed.
+        """
+        inputs = {"user_input": "Show me the news", "user_id": user_id, "refresh": True}
+        run_input, config = prepare_run(self.graph, inputs, f"digest:{key}")
+        self.graph.invoke(run_input, config, durability=CHECKPOINT_DURABILITY if config else None)
+        finish_run(self.graph, config)
+
+    def refresh_all(self):
+        for key, user_id in self.interest_sets().items():
+            if self._stop.is_set():
+                break
+            try:
+                self.refresh(key, user_id)
+                self.runs += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"[DEBUG] Error precomputing digest for {key}: {e}")
+        self.last_run = time.time()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.refresh_all()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="digest-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        return {"runs": self.runs, "errors": self.errors, "last_run": self.last_run, "interval": self.interval}
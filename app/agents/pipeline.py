@@ -0,0 +1,431 @@
+import os
+import asyncio
+import itertools
+import threading
+from queue import Queue, PriorityQueue
+from concurrent.futures import as_completed
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from langgraph.config import get_stream_writer
+from agents.state_types import State
+from agents.tools import (
+    FILTER_BATCH_SIZE,
+    PREFILTER_ENABLED,
+    VERDICT_CACHE_ENABLED,
+    SUMMARIZE_MAX_IN_FLIGHT,
+    SUMMARY_CACHE_ENABLED,
+    DIGEST_TOP_K,
+    SKIPPED_SUMMARIES,
+    SummaryProgress,
+    classify_article,
+    classify_news_batch,
+    matched_from_scores,
+    plan_filter,
+    cache_verdicts,
+    complete_filter,
+    rank_news,
+    past_deadline,
+    scrape_progress,
+    scraped_article,
+    scrape_stats,
+    compression_stats,
+    prepare_article,
+    add_stats,
+    known_summary,
+    generate_summary,
+)
+from agents.async_tools import aclassify_article, aclassify_news_batch, agenerate_summary
+from services.verdict_cache import verdict_cache
+from services.scraper import scraper
+from services.summary_cache import summary_cache
+from services.article_store import article_store
+
+# Pipelined variant of filter_news → scrape_content → prepare_content →
+# summarize. Instead of each stage waiting for the previous one to finish
+# every article, an article moves on as soon as its own verdict, page or
+# summary is ready, over bounded queues between the stages. The state ends
+# up as if the four staged nodes had run.
+
+PIPELINE_ENABLED = os.environ.get("PIPELINE_ENABLED", "1") == "1"
+PIPELINE_QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", "8"))
+PIPELINE_SCRAPE_WORKERS = int(os.environ.get("PIPELINE_SCRAPE_WORKERS", "8"))
+PIPELINE_STAGES = ("filter_news", "scrape_content", "prepare_content", "summarize")
+PIPELINE_FIELDS = ("id", "scrape_error", "summary", "skipped")
+# Queued after every article, so workers see them last
+STOP = float("inf")
+
+
+class PipelineProgress(SummaryProgress):
+    """SummaryProgress over all fetched articles, counting only those admitted so far."""
+
+    def __init__(self, news_list, writer):
+        super().__init__(news_list, writer)
+        self.admitted = 0
+
+    def total(self):
+        return self.admitted
+
+
+class Admission:
+    """
+    Decides which classified articles go on to scraping, and in which order.
+    Without top_k, matched articles are admitted as soon as their verdict is
+    known. With top_k > 0 they are held until every verdict is in, then the
+    most relevant top_k are admitted and the others skipped.
+    """
+
+    def __init__(self, plan, top_k: int):
+        self.plan = plan
+        self.top_k = top_k
+        self.held = []
+
+    def decide(self, idx, scores):
+        """Return (matched interests, relevance, whether to admit the article now)."""
+        matched = matched_from_scores(scores, self.plan["interests"])
+        relevance = max(scores.values(), default=0.0)
+        admit = bool(matched and self.plan["news"][idx].get("url"))
+        if admit and self.top_k > 0:
+            self.held.append((relevance, idx))
+            admit = False
+        return matched, relevance, admit
+
+    def release(self):
+        """Return ([(relevance, idx)] to admit, [idx] to skip) once every verdict is in."""
+        ranked = sorted(self.held, key=lambda item: -item[0])
+        return ranked[:self.top_k], [idx for _, idx in ranked[self.top_k:]]
+
+
+def classification_jobs(plan, batch_size):
+    """Split the LLM work of a filter plan into (missing interests, article positions) jobs."""
+    size = batch_size if batch_size > 1 else 1
+    return [
+        (missing, idxs[i:i + size])
+        for missing, idxs in plan["groups"].items()
+        for i in range(0, len(idxs), size)
+    ]
+
+
+def resolved_without_llm(plan):
+    """Positions whose verdict is already known from the pre-filter or the cache."""
+    grouped = {idx for idxs in plan["groups"].values() for idx in idxs}
+    return [idx for idx in range(len(plan["news"])) if idx not in grouped]
+
+
+def article_scores(plan, idx, missing=(), scores=None, reason=""):
+    """Relevance scores of one article, given its LLM scores for the missing interests."""
+    if idx not in plan["known"]:
+        return plan["verdicts"][idx]
+    known = {**plan["known"][idx], **{i: ((scores or {}).get(i, 0.0), reason) for i in missing}}
+    return {i: known[i][0] for i in plan["interests"]}
+
+
+def verdict_event(plan, idx, matched, relevance):
+    title = plan["news"][idx].get("title", "No title")
+    return {"filter_verdict": {"idx": idx, "title": title, "matched": matched, "relevance": relevance}}
+
+
+def finish_pipeline(state: State, plan, verdicts, batch_size, cache, articles, scraped, compression) -> State:
+    """
+    Write the filter, scrape, preparation and summary results as the staged
+    nodes would. The verdicts were cached as each group was classified.
+    """
+    results = {missing: [verdicts[idx] for idx in idxs] for missing, idxs in plan["groups"].items()}
+    state = complete_filter(state, plan, results, batch_size, cache, top_k=0, cached=True)
+    matched = [idx for idx, n in enumerate(state["all_news_filtered"]) if n["matched_interests"] and n["url"]]
+    state["news"] = rank_news([
+        {**state["all_news_filtered"][idx], **{k: articles[idx][k] for k in PIPELINE_FIELDS if k in articles[idx]}}
+        for idx in matched
+    ], top_k=0)
+    state["scrape_stats"] = scrape_stats(len(matched), scraped)
+    state["compression_stats"] = compression
+    state.setdefault("visited_nodes", []).extend(PIPELINE_STAGES)
+    return state
+
+
+def build_pipeline_node(
+    filter_llm,
+    summary_llm,
+    batch_size: int = FILTER_BATCH_SIZE,
+    prefilter: bool = PREFILTER_ENABLED,
+    verdicts_cache=verdict_cache if VERDICT_CACHE_ENABLED else None,
+    summaries_cache=summary_cache if SUMMARY_CACHE_ENABLED else None,
+    max_in_flight: int = SUMMARIZE_MAX_IN_FLIGHT,
+    scrape_workers: int = PIPELINE_SCRAPE_WORKERS,
+    queue_size: int = PIPELINE_QUEUE_SIZE,
+    top_k: int = DIGEST_TOP_K,
+):
+    """
+    Build a node that filters, scrapes, prepares and summarizes articles
+    as a pipeline. Classification batches, `scrape_workers` scraping threads
+    and `max_in_flight` summarizing threads run concurrently; waiting
+    articles are scraped most relevant first. Once the request deadline has
+    passed no new scrape or summary starts. All stream writer events are
+    emitted from the node's own thread.
+    """
+    model_id = getattr(summary_llm, "model_name", None) or ""
+    scrape_workers = max(1, scrape_workers)
+    max_in_flight = max(1, max_in_flight)
+
+    def node(state: State) -> State:
+        plan = plan_filter(state, prefilter, verdicts_cache)
+        if plan is None:
+            return state
+        writer = get_stream_writer()
+        store = article_store(state)
+        articles = [dict(n) for n in plan["news"]]
+        progress = PipelineProgress(articles, writer)
+        admission = Admission(plan, top_k)
+        events = Queue()
+        scrape_queue = PriorityQueue(maxsize=max(1, queue_size))
+        summary_queue = Queue(maxsize=max(1, queue_size))
+        order = itertools.count()
+        verdicts = {}
+        scrapers_left = [scrape_workers]
+        lock = threading.Lock()
+
+        def decide(idx, scores):
+            matched, relevance, admit = admission.decide(idx, scores)
+            events.put(("verdict", idx, (matched, relevance)))
+            if admit:
+                scrape_queue.put((-relevance, next(order), idx))
+
+        def classify(missing, idxs):
+            batch = [plan["news"][idx] for idx in idxs]
+            if batch_size > 1:
+                return classify_news_batch(filter_llm, batch, list(missing))
+            return [classify_article(filter_llm, batch[0], list(missing))]
+
+        def filter_stage():
+            try:
+                for idx in resolved_without_llm(plan):
+                    decide(idx, article_scores(plan, idx))
+                jobs = classification_jobs(plan, batch_size)
+                if jobs:
+                    with ContextThreadPoolExecutor(max_workers=len(jobs)) as executor:
+                        futures = {executor.submit(classify, *job): job for job in jobs}
+                        for future in as_completed(futures):
+                            missing, idxs = futures[future]
+                            replies = future.result()
+                            # Cached right away, so a run failing later does not classify them again
+                            cache_verdicts(verdicts_cache, plan, missing, idxs, replies)
+                            for idx, (scores, reason) in zip(idxs, replies):
+                                verdicts[idx] = (scores, reason)
+                                decide(idx, article_scores(plan, idx, missing, scores, reason))
+                admit, skip = admission.release()
+                for idx in skip:
+                    events.put(("skipped", idx, "top_k"))
+                for relevance, idx in admit:
+                    scrape_queue.put((-relevance, next(order), idx))
+            except Exception as e:
+                events.put(("error", None, e))
+            finally:
+                for _ in range(scrape_workers):
+                    scrape_queue.put((STOP, next(order), None))
+
+        def scrape_stage():
+            try:
+                while (idx := scrape_queue.get()[2]) is not None:
+                    try:
+                        result = scraper.scrape(plan["news"][idx]["url"], state.get("deadline"))
+                        counts = compression_stats()
+                        prepared = prepare_article(scraped_article(plan["news"][idx], result, store), store, counts)
+                        # The event goes first so the article is updated before its summary starts
+                        events.put(("scraped", idx, (result, prepared, counts)))
+                        if not result.skipped:
+                            summary_queue.put((idx, prepared))
+                    except Exception as e:
+                        events.put(("error", idx, e))
+            finally:
+                with lock:
+                    scrapers_left[0] -= 1
+                    last = scrapers_left[0] == 0
+                if last:
+                    for _ in range(max_in_flight):
+                        summary_queue.put(None)
+
+        def summary_stage():
+            try:
+                while (job := summary_queue.get()) is not None:
+                    idx, n = job
+                    summary = None
+                    try:
+                        body = store.body(n)
+                        summary, key = known_summary(body, summaries_cache, model_id)
+                        if summary is None and past_deadline(state):
+                            events.put(("skipped", idx, "deadline"))
+                            continue
+                        if summary is None:
+                            generate_summary(summary_llm, body, key, summaries_cache,
+                                             lambda token: events.put(("token", idx, token)))
+                    except Exception as e:
+                        events.put(("error", idx, e))
+                    events.put(("summary", idx, summary))
+            finally:
+                events.put(("exit", None, None))
+
+        scraped, compression, error = {}, compression_stats(), None
+        with ContextThreadPoolExecutor(max_workers=1 + scrape_workers + max_in_flight) as executor:
+            executor.submit(filter_stage)
+            for _ in range(scrape_workers):
+                executor.submit(scrape_stage)
+            for _ in range(max_in_flight):
+                executor.submit(summary_stage)
+            running = max_in_flight
+            while running:
+                kind, idx, value = events.get()
+                if kind == "verdict":
+                    matched, relevance = value
+                    writer(verdict_event(plan, idx, matched, relevance))
+                    if matched and plan["news"][idx].get("url"):
+                        progress.admitted += 1
+                elif kind == "scraped":
+                    result, prepared, counts = value
+                    articles[idx].update(prepared)
+                    scraped[result.url] = result
+                    add_stats(compression, counts)
+                    scrape_progress(writer, result, len(scraped), progress.admitted)
+                    if result.skipped:
+                        progress.complete(idx, SKIPPED_SUMMARIES["deadline"])
+                elif kind == "skipped":
+                    articles[idx]["skipped"] = value
+                    progress.complete(idx, SKIPPED_SUMMARIES[value])
+                elif kind == "token":
+                    progress.add_token(idx, value)
+                elif kind == "summary":
+                    progress.complete(idx, value)
+                elif kind == "error":
+                    print(f"[DEBUG] Error in pipeline: {value}")
+                    error = error or value
+                elif kind == "exit":
+                    running -= 1
+        if error is not None:
+            raise error
+        return finish_pipeline(state, plan, verdicts, batch_size, verdicts_cache, articles, scraped, compression)
+
+    return node
+
+
+def build_async_pipeline_node(
+    filter_llm,
+    summary_llm,
+    batch_size: int = FILTER_BATCH_SIZE,
+    prefilter: bool = PREFILTER_ENABLED,
+    verdicts_cache=verdict_cache if VERDICT_CACHE_ENABLED else None,
+    summaries_cache=summary_cache if SUMMARY_CACHE_ENABLED else None,
+    max_in_flight: int = SUMMARIZE_MAX_IN_FLIGHT,
+    scrape_workers: int = PIPELINE_SCRAPE_WORKERS,
+    queue_size: int = PIPELINE_QUEUE_SIZE,
+    top_k: int = DIGEST_TOP_K,
+):
+    """Async variant of build_pipeline_node, with worker tasks instead of threads."""
+    model_id = getattr(summary_llm, "model_name", None) or ""
+    scrape_workers = max(1, scrape_workers)
+    max_in_flight = max(1, max_in_flight)
+
+    async def node(state: State) -> State:
+        plan = await asyncio.to_thread(plan_filter, state, prefilter, verdicts_cache)
+        if plan is None:
+            return state
+        writer = get_stream_writer()
+        store = article_store(state)
+        articles = [dict(n) for n in plan["news"]]
+        progress = PipelineProgress(articles, writer)
+        admission = Admission(plan, top_k)
+        scrape_queue = asyncio.PriorityQueue(maxsize=max(1, queue_size))
+        summary_queue = asyncio.Queue(maxsize=max(1, queue_size))
+        order = itertools.count()
+        verdicts, scraped, compression = {}, {}, compression_stats()
+        scrapers_left = [scrape_workers]
+
+        def skip(idx, reason):
+            articles[idx]["skipped"] = reason
+            progress.complete(idx, SKIPPED_SUMMARIES[reason])
+
+        async def decide(idx, scores):
+            matched, relevance, admit = admission.decide(idx, scores)
+            writer(verdict_event(plan, idx, matched, relevance))
+            if matched and plan["news"][idx].get("url"):
+                progress.admitted += 1
+            if admit:
+                await scrape_queue.put((-relevance, next(order), idx))
+
+        async def classify(missing, idxs):
+            batch = [plan["news"][idx] for idx in idxs]
+            if batch_size > 1:
+                return missing, idxs, await aclassify_news_batch(filter_llm, batch, list(missing))
+            return missing, idxs, [await aclassify_article(filter_llm, batch[0], list(missing))]
+
+        async def filter_stage():
+            try:
+                for idx in resolved_without_llm(plan):
+                    await decide(idx, article_scores(plan, idx))
+                for next_done in asyncio.as_completed([classify(*job) for job in classification_jobs(plan, batch_size)]):
+                    missing, idxs, replies = await next_done
+                    await asyncio.to_thread(cache_verdicts, verdicts_cache, plan, missing, idxs, replies)
+                    for idx, (scores, reason) in zip(idxs, replies):
+                        verdicts[idx] = (scores, reason)
+                        await decide(idx, article_scores(plan, idx, missing, scores, reason))
+                admit, skipped = admission.release()
+                for idx in skipped:
+                    skip(idx, "top_k")
+                for relevance, idx in admit:
+                    await scrape_queue.put((-relevance, next(order), idx))
+            finally:
+                for _ in range(scrape_workers):
+                    await scrape_queue.put((STOP, next(order), None))
+
+        async def scrape_stage():
+            try:
+                while (idx := (await scrape_queue.get())[2]) is not None:
+                    try:
+                        result = await scraper.ascrape(plan["news"][idx]["url"], state.get("deadline"))
+                        prepared = prepare_article(scraped_article(plan["news"][idx], result, store), store, compression)
+                    except Exception as e:
+                        errors.append(e)
+                        continue
+                    articles[idx].update(prepared)
+                    scraped[result.url] = result
+                    scrape_progress(writer, result, len(scraped), progress.admitted)
+                    if result.skipped:
+                        progress.complete(idx, SKIPPED_SUMMARIES["deadline"])
+                    else:
+                        await summary_queue.put((idx, prepared))
+            finally:
+                scrapers_left[0] -= 1
+                if scrapers_left[0] == 0:
+                    for _ in range(max_in_flight):
+                        await summary_queue.put(None)
+
+        async def summary_stage():
+            while (job := await summary_queue.get()) is not None:
+                idx, n = job
+                summary = None
+                try:
+                    body = store.body(n)
+                    summary, key = await asyncio.to_thread(known_summary, body, summaries_cache, model_id)
+                    if summary is None and past_deadline(state):
+                        skip(idx, "deadline")
+                        continue
+                    if summary is None:
+                        await agenerate_summary(summary_llm, body, key, summaries_cache,
+                                                lambda token: progress.add_token(idx, token))
+                except Exception as e:
+                    errors.append(e)
+                progress.complete(idx, summary)
+
+        errors = []
+        outcomes = await asyncio.gather(
+            filter_stage(),
+            *[scrape_stage() for _ in range(scrape_workers)],
+            *[summary_stage() for _ in range(max_in_flight)],
+            return_exceptions=True,
+        )
+        errors += [o for o in outcomes if isinstance(o, Exception)]
+        for e in errors:
+            print(f"[DEBUG] Error in pipeline: {e}")
+        if errors:
+            raise errors[0]
+        return await asyncio.to_thread(
+            finish_pipeline, state, plan, verdicts, batch_size, verdicts_cache, articles, scraped, compression
+        )
+
+    return node
@@ -1,10 +1,26 @@
 from typing import TypedDict, List, Optional
+from services.article_store import ArticleStore
 
 class State(TypedDict, total=False):
+    user_id: str
     user_input: str
+    interests: List[str]  # overrides the stored interests (batch runs)
     action: str
     interest: str
-    news: List[dict]
+    parse_path: str
+    refresh: bool
+    deadline: Optional[float]  # time.time() after which no new scrape or summary starts
+    news: List[dict]  # small per-article dicts, bodies are in article_store
+    article_store: ArticleStore  # per-run scraped text and chunks, by article id
     all_news_filtered: List[dict]  # Added for news filter display
+    dedup_stats: dict
+    prefilter_stats: dict
+    verdict_cache_stats: dict
+    scrape_stats: dict
+    compression_stats: dict
+    digest_stats: dict
+    digest_served: bool
+    digest_updated: float
     result: Optional[str]
     visited_nodes: List[str]
+    node_metrics: List[dict]
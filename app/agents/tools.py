@@ -1,125 +1,690 @@
-from newspaper import Article
-from typing import Generator
-from concurrent.futures import ThreadPoolExecutor
+import os
+import json
+import time
+from typing import Dict, Generator, List, Optional, Tuple
+from queue import Queue
+from langchain_core.runnables.config import ContextThreadPoolExecutor
 from langgraph.config import get_stream_writer
 from agents.state_types import State
-from services.memory import load_interests, add_interest, remove_interest
-from services.news import fetch_news
+from services.memory import DEFAULT_USER, load_interests, add_interest, remove_interest
+from services.news import fetch_news, canonical_url
+from services.prefilter import interest_index
+from services.dedup import cluster_near_duplicates, normalize_headline
+from services.verdict_cache import verdict_cache, article_key
+from services.scraper import scraper
+from services.summary_cache import summary_cache, summary_key
+from services.compression import approx_tokens, prepare_content
+from services.digest_store import digest_store, digest_key
+from services.article_store import ArticleBody, ArticleStore, article_store
 
 
 # ===============================================================================
 # NEWS FETCHING NODE
 # ===============================================================================
 
-def is_news_about_interest(llm, article, interests):
-    """Check if a news article is related to any of the user's interests."""
+def interest_prompt(article, interests):
+    """Prompt asking how relevant a single article is to each of the interests."""
     interests_str = ', '.join(interests)
-    prompt = [
+    return [
         {
             "role": "system", 
-            "content": f"You are an assistant that determines if a news article is related to any of the following user interests: {interests_str}.\nRespond ONLY with 'yes' or 'no', and if 'yes', indicate which interest(s)."
+            "content": (
+                f"You are an assistant that rates how related a news article is to each of the following user interests: {interests_str}.\n"
+                f"Respond ONLY with a JSON object mapping each interest to a relevance score from 0 (unrelated) to {RELEVANCE_SCALE} (entirely about it)."
+            )
         },
         {
             "role": "user", 
             "content": f"NEWS:\nTitle: {article['title']}\nContent: {article['content']}"
         }
     ]
-    res = llm.invoke(prompt)
-    content = res.content.lower()
+
+
+def normalize_score(value) -> Optional[float]:
+    """Map a score on the prompt scale to [0, 1]; None if it is not a number."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return min(max(value / RELEVANCE_SCALE, 0.0), 1.0)
+
+
+def parse_relevance(content, interests) -> Dict[str, float]:
+    """
+    Parse a relevance reply into {interest: score in [0, 1]}. A free-text
+    reply is read as yes/no: 'yes' scores the interests it names (all of
+    them if it names none) as fully relevant.
+    """
+    start, end = content.find("{"), content.rfind("}")
+    if start != -1 and end > start:
+        try:
+            items = json.loads(content[start:end + 1])
+        except ValueError:
+            items = None
+        if isinstance(items, dict):
+            return scores_for(items, interests)
+    content = content.lower()
     if "yes" in content:
-        return True, content
-    return False, content
+        return dict.fromkeys(interests_named_in(content, interests) or interests, 1.0)
+    return {}
+
+
+def scores_for(items: dict, interests) -> Dict[str, float]:
+    """Keep the valid scores of a parsed {interest: score} object, keyed by the canonical interests."""
+    canonical = {i.lower(): i for i in interests}
+    scores = {}
+    for interest, value in items.items():
+        score = normalize_score(value)
+        if isinstance(interest, str) and interest.lower() in canonical and score is not None:
+            scores[canonical[interest.lower()]] = score
+    return scores
+
+
+def state_interests(state: State):
+    """Interests given with the request (batch runs), else the user's stored ones."""
+    if state.get("interests") is not None:
+        return state["interests"]
+    return load_interests(state.get("user_id", DEFAULT_USER))
+
+
+NEWS_FETCH_SIZE = int(os.environ.get("NEWS_FETCH_SIZE", "10"))
 
 
 def fetch_news_node(state: State) -> State:
     """Fetch news articles from the news service."""
-    news = fetch_news(page_size=10, language="en")
+    news = fetch_news(page_size=NEWS_FETCH_SIZE, language="en")
     state["news"] = news
     return state
 
 
+# ===============================================================================
+# NEWS DEDUPLICATION NODE
+# ===============================================================================
+
+def dedup_news_node(state: State) -> State:
+    """
+    Collapse near-duplicate stories (e.g. syndicated wire copy) into one
+    representative per cluster, keeping the others as alternates.
+    """
+    news = state.get("news", [])
+    clusters = cluster_near_duplicates([f"{normalize_headline(n.get('title'))} {n.get('content') or ''}" for n in news])
+    representatives = []
+    for cluster in clusters:
+        # Prefer the copy with the longest description, it classifies best
+        best = max(cluster, key=lambda idx: len(news[idx].get("content") or ""))
+        representative = {**news[best]}
+        representative["alternates"] = [
+            {"title": news[idx]["title"], "url": news[idx]["url"], "source": news[idx]["source"]}
+            for idx in cluster if idx != best
+        ]
+        representatives.append(representative)
+    state["news"] = representatives
+    state["dedup_stats"] = {"articles": len(news), "clusters": len(clusters)}
+    return state
+
+
+# ===============================================================================
+# RELEVANCE RANKING AND DEADLINES
+# ===============================================================================
+
+DIGEST_TOP_K = int(os.environ.get("DIGEST_TOP_K", "0"))
+DIGEST_DEADLINE = float(os.environ.get("DIGEST_DEADLINE", "0"))
+SKIPPED_SUMMARIES = {
+    "top_k": "⏭️ Skipped: not among the most relevant articles.",
+    "deadline": "⏭️ Skipped: the response deadline was reached before this article was processed.",
+}
+
+
+def rank_news(news, top_k: int = DIGEST_TOP_K):
+    """
+    Order matched articles by relevance, most relevant first (stable for
+    ties). With top_k > 0 the articles past the first top_k are marked as
+    skipped rather than dropped, so the digest can show them.
+    """
+    ranked = sorted(news, key=lambda n: n.get("relevance") or 0.0, reverse=True)
+    if top_k > 0:
+        ranked = ranked[:top_k] + [{**n, "skipped": "top_k"} for n in ranked[top_k:]]
+    return ranked
+
+
+def request_deadline(seconds: float = DIGEST_DEADLINE) -> Optional[float]:
+    """Absolute deadline for a request starting now, or None without one."""
+    return time.time() + seconds if seconds > 0 else None
+
+
+def past_deadline(state: State) -> bool:
+    """Whether the request's deadline (if any) has passed: no new work is started then."""
+    deadline = state.get("deadline")
+    return deadline is not None and time.time() >= deadline
+
+
 # ===============================================================================
 # NEWS FILTERING NODE
 # ===============================================================================
 
-def build_tools_filter_news_node(llm):
-    """Build a node that filters news based on user interests."""
-    def node(state: State) -> State:
-        interests = load_interests()
-        
-        original_news = state.get("news", [])
-        
-        if not interests:
-            # If no interests are set, mark all news as no match
-            all_news_with_matches = []
-            for n in original_news:
-                n_copy = n.copy()
-                n_copy["matched_interests"] = False
-                n_copy["match_reason"] = "No user interests configured"
-                all_news_with_matches.append(n_copy)
-            
-            state["all_news_filtered"] = all_news_with_matches
-            state["news"] = []  # No news matches since no interests
-            return state
-        
-        def check_match(n):
-            match, reason = is_news_about_interest(llm, n, interests)
+FILTER_BATCH_SIZE = int(os.environ.get("FILTER_BATCH_SIZE", "8"))
+FILTER_SNIPPET_CHARS = 300
+# The pre-filter drops articles scoring below PREFILTER_LOW without asking the
+# LLM, which loses stories that paraphrase an interest, so it is opt-in
+PREFILTER_ENABLED = os.environ.get("PREFILTER_ENABLED", "0") == "1"
+VERDICT_CACHE_ENABLED = os.environ.get("VERDICT_CACHE_ENABLED", "1") == "1"
+
+
+RELEVANCE_SCALE = 10
+RELEVANCE_THRESHOLD = float(os.environ.get("RELEVANCE_THRESHOLD", "0.5"))
+
+
+def interests_named_in(text, interests):
+    """Return the interests explicitly mentioned in a free-text classifier reply."""
+    text = text.lower()
+    return [i for i in interests if i.lower() in text]
+
+
+def matched_from_scores(scores, interests, threshold: float = RELEVANCE_THRESHOLD) -> List[str]:
+    """Interests an article is relevant enough to, in the user's order."""
+    return [i for i in interests if scores.get(i, 0.0) >= threshold]
+
+
+def classify_article(llm, article, interests) -> Tuple[Dict[str, float], str]:
+    """Score a single article against the interests, returning the scores and the LLM reply."""
+    res = llm.invoke(interest_prompt(article, interests))
+    return parse_relevance(res.content, interests), res.content
+
+
+def parse_batch_verdicts(content, interests, n_articles) -> Optional[List[Dict[str, float]]]:
+    """
+    Parse a structured batch reply into per-article relevance scores.
+    Returns None if the reply is not a usable JSON list; articles missing
+    from the reply are returned as None entries in the list. A plain list of
+    matched interests is accepted as fully relevant to those.
+    """
+    start, end = content.find("["), content.rfind("]")
+    if start == -1 or end <= start:
+        return None
+    try:
+        items = json.loads(content[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(items, list):
+        return None
+
+    verdicts = [None] * n_articles
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        idx = item.get("id")
+        if not isinstance(idx, int) or not 0 <= idx < n_articles:
+            continue
+        if isinstance(item.get("scores"), dict):
+            verdicts[idx] = scores_for(item["scores"], interests)
+        elif isinstance(item.get("interests"), list):
+            matched = [m for m in item["interests"] if isinstance(m, str)]
+            verdicts[idx] = scores_for(dict.fromkeys(matched, RELEVANCE_SCALE), interests)
+    return verdicts
+
+
+def batch_prompt(articles, interests):
+    """Prompt asking for structured per-article relevance scores for a group of articles."""
+    interests_str = "\n".join(f"- {i}" for i in interests)
+    articles_str = "\n\n".join(
+        f"[{idx}] Title: {a['title']}\nContent: {(a.get('content') or '')[:FILTER_SNIPPET_CHARS]}"
+        for idx, a in enumerate(articles)
+    )
+    return [
+        {
+            "role": "system",
+            "content": (
+                "You are an assistant that rates how related news articles are to the following user interests:\n"
+                f"{interests_str}\n"
+                "Reply ONLY with a JSON list containing one object per article, in the form "
+                '[{"id": <ARTICLE_ID>, "scores": {"<INTEREST>": <SCORE>, ...}}], '
+                f"with a relevance score from 0 (unrelated) to {RELEVANCE_SCALE} (entirely about it) for every interest. "
+                "Use the interests exactly as written above."
+            )
+        },
+        {
+            "role": "user",
+            "content": f"NEWS:\n{articles_str}"
+        }
+    ]
+
+
+def classify_news_batch(llm, articles, interests) -> List[Tuple[Dict[str, float], str]]:
+    """
+    Score a group of articles in a single LLM request.
+    Articles whose structured verdict cannot be parsed fall back to a
+    per-article call.
+    """
+    verdicts = None
+    try:
+        res = llm.invoke(batch_prompt(articles, interests))
+        verdicts = parse_batch_verdicts(res.content, interests, len(articles))
+    except Exception as e:
+        print(f"[DEBUG] Error in classify_news_batch: {e}")
+    if verdicts is None:
+        verdicts = [None] * len(articles)
+    return [
+        (v, "Batch classification") if v is not None else classify_article(llm, a, interests)
+        for a, v in zip(articles, verdicts)
+    ]
+
+
+def classify_news(llm, articles, interests, batch_size) -> List[Tuple[Dict[str, float], str]]:
+    """Classify articles concurrently, in batches when batch_size > 1."""
+    with ContextThreadPoolExecutor() as executor:
+        if batch_size > 1:
+            batches = [articles[i:i + batch_size] for i in range(0, len(articles), batch_size)]
+            return [
+                v for batch_verdicts in executor.map(lambda b: classify_news_batch(llm, b, interests), batches)
+                for v in batch_verdicts
+            ]
+        return list(executor.map(lambda n: classify_article(llm, n, interests), articles))
+
+
+def llm_calls_for(n_articles, batch_size):
+    """Number of LLM requests needed to classify n_articles."""
+    if batch_size > 1:
+        return -(-n_articles // batch_size)
+    return n_articles
+
+
+def plan_filter(state: State, prefilter: bool, cache):
+    """
+    Resolve every verdict that does not need the LLM.
+    Returns None when the user has no interests (the state is then already
+    final), otherwise a plan whose "groups" map each tuple of still-unknown
+    interests to the positions of the articles to classify against them.
+    Articles decided by the pre-filter get their scores in "verdicts"; the
+    others collect per-interest (score, reason) pairs in "known".
+    """
+    interests = state_interests(state)
+    original_news = state.get("news", [])
+    
+    if not interests:
+        # If no interests are set, mark all news as no match
+        all_news_with_matches = []
+        for n in original_news:
             n_copy = n.copy()
-            n_copy["matched_interests"] = match
-            n_copy["match_reason"] = reason if match else "No match with user interests"
-            return n_copy
+            n_copy["matched_interests"] = []
+            n_copy["match_reason"] = "No user interests configured"
+            all_news_with_matches.append(n_copy)
         
-        with ThreadPoolExecutor() as executor:
-            all_news_with_matches = list(executor.map(check_match, original_news))
-        
-        # Store all news with match information for the news filter display
         state["all_news_filtered"] = all_news_with_matches
-        
-        # Keep only matched news for further processing
-        filtered_news = [n for n in all_news_with_matches if (n["matched_interests"] and n["url"])]
-        state["news"] = filtered_news
-        
+        state["news"] = []  # No news matches since no interests
+        return None
+    
+    verdicts = [None] * len(original_news)
+    if prefilter:
+        rejected, accepted, pending = interest_index.split(original_news, interests)
+        for idx in rejected:
+            verdicts[idx] = {}
+        for idx, matched in accepted.items():
+            verdicts[idx] = dict.fromkeys(matched, 1.0)
+    else:
+        rejected, accepted, pending = [], {}, list(range(len(original_news)))
+    
+    # Per-interest verdicts: cached ones first, then group articles by the
+    # interests still missing so each group is classified only against those.
+    known = {}
+    groups = {}
+    for idx in pending:
+        known[idx] = cache.get_many(article_key(original_news[idx]), interests) if cache else {}
+        missing = tuple(i for i in interests if i not in known[idx])
+        if missing:
+            groups.setdefault(missing, []).append(idx)
+    
+    return {
+        "interests": interests,
+        "news": original_news,
+        "verdicts": verdicts,
+        "pending": pending,
+        "known": known,
+        "groups": groups,
+        "rejected": rejected,
+        "accepted": accepted,
+    }
+
+
+def cache_verdicts(cache, plan, missing, idxs, replies):
+    """Store the LLM verdicts of one classified group of articles in the verdict cache."""
+    if not cache:
+        return
+    for idx, (scores, reason) in zip(idxs, replies):
+        cache.put_many(article_key(plan["news"][idx]), {i: (scores.get(i, 0.0), reason) for i in missing})
+
+
+def complete_filter(
+    state: State, plan, results, batch_size: int, cache, top_k: int = DIGEST_TOP_K, cached: bool = False
+) -> State:
+    """
+    Merge LLM results into the plan and write the filter output to the state.
+    results maps each group of missing interests to one (scores, reason)
+    pair per article of the group. The matched articles are ranked by
+    relevance, and those past the first top_k (if > 0) marked as skipped.
+    With cached, the results are already in the verdict cache.
+    """
+    interests, original_news, verdicts, known = plan["interests"], plan["news"], plan["verdicts"], plan["known"]
+    calls_made = 0
+    for missing, idxs in plan["groups"].items():
+        calls_made += llm_calls_for(len(idxs), batch_size)
+        for idx, (scores, reason) in zip(idxs, results[missing]):
+            known[idx].update({i: (scores.get(i, 0.0), reason) for i in missing})
+        if not cached:
+            cache_verdicts(cache, plan, missing, idxs, results[missing])
+    for idx in plan["pending"]:
+        verdicts[idx] = {i: known[idx][i][0] for i in interests}
+    
+    state["prefilter_stats"] = {
+        "rejected": len(plan["rejected"]),
+        "accepted": len(plan["accepted"]),
+        "sent_to_llm": sum(len(idxs) for idxs in plan["groups"].values()),
+        "llm_calls_saved": llm_calls_for(len(original_news), batch_size) - calls_made,
+    }
+    if cache:
+        state["verdict_cache_stats"] = cache.stats()
+    
+    all_news_with_matches = [
+        filtered_article(n, scores, matched_from_scores(scores, interests))
+        for n, scores in zip(original_news, verdicts)
+    ]
+    return write_filter_output(state, all_news_with_matches, top_k)
+
+
+def filtered_article(n: dict, scores: Dict[str, float], matched: List[str]) -> dict:
+    """Copy of an article annotated with its verdict."""
+    n_copy = n.copy()
+    n_copy["matched_interests"] = matched
+    n_copy["match_reason"] = f"Matches: {', '.join(matched)}" if matched else "No match with user interests"
+    n_copy["relevance_scores"] = scores
+    n_copy["relevance"] = max(scores.values(), default=0.0)
+    return n_copy
+
+
+def write_filter_output(state: State, all_news_with_matches: List[dict], top_k: int) -> State:
+    # Store all news with match information for the news filter display
+    state["all_news_filtered"] = all_news_with_matches
+    
+    # Keep only matched news for further processing, most relevant first
+    filtered_news = [n for n in all_news_with_matches if (n["matched_interests"] and n["url"])]
+    state["news"] = rank_news(filtered_news, top_k)
+    
+    return state
+
+
+def build_tools_filter_news_node(
+    llm,
+    batch_size: int = FILTER_BATCH_SIZE,
+    prefilter: bool = PREFILTER_ENABLED,
+    cache=verdict_cache if VERDICT_CACHE_ENABLED else None,
+    top_k: int = DIGEST_TOP_K,
+):
+    """
+    Build a node that scores news against the user's interests and keeps
+    the relevant articles, most relevant first (only top_k are processed
+    further when top_k > 0).
+    With batch_size > 1 articles are classified in groups of that size per
+    LLM request; otherwise one request is made per article. With prefilter
+    enabled, only articles in the uncertain band of the local interest index
+    are sent to the LLM. With a verdict cache, each article is only
+    classified against the interests it has no cached verdict for.
+    """
+    def node(state: State) -> State:
+        plan = plan_filter(state, prefilter, cache)
+        if plan is None:
+            return state
+        results = {
+            missing: classify_news(llm, [plan["news"][idx] for idx in idxs], list(missing), batch_size)
+            for missing, idxs in plan["groups"].items()
+        }
+        return complete_filter(state, plan, results, batch_size, cache, top_k)
+
+    return node
+
+
+# ===============================================================================
+# SHARED CLASSIFICATION ACROSS USERS
+# ===============================================================================
+
+SHARED_FILTER_ENABLED = os.environ.get("SHARED_FILTER_ENABLED", "1") == "1"
+SHARED_FILTER_GROUP_SIZE = int(os.environ.get("SHARED_FILTER_GROUP_SIZE", "16"))
+
+
+class InterestUnion:
+    """
+    Deduplicated union of the interests of many users. Interests are
+    compared case-insensitively and keep the first spelling seen. Each
+    interest owns one bit, so an interest set is a bitmask over the union
+    and a user's matches for an article are the AND of two bitmasks.
+    """
+
+    def __init__(self, interest_sets=()):
+        self.interests: List[str] = []
+        self._bits: Dict[str, int] = {}
+        for interests in interest_sets:
+            self.add(interests)
+
+    def add(self, interests) -> int:
+        for interest in interests:
+            if interest.lower() not in self._bits:
+                self._bits[interest.lower()] = 1 << len(self.interests)
+                self.interests.append(interest)
+        return self.mask(interests)
+
+    def mask(self, interests) -> int:
+        mask = 0
+        for interest in interests:
+            mask |= self._bits.get(interest.lower(), 0)
+        return mask
+
+    def bit(self, interest: str) -> int:
+        return self._bits.get(interest.lower(), 0)
+
+    def canonical(self, interest: str) -> Optional[str]:
+        bit = self.bit(interest)
+        return self.interests[bit.bit_length() - 1] if bit else None
+
+    def article_mask(self, scores: Dict[str, float], threshold: float = RELEVANCE_THRESHOLD) -> int:
+        """Bitmask of the union interests an article is relevant enough to."""
+        mask = 0
+        for interest, score in scores.items():
+            if score >= threshold:
+                mask |= self.bit(interest)
+        return mask
+
+
+def build_shared_filter_news_node(
+    llm,
+    batch_size: int = FILTER_BATCH_SIZE,
+    prefilter: bool = PREFILTER_ENABLED,
+    cache=verdict_cache if VERDICT_CACHE_ENABLED else None,
+    group_size: int = SHARED_FILTER_GROUP_SIZE,
+):
+    """
+    Build a node that scores news once against the union of many users'
+    interests, given in state["interests"], so the cost grows with the
+    number of distinct interests rather than the number of users. The union
+    is classified in groups of at most group_size interests to keep prompts
+    and replies short. all_news_filtered gets each article's scores for the
+    whole union; user_filter derives every user's matches from them.
+    """
+    filter_node = build_tools_filter_news_node(llm, batch_size, prefilter, cache, top_k=0)
+
+    def node(state: State) -> State:
+        interests = state_interests(state)
+        news = state.get("news", [])
+        scores = [{} for _ in news]
+        stats = dict.fromkeys(("rejected", "accepted", "sent_to_llm", "llm_calls_saved"), 0)
+        for i in range(0, len(interests), group_size):
+            part = filter_node({"interests": interests[i:i + group_size], "news": news})
+            for article_scores, n in zip(scores, part["all_news_filtered"]):
+                article_scores.update(n["relevance_scores"])
+            for key, value in part["prefilter_stats"].items():
+                stats[key] += value
+        state["all_news_filtered"] = [
+            filtered_article(n, article_scores, matched_from_scores(article_scores, interests))
+            for n, article_scores in zip(news, scores)
+        ]
+        state["news"] = []
+        state["prefilter_stats"] = stats
+        if cache:
+            state["verdict_cache_stats"] = cache.stats()
         return state
 
     return node
 
 
+def user_filter(
+    state: State,
+    shared_news: List[dict],
+    union: InterestUnion,
+    masks: Optional[List[int]] = None,
+    top_k: int = DIGEST_TOP_K,
+) -> State:
+    """
+    Filter output for one user from news scored against the union of
+    interests (all_news_filtered of the shared filter node), without any
+    LLM call: the user's matches are the union matches within their bitmask.
+    masks holds each article's union.article_mask, to compute once for all users.
+    """
+    interests = state_interests(state)
+    user_mask = union.mask(interests)
+    if masks is None:
+        masks = [union.article_mask(n.get("relevance_scores") or {}) for n in shared_news]
+    all_news_with_matches = []
+    for n, mask in zip(shared_news, masks):
+        union_scores = n.get("relevance_scores") or {}
+        scores = {i: union_scores.get(union.canonical(i), 0.0) for i in interests}
+        hits = mask & user_mask
+        matched = [i for i in interests if union.bit(i) & hits] if hits else []
+        all_news_with_matches.append(filtered_article(n, scores, matched))
+    return write_filter_output(state, all_news_with_matches, top_k)
+
+
 # ===============================================================================
 # CONTENT SCRAPING AND PROCESSING NODES
 # ===============================================================================
 
-def download_article(url):
-    """Download and parse article content from URL."""
-    try:
-        article = Article(url)
-        article.download()
-        article.parse()
-        return article.text
-    except Exception as e:
-        return None
+def scrape_results_to_state(state: State, results) -> State:
+    """Store scraped content (or attach the failure reason) for each article and record stats."""
+    store = article_store(state)
+    news = state.get("news", [])
+    state["news"] = [scraped_article(n, results[n["url"]], store) if n["url"] in results else n for n in news]
+    state["scrape_stats"] = scrape_stats(len(news), results)
+    return state
+
+
+def scraped_article(n: dict, result, store: ArticleStore) -> dict:
+    """The article referencing its scraped text in the store, or marked with why there is none."""
+    if result.skipped:
+        return {**n, "skipped": "deadline"}
+    if not result.content:
+        return {**n, "scrape_error": result.error}
+    return store.put({**n, "scrape_error": result.error}, result.content)
+
+
+def scrape_stats(total, results):
+    failed = {r.url: r.error for r in results.values() if r.error and not r.skipped}
+    return {
+        "total": total,
+        "ok": sum(1 for r in results.values() if r.content),
+        "cached": sum(1 for r in results.values() if r.cached),
+        "failed": len(failed),
+        "skipped": sum(1 for r in results.values() if r.skipped),
+        "errors": failed,
+    }
+
+
+def scrape_progress(writer, result, done, total):
+    writer({"scrape_progress": {"done": done, "total": total, "url": result.url, "error": result.error}})
 
 
 def scrape_content_node(state: State) -> State:
-    """Scrape full content for each news article."""
-    with ThreadPoolExecutor() as executor:
-        state["news"] = list(executor.map(
-            lambda n: {**n, "content": download_article(n["url"])},
-            state.get("news", [])
-        ))
+    """
+    Scrape full content for each news article, most relevant first,
+    reporting each article as soon as it finishes. Skipped articles are not
+    downloaded, nor are any once the request deadline has passed.
+    """
+    writer = get_stream_writer()
+    urls = list(dict.fromkeys(n["url"] for n in state.get("news", []) if not n.get("skipped")))
+    results = {}
+    for result in scraper.scrape_stream(urls, state.get("deadline")):
+        results[result.url] = result
+        scrape_progress(writer, result, len(results), len(urls))
+    return scrape_results_to_state(state, results)
+
+
+# ===============================================================================
+# CONTENT PREPARATION NODE
+# ===============================================================================
+
+def prepare_content_node(state: State) -> State:
+    """
+    Fit scraped articles to the summarization token budget: strip
+    boilerplate, compress long articles extractively and split the longest
+    ones into chunks for map-reduce summarization.
+    """
+    store = article_store(state)
+    stats = compression_stats()
+    state["news"] = [prepare_article(n, store, stats) for n in state.get("news", [])]
+    state["compression_stats"] = stats
     return state
 
 
+def compression_stats():
+    return {"articles": 0, "compressed": 0, "map_reduce": 0, "tokens_in": 0, "tokens_out": 0}
+
+
+def prepare_article(n: dict, store: ArticleStore, stats) -> dict:
+    """
+    Fit one article's scraped content to the budget, replacing it in the
+    store and counting it in stats; articles without content are unchanged.
+    """
+    original = store.content(n)
+    if not original:
+        return n
+    content, chunks = prepare_content(original)
+    count_prepared(stats, original, content, chunks)
+    return store.put(n, content, chunks)
+
+
+def count_prepared(stats, original: str, content: str, chunks):
+    """Add one prepared article to the compression stats."""
+    stats["articles"] += 1
+    stats["tokens_in"] += approx_tokens(original)
+    stats["tokens_out"] += approx_tokens(content)
+    if chunks:
+        stats["map_reduce"] += 1
+    elif approx_tokens(content) < approx_tokens(original):
+        stats["compressed"] += 1
+
+
+def add_stats(stats, other):
+    for key, value in other.items():
+        stats[key] += value
+
+
 # ===============================================================================
 # ARTICLE SUMMARIZATION NODES
 # ===============================================================================
 
-def summarize_article_stream(llm, text) -> Generator[str, None, None]:
+SUMMARY_PROMPT = "Summarize the following news article in 3-4 sentences, and only output the summary:\n{text}"
+CHUNK_PROMPT = "Summarize this part of a news article in 2-3 sentences, and only output the summary:\n{text}"
+REDUCE_PROMPT = (
+    "The following are summaries of consecutive parts of one news article. "
+    "Combine them into a single summary of 3-4 sentences, and only output the summary:\n{text}"
+)
+
+
+def summary_template(body: ArticleBody) -> str:
+    """Prompt template(s) a summary of this article depends on, for cache keys."""
+    return CHUNK_PROMPT + REDUCE_PROMPT if body.chunks else SUMMARY_PROMPT
+
+
+def summarize_article_stream(llm, text, template=SUMMARY_PROMPT) -> Generator[str, None, None]:
     """Generate streaming summary of an article."""
     try:
         prompt = [
             {
                 "role": "user",
-                "content": f"Summarize the following news article in 3-4 sentences, and only output the summary:\n{text}"
+                "content": template.format(text=text)
             },
         ]
         stream = llm.stream(prompt)
@@ -132,44 +697,248 @@ def summarize_article_stream(llm, text) -> Generator[str, None, None]:
         yield None
 
 
-def build_summarize_node(llm):
-    """Build a node that summarizes articles with streaming output."""
+def chunk_prompts(chunks):
+    return [[{"role": "user", "content": CHUNK_PROMPT.format(text=c)}] for c in chunks]
+
+
+def summarize_chunks_stream(llm, chunks) -> Generator[str, None, None]:
+    """
+    Map-reduce summary of a long article: the chunks are summarized in one
+    batch, then the partial summaries are combined into a streamed summary.
+    Every prompt stays within the token budget of a single chunk.
+    """
+    replies = llm.batch(chunk_prompts(chunks), return_exceptions=True)
+    partials = [r.content for r in replies if not isinstance(r, Exception) and r.content]
+    if not partials:
+        print(f"[DEBUG] Error en summarize_chunks_stream: {replies[0] if replies else 'no chunks'}")
+        yield None
+        return
+    yield from summarize_article_stream(llm, "\n\n".join(partials), REDUCE_PROMPT)
+
+
+SUMMARIZE_MAX_IN_FLIGHT = int(os.environ.get("SUMMARIZE_MAX_IN_FLIGHT", "4"))
+SUMMARY_CACHE_ENABLED = os.environ.get("SUMMARY_CACHE_ENABLED", "1") == "1"
+
+
+STREAM_MAX_FPS = float(os.environ.get("STREAM_MAX_FPS", "10"))
+SUMMARY_ARTICLE_FIELDS = ("title", "source", "url", "alternates")
+
+
+class SummaryProgress:
+    """
+    Tracks partially generated summaries and streams them as deltas.
+    Each writer event is {"summary_delta": {...}} with op "start" (carrying
+    the article's display fields), "append" (new text only) or "done" (the
+    complete summary). Appended tokens are coalesced so that at most
+    max_fps append frames are emitted per second.
+    """
+
+    def __init__(self, news_list, writer, max_fps: float = STREAM_MAX_FPS):
+        self.news_list = news_list
+        self.writer = writer
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.partial = {}  # news_idx -> summary so far, for started articles
+        self.buffered = {}  # news_idx -> text not yet sent
+        self.done = set()
+        self.last_flush = 0.0
+
+    def emit(self, op, news_idx, text):
+        delta = {"op": op, "idx": news_idx, "total": self.total(), "text": text}
+        if op == "start" or (op == "done" and news_idx not in self.partial):
+            n = self.news_list[news_idx]
+            delta["article"] = {k: n.get(k) for k in SUMMARY_ARTICLE_FIELDS}
+        self.writer({"summary_delta": delta})
+
+    def total(self):
+        return len(self.news_list)
+
+    def flush(self):
+        for news_idx, text in self.buffered.items():
+            self.emit("append", news_idx, text)
+        self.buffered.clear()
+        self.last_flush = time.monotonic()
+
+    def add_token(self, news_idx, token):
+        if news_idx not in self.partial:
+            self.emit("start", news_idx, "")
+            self.partial[news_idx] = ""
+        self.partial[news_idx] += token
+        self.buffered[news_idx] = self.buffered.get(news_idx, "") + token
+        if time.monotonic() - self.last_flush >= self.min_interval:
+            self.flush()
+
+    def complete(self, news_idx, summary=None):
+        """Mark an article as summarized, with the given or the streamed text."""
+        if summary is None:
+            summary = self.partial.get(news_idx, "")
+        self.buffered.pop(news_idx, None)
+        self.emit("done", news_idx, summary)
+        self.partial[news_idx] = summary
+        self.news_list[news_idx]["summary"] = summary
+        self.done.add(news_idx)
+
+
+def plan_summaries(progress: SummaryProgress, store: ArticleStore, cache, model_id):
+    """
+    Complete the articles that need no generation (no content or cached
+    summary) and return (news_idx, body, cache_key) for the others.
+    """
+    to_generate = []
+    for news_idx, n in enumerate(progress.news_list):
+        if n.get("skipped"):
+            progress.complete(news_idx, SKIPPED_SUMMARIES[n["skipped"]])
+            continue
+        body = store.body(n)
+        if body is None or not body.content:
+            print(f"[DEBUG] No content for news item {news_idx}: {n['title']}")
+        summary, key = known_summary(body, cache, model_id)
+        if summary is not None:
+            progress.complete(news_idx, summary)
+            continue
+        to_generate.append((news_idx, body, key))
+    return to_generate
+
+
+def known_summary(body: Optional[ArticleBody], cache, model_id):
+    """
+    Return (summary, cache_key). The summary is None unless it needs no
+    generation: the article has no content, or its summary is cached.
+    """
+    if body is None or not body.content:
+        return "Content not available for summary", None
+    key = summary_key(body.content, summary_template(body), model_id)
+    return (cache.get(key) if cache else None), key
+
+
+def generate_summary(llm, body: ArticleBody, key, cache, on_token):
+    """Stream one article's summary into on_token, caching it unless generation failed."""
+    summary, failed = "", False
+    chunks = body.chunks
+    for token in summarize_chunks_stream(llm, chunks) if chunks else summarize_article_stream(llm, body.content):
+        if token is None:
+            failed = True
+            continue
+        summary += token
+        on_token(token)
+    if cache and summary and not failed:
+        cache.put(key, summary)
+
+
+def build_summarize_node(
+    llm,
+    max_in_flight: int = SUMMARIZE_MAX_IN_FLIGHT,
+    cache=summary_cache if SUMMARY_CACHE_ENABLED else None,
+):
+    """
+    Build a node that summarizes articles with streaming output.
+    Up to max_in_flight summaries are generated concurrently; their tokens
+    are interleaved into the stream writer events, tagged with the index of
+    the article they belong to, while partial lists stay in article order.
+    Summaries found in the cache are emitted whole without calling the model.
+    No generation is started once the request deadline has passed.
+    """
+    model_id = getattr(llm, "model_name", None) or ""
+
     def node(state: State):
-        writer = get_stream_writer()
-        completed_summaries = []
-        news_list = state.get("news", [])
-        total_articles = len(news_list)
+        progress = SummaryProgress(state.get("news", []), get_stream_writer())
+        events = Queue()
         
-        for news_idx, n in enumerate(news_list):
-            if not n.get("content"):
-                print(f"[DEBUG] No content for news item {news_idx}: {n['title']}")
-                n["summary"] = "Content not available for summary"
-                completed_summaries.append(n)
-                # Send partial update with total count
-                writer({"partial_summaries": (news_idx, completed_summaries.copy(), total_articles)})
-                continue
-
-            summary = ""
-            for token in summarize_article_stream(llm, n["content"]):
+        def worker(news_idx, body, key):
+            try:
+                if past_deadline(state):
+                    progress.news_list[news_idx]["skipped"] = "deadline"
+                    return
+                generate_summary(llm, body, key, cache, lambda token: events.put((news_idx, token)))
+            finally:
+                events.put((news_idx, None))
+        
+        to_generate = plan_summaries(progress, article_store(state), cache, model_id)
+        with ContextThreadPoolExecutor(max_workers=max(1, max_in_flight)) as executor:
+            for job in to_generate:
+                executor.submit(worker, *job)
+            pending = len(to_generate)
+            while pending:
+                news_idx, token = events.get()
                 if token is None:
-                    continue
-                summary += token
-                # Send partial summary for current article
-                current_partial = n.copy()
-                current_partial["summary"] = summary + "..."
-                temp_summaries = completed_summaries + [current_partial]
-                writer({"partial_summaries": (news_idx, temp_summaries, total_articles)})
-            
-            n["summary"] = summary
-            completed_summaries.append(n)
-            # Send completed summary with total count
-            writer({"partial_summaries": (news_idx, completed_summaries.copy(), total_articles)})
+                    # Stream finished: store the completed summary
+                    skipped = progress.news_list[news_idx].get("skipped")
+                    progress.complete(news_idx, SKIPPED_SUMMARIES[skipped] if skipped else None)
+                    pending -= 1
+                else:
+                    progress.add_token(news_idx, token)
 
         return state
 
     return node
 
 
+# ===============================================================================
+# DIGEST NODES
+# ===============================================================================
+
+DIGEST_ENABLED = os.environ.get("DIGEST_ENABLED", "1") == "1"
+
+
+def serve_digest_node(state: State) -> State:
+    """
+    Serve the precomputed digest for the user's interests, unless a fresh
+    run was requested or there is none yet.
+    """
+    if not DIGEST_ENABLED or state.get("refresh"):
+        return state
+    interests = state_interests(state)
+    if not interests:
+        return state
+    digest = digest_store.get(digest_key(interests))
+    if digest is not None:
+        state["news"] = digest["articles"]
+        state["digest_updated"] = digest["updated"]
+        state["digest_served"] = True
+    return state
+
+
+def route_digest(state: State) -> str:
+    return "served" if state.get("digest_served") else "fetch_news"
+
+
+def skip_seen_news_node(state: State) -> State:
+    """Drop articles the user's digest already processed, so only new ones are classified."""
+    if not DIGEST_ENABLED:
+        return state
+    interests = state_interests(state)
+    digest = digest_store.get(digest_key(interests)) if interests else None
+    news = state.get("news", [])
+    if digest is not None:
+        seen = set(digest["seen"])
+        # Articles without a URL cannot have been seen
+        state["news"] = [n for n in news if not n.get("url") or canonical_url(n["url"]) not in seen]
+    state["digest_stats"] = {"new": len(state.get("news", [])), "skipped": len(news) - len(state.get("news", []))}
+    return state
+
+
+def store_digest_node(state: State) -> State:
+    """
+    Merge the newly summarized articles into the digest and show the whole
+    digest. Matched articles that could not be scraped are not marked as
+    seen, so the next run retries them; the same goes for failed summaries
+    and skipped articles.
+    """
+    if not DIGEST_ENABLED:
+        return state
+    interests = state_interests(state)
+    if not interests:
+        return state
+    store = article_store(state)
+    summarized = [n for n in state.get("news", []) if store.content(n) and n.get("summary") and not n.get("skipped")]
+    retry = {n["url"] for n in state.get("news", [])} - {n["url"] for n in summarized}
+    seen = [canonical_url(n["url"]) for n in state.get("all_news_filtered", []) if n.get("url") and n["url"] not in retry]
+    digest = digest_store.merge(digest_key(interests), summarized, seen)
+    state.setdefault("digest_stats", {})["added"] = len(summarized)
+    state["news"] = digest["articles"]
+    state["digest_updated"] = digest["updated"]
+    return state
+
+
 # ===============================================================================
 # INTEREST MANAGEMENT NODES
 # ===============================================================================
@@ -177,9 +946,10 @@ def build_summarize_node(llm):
 def tool_store_interest_node(state: State) -> State:
     """Add a new interest to the user's interest list."""
     interest = state.get("interest")
+    user_id = state.get("user_id", DEFAULT_USER)
     if interest:
-        add_interest(interest)
-        state["result"] = f"Interest '{interest}' added. Current interests: {load_interests()}"
+        add_interest(interest, user_id)
+        state["result"] = f"Interest '{interest}' added. Current interests: {load_interests(user_id)}"
     else:
         state["result"] = "No interest detected to add."
     return state
@@ -187,7 +957,7 @@ def tool_store_interest_node(state: State) -> State:
 
 def tool_list_interests_node(state: State) -> State:
     """List all current user interests."""
-    interests = load_interests()
+    interests = load_interests(state.get("user_id", DEFAULT_USER))
     if interests:
         state["result"] = "Your current interests: " + ", ".join(interests)
     else:
@@ -198,11 +968,12 @@ def tool_list_interests_node(state: State) -> State:
 def tool_remove_interest_node(state: State) -> State:
     """Remove an interest from the user's interest list."""
     interest = state.get("interest")
+    user_id = state.get("user_id", DEFAULT_USER)
     if interest:
-        interests_before = load_interests()
-        removed = remove_interest(interest)
+        interests_before = load_interests(user_id)
+        removed = remove_interest(interest, user_id)
         if removed:
-            interests_after = load_interests()
+            interests_after = load_interests(user_id)
             state["result"] = f"Interest '{interest}' removed. Current interests: {interests_after}"
         else:
             state["result"] = f"Interest '{interest}' not found in your current interests: {interests_before}"
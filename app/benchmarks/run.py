@@ -0,0 +1,321 @@
+"""
+Offline end-to-end benchmark of the news digest pipeline.
+
+Starts a fake OpenAI-compatible LLM and NewsAPI/article stubs on localhost,
+points the agent at them and drives process_command_stream and its async
+variant at several article counts and concurrency levels, reporting how the
+async path compares with the sync one. Per-stage latency comes from the
+metrics registry filled by make_node.
+
+    cd app && python -m benchmarks.run --articles 10,25 --concurrency 1,4 --output bench.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.stubs import BENCH_INTERESTS, FakeLLMServer, NewsStubServer
+
+BENCH_USER = "bench"
+BENCH_COMMAND = "Show me the news"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", default="10,25", help="Comma-separated article counts")
+    parser.add_argument("--concurrency", default="1,4", help="Comma-separated numbers of concurrent requests")
+    parser.add_argument("--repeat", type=int, default=1, help="Rounds of concurrent requests per cell")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured requests before the first cell")
+    parser.add_argument("--token-latency-ms", type=float, default=2.0, help="Fake LLM delay per generated token")
+    parser.add_argument("--prefill-latency-ms", type=float, default=20.0, help="Fake LLM delay before the first token")
+    parser.add_argument("--article-latency-ms", type=float, default=0.0, help="Article stub delay per page")
+    parser.add_argument("--summary-words", type=int, default=60, help="Length of the fake summaries")
+    parser.add_argument("--article-paragraphs", type=int, default=8, help="Paragraphs per synthetic article")
+    parser.add_argument("--with-caches", action="store_true", help="Keep the verdict, article and summary caches enabled")
+    parser.add_argument("--with-prefilter", action="store_true", help="Enable the lossy n-gram pre-filter")
+    parser.add_argument("--with-digest", action="store_true", help="Serve precomputed digests after the first run")
+    parser.add_argument("--pipelined", action="store_true", help="Run filtering to summarization as one pipeline")
+    parser.add_argument("--modes", default="sync,async", help="Comma-separated handlers to drive: sync, async")
+    parser.add_argument("--trace-memory", action="store_true", help="Also report the tracemalloc peak (slower)")
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the JSON results")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args, llm_server, data_dir):
+    """Point the agent at the stubs. Must run before the agent modules are imported."""
+    cache_flag = "1" if args.with_caches else "0"
+    os.environ.update({
+        "SERVER_URL": llm_server.api_base,
+        "API_KEY": "bench",
+        "MODEL_ID": llm_server.model,
+        "NEWS_API_KEY": "bench",
+        "NEWS_RSS_FEEDS": "",
+        "NEWS_CACHE_TTL": "0",
+        "VERDICT_CACHE_ENABLED": cache_flag,
+        "ARTICLE_CACHE_ENABLED": cache_flag,
+        "SUMMARY_CACHE_ENABLED": cache_flag,
+        "PREFILTER_ENABLED": "1" if args.with_prefilter else "0",
+        "DIGEST_ENABLED": "1" if args.with_digest else "0",
+        "PIPELINE_ENABLED": "1" if args.pipelined else "0",
+    })
+    from services import memory, news
+    from services.verdict_cache import verdict_cache
+    from services.article_cache import article_cache
+    from services.summary_cache import summary_cache
+    from services.digest_store import digest_store
+    from services.checkpoint_store import checkpoint_saver
+    # Keep benchmark interests, cache entries, digests and checkpoints out of app/data
+    memory.store = memory.SQLiteInterestStore(
+        path=os.path.join(data_dir, "interests.sqlite"), legacy_json=None
+    )
+    for cache in (verdict_cache, article_cache, summary_cache, digest_store, checkpoint_saver):
+        if cache is None:
+            continue
+        cache.path = os.path.join(data_dir, os.path.basename(cache.path))
+    for interest in BENCH_INTERESTS:
+        memory.add_interest(interest, BENCH_USER)
+    return news
+
+
+def quantile(values, q):
+    """Nearest-rank quantile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+def consume(stream):
+    """Drain one command stream, timing the first summary update and the end."""
+    started = time.perf_counter()
+    first_summary, updates = None, 0
+    for _, _, _, summaries, _ in stream:
+        updates += 1
+        if summaries and first_summary is None:
+            first_summary = time.perf_counter() - started
+    return {"latency_s": time.perf_counter() - started, "first_summary_s": first_summary, "updates": updates}
+
+
+async def aconsume(stream):
+    """Async variant of consume."""
+    started = time.perf_counter()
+    first_summary, updates = None, 0
+    async for _, _, _, summaries, _ in stream:
+        updates += 1
+        if summaries and first_summary is None:
+            first_summary = time.perf_counter() - started
+    return {"latency_s": time.perf_counter() - started, "first_summary_s": first_summary, "updates": updates}
+
+
+def run_requests(n, concurrency, runner=None):
+    """Run n requests, at most concurrency at a time; async on runner when given."""
+    from agents.agent_graph import process_command_stream, aprocess_command_stream
+    if runner:
+        async def run_all():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def one():
+                async with semaphore:
+                    return await aconsume(aprocess_command_stream(BENCH_COMMAND, BENCH_USER))
+            return await asyncio.gather(*[one() for _ in range(n)])
+        return list(runner.run(run_all()))
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(lambda _: consume(process_command_stream(BENCH_COMMAND, BENCH_USER)), range(n)))
+
+
+def stage_deltas(before, after):
+    """Per-node latency and counters accumulated between two registry snapshots."""
+    stages = {}
+    for node, stats in after.items():
+        prev = before.get(node, {})
+        count = stats.get("count", 0) - prev.get("count", 0)
+        if count <= 0:
+            continue
+        total = stats.get("latency_seconds_sum", 0.0) - prev.get("latency_seconds_sum", 0.0)
+        stage = {"count": count, "mean_ms": round(total / count * 1000, 2)}
+        ttft_count = stats.get("ttft_count", 0) - prev.get("ttft_count", 0)
+        if ttft_count:
+            ttft = stats["ttft_seconds_sum"] - prev.get("ttft_seconds_sum", 0.0)
+            stage["mean_ttft_ms"] = round(ttft / ttft_count * 1000, 2)
+        for name, value in stats.items():
+            if name.endswith("_total"):
+                stage[name] = round(value - prev.get(name, 0), 4)
+        stages[node] = stage
+    return stages
+
+
+def run_cell(args, llm_server, news_server, articles, concurrency, runner=None):
+    from agents import tools, async_tools
+    from services.metrics import registry
+    from services.llm_scheduler import llm_scheduler
+    news_server.article_count = articles
+    tools.NEWS_FETCH_SIZE = async_tools.NEWS_FETCH_SIZE = articles
+
+    # Each cell starts from the initial LLM concurrency limit, so the
+    # modes are not measured on a limit the other one adapted
+    llm_scheduler.reset_adaptation()
+    scheduler = llm_scheduler.stats()
+    before = registry.snapshot()["nodes"]
+    llm_requests = llm_server.requests
+    if args.trace_memory:
+        tracemalloc.reset_peak()
+    n = concurrency * args.repeat
+    started = time.perf_counter()
+    results = run_requests(n, concurrency, runner)
+    elapsed = time.perf_counter() - started
+
+    latencies = [r["latency_s"] for r in results]
+    first = [r["first_summary_s"] for r in results if r["first_summary_s"] is not None]
+    scheduler_after = llm_scheduler.stats()
+    cell = {
+        "mode": "async" if runner else "sync",
+        "articles": articles,
+        "concurrency": concurrency,
+        "requests": n,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(n / elapsed, 4),
+        "articles_per_s": round(n * articles / elapsed, 4),
+        "latency_p50_s": round(quantile(latencies, 0.5), 4),
+        "latency_p95_s": round(quantile(latencies, 0.95), 4),
+        "latency_max_s": round(max(latencies), 4),
+        "first_summary_p50_s": round(quantile(first, 0.5), 4) if first else None,
+        "updates_per_request": round(sum(r["updates"] for r in results) / n, 1),
+        "llm_requests": llm_server.requests - llm_requests,
+        "llm_limit": scheduler_after["limit"],
+        "llm_limit_decreases": scheduler_after["limit_decreases"] - scheduler["limit_decreases"],
+        "llm_wait_s": round(scheduler_after["wait_seconds_total"] - scheduler["wait_seconds_total"], 3),
+        # ru_maxrss is in KiB on Linux and bytes on macOS
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform != "darwin" else 1024 ** 2), 1),
+        "stages": stage_deltas(before, registry.snapshot()["nodes"]),
+    }
+    if args.trace_memory:
+        cell["peak_traced_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 ** 2, 2)
+    return cell
+
+
+def compare_modes(cells):
+    """Async over sync ratios for every article count and concurrency run in both modes."""
+    by_mode = {(c["mode"], c["articles"], c["concurrency"]): c for c in cells}
+    comparisons = []
+    for (mode, articles, concurrency), sync in by_mode.items():
+        async_ = by_mode.get(("async", articles, concurrency))
+        if mode != "sync" or async_ is None:
+            continue
+        comparisons.append({
+            "articles": articles,
+            "concurrency": concurrency,
+            "latency_p50_ratio": round(async_["latency_p50_s"] / sync["latency_p50_s"], 3),
+            "latency_p95_ratio": round(async_["latency_p95_s"] / sync["latency_p95_s"], 3),
+            "throughput_ratio": round(async_["throughput_rps"] / sync["throughput_rps"], 3),
+            "llm_wait_s": {"sync": sync["llm_wait_s"], "async": async_["llm_wait_s"]},
+            "llm_limit": {"sync": sync["llm_limit"], "async": async_["llm_limit"]},
+        })
+    return comparisons
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def print_cells(cells, comparisons, baseline=None):
+    # Results from before the modes were compared ran a single mode
+    base_mode = "async" if (baseline or {}).get("config", {}).get("use_async") else "sync"
+    base = {(c.get("mode", base_mode), c["articles"], c["concurrency"]): c for c in (baseline or {}).get("cells", [])}
+    print(f"{'mode':>5} {'articles':>8} {'conc':>4} {'p50 s':>8} {'p95 s':>8} {'1st sum s':>9} {'req/s':>7} {'art/s':>7}"
+          f" {'rss MB':>7} {'limit':>6} {'wait s':>7}  vs baseline")
+    for c in cells:
+        ref = base.get((c["mode"], c["articles"], c["concurrency"]))
+        delta = f"{c['latency_p50_s'] / ref['latency_p50_s']:.2f}x p50" if ref and ref["latency_p50_s"] else ""
+        first = f"{c['first_summary_p50_s']:.3f}" if c["first_summary_p50_s"] is not None else "-"
+        print(
+            f"{c['mode']:>5} {c['articles']:>8} {c['concurrency']:>4} {c['latency_p50_s']:>8.3f} {c['latency_p95_s']:>8.3f}"
+            f" {first:>9} {c['throughput_rps']:>7.2f} {c['articles_per_s']:>7.1f} {c['peak_rss_mb']:>7.1f}"
+            f" {c['llm_limit']:>6.1f} {c['llm_wait_s']:>7.2f}  {delta}"
+        )
+        for node, stage in c["stages"].items():
+            print(f"{'':>20}{node:<16} {stage['mean_ms']:>9.1f} ms  llm calls {stage.get('llm_calls_total', 0):g}")
+    if comparisons:
+        print(f"{'async vs sync':>14} {'conc':>4} {'p50':>7} {'p95':>7} {'req/s':>7}")
+        for c in comparisons:
+            print(
+                f"{c['articles']:>14} {c['concurrency']:>4} {c['latency_p50_ratio']:>6.2f}x {c['latency_p95_ratio']:>6.2f}x"
+                f" {c['throughput_ratio']:>6.2f}x"
+            )
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    articles = [int(a) for a in args.articles.split(",") if a.strip()]
+    concurrency = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    if set(modes) - {"sync", "async"}:
+        raise SystemExit(f"Unknown modes: {', '.join(sorted(set(modes) - {'sync', 'async'}))}")
+
+    llm_server = FakeLLMServer(
+        token_latency=args.token_latency_ms / 1000,
+        prefill_latency=args.prefill_latency_ms / 1000,
+        summary_words=args.summary_words,
+    ).start()
+    news_server = NewsStubServer(
+        article_count=max(articles), paragraphs=args.article_paragraphs,
+        article_latency=args.article_latency_ms / 1000,
+    ).start()
+    if args.trace_memory:
+        tracemalloc.start()
+    # One event loop for the whole run: the async clients are bound to it
+    runner = asyncio.Runner() if "async" in modes else None
+    runners = {"sync": None, "async": runner}
+    try:
+        with tempfile.TemporaryDirectory() as data_dir:
+            news = configure_environment(args, llm_server, data_dir)
+            news.NEWS_API_URL = news_server.news_api_url
+            if args.warmup:
+                for mode in modes:
+                    run_requests(args.warmup, 1, runners[mode])
+            cells = []
+            for n_articles in articles:
+                for level in concurrency:
+                    for mode in modes:
+                        cells.append(run_cell(args, llm_server, news_server, n_articles, level, runners[mode]))
+                        print(f"[DEBUG] Benchmarked {n_articles} articles at concurrency {level} ({mode})", file=sys.stderr)
+    finally:
+        if runner:
+            runner.close()
+        llm_server.stop()
+        news_server.stop()
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "cells": cells,
+        "async_vs_sync": compare_modes(cells),
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_cells(cells, results["async_vs_sync"], baseline)
+    print(f"Results written to {args.output}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
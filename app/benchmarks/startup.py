@@ -0,0 +1,160 @@
+"""
+Startup profile of the app: import time of the entry modules, measured with
+`python -X importtime` in fresh interpreters, and the time warm-up takes to
+build the LLM client, the graphs and the scraper.
+
+Fails (exit status 1) when a module that must stay lazy is imported eagerly,
+or when an import takes longer than --max-import-seconds, so startup
+regressions are caught before they reach the autoscaled containers.
+
+    cd app && python -m benchmarks.startup --output startup.json --baseline previous.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from benchmarks.run import git_revision
+
+ENTRY_MODULES = "agents.agent_graph,interface.gradio_app"
+# Heavy dependencies only the warm-up step (or the first request) may load
+LAZY_MODULES = ("langchain_openai", "openai", "newspaper")
+
+PROBE = """
+import sys, json, time
+started = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - started, "modules": sorted(sys.modules)}}))
+"""
+
+WARMUP_PROBE = """
+import json
+from agents.agent_graph import app_context
+app_context.warm_up()
+print(json.dumps(app_context.status()))
+"""
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", default=ENTRY_MODULES, help="Comma-separated modules to import")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per module, the fastest counts")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to report per module")
+    parser.add_argument("--skip-warmup", action="store_true", help="Only measure imports")
+    parser.add_argument("--max-import-seconds", type=float, help="Fail when an entry module takes longer")
+    parser.add_argument("--output", default="startup_results.json", help="Where to write the JSON results")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    return parser.parse_args(argv)
+
+
+def probe_environment():
+    """Placeholder LLM settings: building the client never contacts the server."""
+    env = dict(os.environ)
+    env.setdefault("MODEL_ID", "startup-probe")
+    env.setdefault("OPENAI_API_KEY", "startup-probe")
+    # Extraction processes are a warm-up cost of their own, measured separately
+    env.setdefault("SCRAPE_PROCESSES", "0")
+    return env
+
+
+def run_probe(code, env, importtime=False):
+    """Run code in a fresh interpreter from app/, returning its JSON output and stderr."""
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    proc = subprocess.run(
+        command, capture_output=True, text=True, check=True, env=env,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1]), proc.stderr
+
+
+def parse_importtime(stderr):
+    """Map each module to its cumulative import time in seconds, from -X importtime output."""
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total, name = line[len("import time:"):].split("|")
+        if total.strip().isdigit():
+            cumulative[name.strip()] = int(total) / 1e6
+    return cumulative
+
+
+def profile_module(module, args, env):
+    best = None
+    for _ in range(args.repeat):
+        result, stderr = run_probe(PROBE.format(module=module), env, importtime=True)
+        if best is None or result["seconds"] < best[0]["seconds"]:
+            best = (result, stderr)
+    result, stderr = best
+    cumulative = parse_importtime(stderr)
+    slowest = sorted(cumulative.items(), key=lambda item: item[1], reverse=True)
+    return {
+        "module": module,
+        "import_s": round(result["seconds"], 4),
+        "modules_loaded": len(result["modules"]),
+        "eager_lazy_modules": [m for m in LAZY_MODULES if m in result["modules"]],
+        "slowest": [{"module": m, "cumulative_s": round(s, 4)} for m, s in slowest[:args.top]],
+    }
+
+
+def print_results(results, baseline=None):
+    base = {m["module"]: m for m in (baseline or {}).get("imports", [])}
+    for m in results["imports"]:
+        ref = base.get(m["module"])
+        delta = f"  {m['import_s'] / ref['import_s']:.2f}x baseline" if ref and ref["import_s"] else ""
+        print(f"{m['module']:<28} {m['import_s']:>7.3f} s  {m['modules_loaded']:>5} modules{delta}")
+        for entry in m["slowest"]:
+            print(f"{'':>4}{entry['module']:<44} {entry['cumulative_s']:>7.3f} s")
+        if m["eager_lazy_modules"]:
+            print(f"{'':>4}eagerly imported: {', '.join(m['eager_lazy_modules'])}")
+    warmup = results.get("warmup")
+    if warmup:
+        steps = ", ".join(f"{step} {seconds:.3f} s" for step, seconds in warmup["steps"].items())
+        print(f"{'warm-up':<28} {warmup['warmup_seconds'] or 0:>7.3f} s  ({warmup['state']}: {steps})")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    env = probe_environment()
+    modules = [m.strip() for m in args.modules.split(",") if m.strip()]
+
+    imports = []
+    for module in modules:
+        imports.append(profile_module(module, args, env))
+        print(f"[DEBUG] Profiled the import of {module}", file=sys.stderr)
+    warmup = None if args.skip_warmup else run_probe(WARMUP_PROBE, env)[0]
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "imports": imports,
+        "warmup": warmup,
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    print(f"Results written to {args.output}")
+
+    failures = [f"{m['module']} imports {', '.join(m['eager_lazy_modules'])}" for m in imports if m["eager_lazy_modules"]]
+    if args.max_import_seconds is not None:
+        failures += [
+            f"{m['module']} took {m['import_s']:.3f} s" for m in imports if m["import_s"] > args.max_import_seconds
+        ]
+    if warmup and not warmup["ready"]:
+        failures.append(f"warm-up failed: {warmup['error']}")
+    for failure in failures:
+        print(f"[DEBUG] Startup regression: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+import re
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+# Local stand-ins for the vLLM server, NewsAPI and the article sites, so the
+# whole pipeline can be driven offline with deterministic outputs.
+
+BENCH_INTERESTS = ["climate change", "football", "artificial intelligence"]
+# Article topics: exact interest mentions, related wording (which the
+# pre-filter of --with-prefilter sends to the LLM) and unrelated stories
+# (which it rejects)
+TOPICS = [
+    "climate change", "football", "artificial intelligence",
+    "climate policy", "football clubs", "intelligence agencies",
+    "opera", "gardening", "real estate", "astronomy",
+]
+WORDS = (
+    "market council city report record season plan study court river energy "
+    "school budget border museum festival harbor vote storm bridge mayor "
+    "trial island factory rally summit treaty orchestra league harvest"
+).split()
+
+
+def _words(seed, n):
+    """Deterministic pseudo-random words derived from a seed string."""
+    words, counter = [], 0
+    while len(words) < n:
+        digest = hashlib.sha256(f"{seed}:{counter}".encode("utf-8")).digest()
+        words += [WORDS[b % len(WORDS)] for b in digest]
+        counter += 1
+    return words[:n]
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded HTTP server on a free local port, run from a daemon thread."""
+
+    daemon_threads = True
+
+    def __init__(self, handler):
+        super().__init__(("127.0.0.1", 0), handler)
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Like vLLM's server: with Nagle on, a streamed chunk written right after
+    # the headers waits for the client's delayed ACK (~40 ms) on a reused
+    # keep-alive connection, which inflates time to first token
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+# ===============================================================================
+# FAKE OPENAI-COMPATIBLE LLM
+# ===============================================================================
+
+def fake_reply(messages, summary_words=60):
+    """Deterministic reply to the prompts used by the pipeline."""
+    system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    user = messages[-1]["content"] if messages else ""
+    if "JSON list containing one object per article" in system:
+        interests = re.findall(r"^- (.+)$", system, re.M)
+        verdicts = []
+        for idx, body in re.findall(r"^\[(\d+)\] (.*?)(?=^\[\d+\] |\Z)", user, re.M | re.S):
+            verdicts.append({"id": int(idx), "scores": {i: 9 if i.lower() in body.lower() else 1 for i in interests}})
+        return json.dumps(verdicts)
+    if "JSON object mapping each interest to a relevance score" in system:
+        interests = system.split("user interests: ", 1)[1].split(".\n", 1)[0].split(", ")
+        return json.dumps({i: 9 if i.lower() in user.lower() else 1 for i in interests})
+    if "interprets user commands" in system:
+        return '{"action": "fetch_news"}'
+    # Summaries and anything else
+    text = " ".join(_words(user, summary_words))
+    return text[0].upper() + text[1:] + "."
+
+
+class _LLMHandler(_Handler):
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send(200, json.dumps({"object": "list", "data": [{"id": self.server.model, "object": "model"}]}), "application/json")
+        else:
+            self._send(404, "{}", "application/json")
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send(404, "{}", "application/json")
+            return
+        messages = body.get("messages", [])
+        reply = fake_reply(messages, self.server.summary_words)
+        tokens = re.findall(r"\s*\S+", reply)
+        usage = {
+            "prompt_tokens": sum(len(str(m.get("content", "")).split()) for m in messages),
+            "completion_tokens": len(tokens),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        with self.server.lock:
+            self.server.requests += 1
+        time.sleep(self.server.prefill_latency)
+        if body.get("stream"):
+            self._stream(tokens, usage, (body.get("stream_options") or {}).get("include_usage"))
+            return
+        time.sleep(self.server.token_latency * len(tokens))
+        self._send(200, json.dumps({
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": self.server.model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+            "usage": usage,
+        }), "application/json")
+
+    def _stream(self, tokens, usage, include_usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def event(choices, **extra):
+            payload = {
+                "id": "chatcmpl-bench",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": self.server.model,
+                "choices": choices,
+                **extra,
+            }
+            self._chunk(f"data: {json.dumps(payload)}\n\n")
+
+        for i, token in enumerate(tokens):
+            time.sleep(self.server.token_latency)
+            delta = {"role": "assistant", "content": token} if i == 0 else {"content": token}
+            event([{"index": 0, "delta": delta, "finish_reason": None}])
+        event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if include_usage:
+            event([], usage=usage)
+        self._chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+class FakeLLMServer(StubServer):
+    """
+    OpenAI-compatible chat completions endpoint (streaming and not) with
+    configurable prefill and per-token latency.
+    """
+
+    def __init__(self, token_latency=0.0, prefill_latency=0.0, summary_words=60, model="bench-model"):
+        super().__init__(_LLMHandler)
+        self.token_latency = token_latency
+        self.prefill_latency = prefill_latency
+        self.summary_words = summary_words
+        self.model = model
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def api_base(self):
+        return f"{self.url}/v1"
+
+
+# ===============================================================================
+# NEWSAPI AND ARTICLE STUBS
+# ===============================================================================
+
+def synthetic_article(idx, base_url):
+    """NewsAPI-shaped article number idx, linking to the article stub."""
+    topic = TOPICS[idx % len(TOPICS)]
+    words = _words(f"title-{idx}", 6)
+    # Newest first, like NewsAPI
+    published = datetime(2025, 1, 1, tzinfo=timezone.utc) - timedelta(minutes=idx)
+    return {
+        "source": {"id": None, "name": f"Bench Source {idx % 7}"},
+        "title": f"{words[0].title()} {words[1]} {topic} {' '.join(words[2:])} #{idx}",
+        "description": f"A report about {topic}: {' '.join(_words(f'desc-{idx}', 20))}.",
+        "url": f"{base_url}/articles/{idx}",
+        "publishedAt": published.isoformat().replace("+00:00", "Z"),
+    }
+
+
+def _sentence(seed):
+    # The extractor scores paragraphs by stopword density, so the filler
+    # needs to read like prose rather than a bag of nouns
+    a, b, c, d = _words(seed, 4)
+    return f"The {a} said that the {b} would be in the {c} for as long as there was a {d}."
+
+
+def synthetic_html(idx, paragraphs):
+    """Article page with enough paragraphs for the extractor to find a body."""
+    topic = TOPICS[idx % len(TOPICS)]
+    body = "\n".join(
+        f"<p>{' '.join(_sentence(f'para-{idx}-{p}-{s}') for s in range(5))} It is about {topic}.</p>"
+        for p in range(paragraphs)
+    )
+    return (
+        f"<html><head><title>Article {idx}</title></head><body>"
+        f"<article><h1>Article {idx} on {topic}</h1>{body}</article></body></html>"
+    )
+
+
+class _NewsHandler(_Handler):
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == "/v2/top-headlines":
+            query = parse_qs(parts.query)
+            page_size = int(query.get("pageSize", ["20"])[0])
+            page = int(query.get("page", ["1"])[0])
+            start = (page - 1) * page_size
+            idxs = range(start, min(start + page_size, self.server.article_count))
+            self._send(200, json.dumps({
+                "status": "ok",
+                "totalResults": self.server.article_count,
+                "articles": [synthetic_article(i, self.server.url) for i in idxs],
+            }), "application/json")
+        elif parts.path.startswith("/articles/"):
+            time.sleep(self.server.article_latency)
+            idx = int(parts.path.rsplit("/", 1)[1])
+            self._send(200, synthetic_html(idx, self.server.paragraphs), "text/html; charset=utf-8")
+        else:
+            self._send(404, "not found", "text/plain")
+
+
+class NewsStubServer(StubServer):
+    """NewsAPI top-headlines endpoint and synthetic article pages."""
+
+    def __init__(self, article_count=10, paragraphs=8, article_latency=0.0):
+        super().__init__(_NewsHandler)
+        self.article_count = article_count
+        self.paragraphs = paragraphs
+        self.article_latency = article_latency
+
+    @property
+    def news_api_url(self):
+        return f"{self.url}/v2/top-headlines"
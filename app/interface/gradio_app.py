@@ -1,14 +1,26 @@
+import os
+import threading
+import uvicorn
 import gradio as gr
-from agents.agent_graph import process_command_stream
-from services.memory import load_interests
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+from agents.agent_graph import aprocess_command_stream, app_context
+from agents.digest_scheduler import DIGEST_SCHEDULER_ENABLED, DigestScheduler
+from services.memory import DEFAULT_USER
+from services.metrics import registry
+
+WARMUP_ON_START = os.environ.get("WARMUP_ON_START", "1") == "1"
 
 # Streaming interface for news processing
-def chat_interface_stream(message):
+async def chat_interface_stream(message, refresh, request: gr.Request):
+    # Authenticated sessions get their own interests; anonymous ones share the default list
+    user_id = getattr(request, "username", None) or DEFAULT_USER
     last_partial = ""
     last_nodos = ""
     last_filter_info = ""
     last_summaries = ""
-    for partial, visited, news_info, summaries_info in process_command_stream(message):
+    last_timing = ""
+    async for partial, visited, news_info, summaries_info, timing_info in aprocess_command_stream(message, user_id, refresh):
         # Format nodes as a single line separated by arrows
         if visited:
             nodos = ' → '.join(str(n) for n in visited)
@@ -22,14 +34,17 @@ def chat_interface_stream(message):
         # Handle summaries with token-by-token streaming
         if summaries_info:
             last_summaries = summaries_info
+
+        if timing_info:
+            last_timing = timing_info
         
         last_partial = partial if partial else last_partial
         last_nodos = nodos if nodos else last_nodos
         
-        yield nodos + " ⏳", partial, last_filter_info, last_summaries
+        yield nodos + " ⏳", partial, last_filter_info, last_summaries, last_timing
     
     # At the end, make sure to show the last valid content
-    yield last_nodos, last_partial, last_filter_info, last_summaries
+    yield last_nodos, last_partial, last_filter_info, last_summaries, last_timing
 
 with gr.Blocks() as demo:
     gr.Markdown("# Personalized News Agent")
@@ -37,6 +52,8 @@ with gr.Blocks() as demo:
         with gr.Column():
             with gr.Accordion("Visited nodes", open=False):
                 nodos_out = gr.Markdown(label="Nodes visited")
+            with gr.Accordion("Timing", open=False):
+                timing_out = gr.Markdown(label="Per-node timing")
         with gr.Column():
             with gr.Accordion("News filter results", open=False):
                 filter_out = gr.Markdown(label="All News with Match Status")
@@ -51,11 +68,45 @@ with gr.Blocks() as demo:
                 summaries_out = gr.Markdown(label="Summarized Articles")
     
     chat_in = gr.Textbox(lines=1, placeholder="Type a command: Add something to my interests, Show me news...", label='What do you want?')
+    refresh_in = gr.Checkbox(label="Force a fresh news run instead of the precomputed digest", value=False)
     send_btn = gr.Button("Send", variant='primary')
 
-    send_btn.click(chat_interface_stream, inputs=chat_in, outputs=[nodos_out, chat_out, filter_out, summaries_out])
+    send_btn.click(chat_interface_stream, inputs=[chat_in, refresh_in], outputs=[nodos_out, chat_out, filter_out, summaries_out, timing_out])
+
+def build_app() -> FastAPI:
+    """FastAPI app serving the Gradio UI at / and the metrics endpoints."""
+    app = FastAPI()
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def metrics():
+        # Prometheus text exposition format
+        return registry.prometheus()
+
+    @app.get("/metrics.json")
+    def metrics_json():
+        return JSONResponse(registry.snapshot())
+
+    @app.get("/ready")
+    def ready():
+        # 503 until warm-up has built the LLM client, the graphs and the scraper.
+        # Without warm-up everything is built by the first request instead.
+        status = app_context.status()
+        return JSONResponse(status, status_code=200 if status["ready"] or not WARMUP_ON_START else 503)
+
+    return gr.mount_gradio_app(app, demo, path="/")
+
+def start_background():
+    """Warm up the app context, then start precomputing digests."""
+    if WARMUP_ON_START and not app_context.warm_up():
+        return
+    if DIGEST_SCHEDULER_ENABLED:
+        scheduler = DigestScheduler(app_context.graph).start()
+        registry.register_collector("digest_scheduler", scheduler.stats)
 
 def launch():
-    demo.launch(server_name="0.0.0.0")
+    # The server starts accepting requests right away; /ready reports when warm-up is done
+    if WARMUP_ON_START or DIGEST_SCHEDULER_ENABLED:
+        threading.Thread(target=start_background, name="warm-up", daemon=True).start()
+    uvicorn.run(build_app(), host="0.0.0.0", port=7860)
 
 
@@ -1,7 +1,11 @@
+from dotenv import load_dotenv
+
+# Load .env before any module reads its configuration from the environment
+load_dotenv()
+
 from interface.gradio_app import launch
 # from agents.agent_graph import main
 
 if __name__ == "__main__":
     launch()
     # main()
-
@@ -0,0 +1,98 @@
+import os
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+
+ARTICLE_CACHE_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'article_cache.sqlite')
+ARTICLE_CACHE_MAX_BYTES = int(os.environ.get("ARTICLE_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+ARTICLE_CACHE_MAX_AGE = int(os.environ.get("ARTICLE_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+
+
+class ArticleCache:
+    """
+    Content-addressed on-disk cache of scraped article text.
+    Extracted text is stored zlib-compressed once per content hash; each URL
+    points at its text together with the ETag/Last-Modified validators of the
+    response it was parsed from. Entries unused for `max_age` seconds are
+    dropped, and the least recently used URLs are evicted while the stored
+    text exceeds `max_bytes`.
+    """
+
+    def __init__(self, path=ARTICLE_CACHE_FILE, max_bytes=ARTICLE_CACHE_MAX_BYTES, max_age=ARTICLE_CACHE_MAX_AGE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                " hash TEXT PRIMARY KEY,"
+                " data BLOB NOT NULL,"
+                " size INTEGER NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS urls ("
+                " url TEXT PRIMARY KEY,"
+                " hash TEXT NOT NULL,"
+                " etag TEXT,"
+                " last_modified TEXT,"
+                " used_at REAL NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS urls_used_at ON urls (used_at);"
+            )
+        return self._conn
+
+    def get(self, url):
+        """Return (text, etag, last_modified) for a cached URL, or None."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT b.data, u.etag, u.last_modified FROM urls u JOIN blobs b ON b.hash = u.hash"
+                " WHERE u.url = ? AND u.used_at >= ?",
+                (url, time.time() - self.max_age),
+            ).fetchone()
+        if row is None:
+            return None
+        data, etag, last_modified = row
+        return zlib.decompress(data).decode("utf-8"), etag, last_modified
+
+    def touch(self, url):
+        """Mark a URL as still valid, e.g. after a 304 Not Modified."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("UPDATE urls SET used_at = ? WHERE url = ?", (time.time(), url))
+            conn.commit()
+
+    def put(self, url, text, etag=None, last_modified=None):
+        """Store the extracted text of a URL and enforce the age and size bounds."""
+        raw = text.encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        data = zlib.compress(raw)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("INSERT OR IGNORE INTO blobs VALUES (?, ?, ?)", (digest, data, len(data)))
+            conn.execute(
+                "INSERT OR REPLACE INTO urls VALUES (?, ?, ?, ?, ?)",
+                (url, digest, etag, last_modified, now),
+            )
+            conn.execute("DELETE FROM urls WHERE used_at < ?", (now - self.max_age,))
+            self._evict_orphans(conn)
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            while total > self.max_bytes:
+                oldest = conn.execute("SELECT url FROM urls ORDER BY used_at LIMIT 1").fetchone()
+                if oldest is None:
+                    break
+                conn.execute("DELETE FROM urls WHERE url = ?", oldest)
+                self._evict_orphans(conn)
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            conn.commit()
+
+    @staticmethod
+    def _evict_orphans(conn):
+        conn.execute("DELETE FROM blobs WHERE hash NOT IN (SELECT hash FROM urls)")
+
+
+article_cache = ArticleCache()
@@ -0,0 +1,79 @@
+import itertools
+import threading
+from typing import Dict, List, Optional
+
+
+class ArticleBody:
+    """Out-of-band text of one article: its scraped (then prepared) content and summarization chunks."""
+
+    __slots__ = ("content", "chunks")
+
+    def __init__(self, content: Optional[str], chunks: Optional[List[str]] = None):
+        self.content = content
+        self.chunks = chunks
+
+
+class ArticleStore:
+    """
+    Per-run store of article bodies. The article dicts in the graph state
+    only carry the small fields (title, url, source, description and the
+    per-stage verdicts) plus an "id" into this store; the scraped text and
+    its chunks stay here, so neither copying an article dict nor emitting
+    the state after every node carries them along.
+    """
+
+    def __init__(self, bodies: Optional[Dict[int, dict]] = None):
+        self._bodies: Dict[int, ArticleBody] = {
+            int(article_id): ArticleBody(fields.get("content"), fields.get("chunks"))
+            for article_id, fields in (bodies or {}).items()
+        }
+        self._ids = itertools.count(max(self._bodies, default=-1) + 1)
+        self._lock = threading.Lock()
+
+    def put(self, n: dict, content: Optional[str], chunks: Optional[List[str]] = None) -> dict:
+        """Store (or replace) an article's body. Returns the article dict with its id."""
+        with self._lock:
+            article_id = n.get("id")
+            if article_id not in self._bodies:
+                article_id = next(self._ids)
+            self._bodies[article_id] = ArticleBody(content, chunks)
+        return n if n.get("id") == article_id else {**n, "id": article_id}
+
+    def body(self, n: dict) -> Optional[ArticleBody]:
+        return self._bodies.get(n.get("id"))
+
+    def content(self, n: dict) -> Optional[str]:
+        body = self.body(n)
+        return body.content if body else None
+
+    def chunks(self, n: dict) -> Optional[List[str]]:
+        body = self.body(n)
+        return body.chunks if body else None
+
+    def __len__(self):
+        return len(self._bodies)
+
+    def _asdict(self) -> dict:
+        """
+        Plain constructor arguments, id -> {"content", "chunks"}: the
+        checkpoint serializer stores them and rebuilds the store with
+        ArticleStore(**fields) on load.
+        """
+        with self._lock:
+            return {"bodies": {i: {"content": b.content, "chunks": b.chunks} for i, b in self._bodies.items()}}
+
+    def stats(self) -> dict:
+        with self._lock:
+            bodies = list(self._bodies.values())
+        return {
+            "articles": len(bodies),
+            "chars": sum(len(b.content or "") + sum(len(c) for c in b.chunks or ()) for b in bodies),
+        }
+
+
+def article_store(state) -> ArticleStore:
+    """The run's article store, created on first use."""
+    store = state.get("article_store")
+    if store is None:
+        store = state["article_store"] = ArticleStore()
+    return store
@@ -0,0 +1,266 @@
+import os
+import time
+import asyncio
+import sqlite3
+import threading
+
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+CHECKPOINT_ENABLED = os.environ.get("CHECKPOINT_ENABLED", "1") == "1"
+CHECKPOINT_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'checkpoints.sqlite')
+CHECKPOINT_TTL = int(os.environ.get("CHECKPOINT_TTL", "3600"))
+CHECKPOINT_MAX_THREADS = int(os.environ.get("CHECKPOINT_MAX_THREADS", "200"))
+# Nodes update lists and article dicts of the state in place, so each
+# checkpoint must be written before the next node starts
+CHECKPOINT_DURABILITY = "sync"
+
+
+def thread_config(thread_id: str) -> dict:
+    """Run config selecting a checkpointed thread."""
+    return {"configurable": {"thread_id": thread_id}}
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver):
+    """
+    LangGraph checkpointer storing graph runs in a local SQLite file, so a
+    run that fails or loses its client midway can be resumed from the last
+    completed node by invoking the graph again on the same thread.
+
+    Only the latest checkpoint of each thread is kept (the graph has no
+    delta channels, so nothing needs the older ones), threads idle for
+    longer than `ttl` seconds are dropped (and never resumed, even before
+    the next save prunes them), and beyond `max_threads` the least recently
+    updated threads are evicted, which bounds the file.
+    Checkpoints are msgpack-encoded, never pickled; the article store is
+    the only state class they may rebuild on load.
+    """
+
+    def __init__(self, path=CHECKPOINT_FILE, ttl=CHECKPOINT_TTL, max_threads=CHECKPOINT_MAX_THREADS):
+        super().__init__(serde=JsonPlusSerializer(allowed_msgpack_modules=[("services.article_store", "ArticleStore")]))
+        self.path = path
+        self.ttl = ttl
+        self.max_threads = max_threads
+        self.saved = 0
+        self.pruned = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                " thread_id TEXT NOT NULL,"
+                " checkpoint_ns TEXT NOT NULL,"
+                " checkpoint_id TEXT NOT NULL,"
+                " parent_id TEXT,"
+                " type TEXT NOT NULL,"
+                " checkpoint BLOB NOT NULL,"
+                " metadata_type TEXT NOT NULL,"
+                " metadata BLOB NOT NULL,"
+                " saved_at REAL NOT NULL,"
+                " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS writes ("
+                " thread_id TEXT NOT NULL,"
+                " checkpoint_ns TEXT NOT NULL,"
+                " checkpoint_id TEXT NOT NULL,"
+                " task_id TEXT NOT NULL,"
+                " idx INTEGER NOT NULL,"
+                " channel TEXT NOT NULL,"
+                " type TEXT NOT NULL,"
+                " value BLOB NOT NULL,"
+                " task_path TEXT NOT NULL,"
+                " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS checkpoints_saved_at ON checkpoints (saved_at)")
+        return self._conn
+
+    def _tuple(self, conn, row) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata = row
+        writes = conn.execute(
+            "SELECT task_id, idx, channel, type, value, task_path FROM writes"
+            " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        writes.sort(key=lambda w: writes_sort_key(w[5], w[0], w[1]))
+        config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}}
+        return CheckpointTuple(
+            config={"configurable": {**config["configurable"], "checkpoint_id": checkpoint_id}},
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config={"configurable": {**config["configurable"], "checkpoint_id": parent_id}} if parent_id else None,
+            pending_writes=[(task_id, channel, self.serde.loads_typed((t, v))) for task_id, _, channel, t, v, _ in writes],
+        )
+
+    def get_tuple(self, config):
+        """The requested checkpoint of a thread, or its latest one, unless idle for longer than the TTL."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_id, type, checkpoint, metadata_type, metadata,"
+            " saved_at FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+        )
+        params = (thread_id, checkpoint_ns)
+        if checkpoint_id := get_checkpoint_id(config):
+            query += " AND checkpoint_id = ?"
+            params += (checkpoint_id,)
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(query + " ORDER BY checkpoint_id DESC LIMIT 1", params).fetchone()
+            if row is None:
+                return None
+            if row[-1] < time.time() - self.ttl:
+                # Expired: its news, summaries and interests are stale, so start the thread over
+                self._drop_locked(conn, thread_id)
+                return None
+            try:
+                return self._tuple(conn, row[:-1])
+            except NotImplementedError as e:
+                # Written by an older version (pickled): start the thread over
+                print(f"[DEBUG] Dropping unreadable checkpoint of {thread_id}: {e}")
+                self._drop_locked(conn, thread_id)
+                return None
+
+    def _drop_locked(self, conn, thread_id):
+        for table in ("checkpoints", "writes"):
+            conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+        conn.commit()
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        """Checkpoints matching the config and metadata filter, newest first."""
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_id, type, checkpoint, metadata_type, metadata"
+            " FROM checkpoints WHERE 1 = 1"
+        )
+        params = ()
+        if config:
+            query += " AND thread_id = ?"
+            params += (config["configurable"]["thread_id"],)
+            if config["configurable"].get("checkpoint_ns") is not None:
+                query += " AND checkpoint_ns = ?"
+                params += (config["configurable"]["checkpoint_ns"],)
+            if checkpoint_id := get_checkpoint_id(config):
+                query += " AND checkpoint_id = ?"
+                params += (checkpoint_id,)
+        if before and (before_id := get_checkpoint_id(before)):
+            query += " AND checkpoint_id < ?"
+            params += (before_id,)
+        with self._lock:
+            conn = self._connect()
+            tuples = []
+            for row in conn.execute(query + " ORDER BY checkpoint_id DESC", params).fetchall():
+                if limit is not None and len(tuples) >= limit:
+                    break
+                item = self._tuple(conn, row)
+                if filter and not all(item.metadata.get(k) == v for k, v in filter.items()):
+                    continue
+                tuples.append(item)
+        yield from tuples
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        """Save a checkpoint, replacing the thread's previous ones, and prune old threads."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, data = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_data = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                 type_, data, metadata_type, metadata_data, now),
+            )
+            for table in ("checkpoints", "writes"):
+                conn.execute(
+                    f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+                    (thread_id, checkpoint_ns, checkpoint["id"]),
+                )
+            self._prune(conn, now)
+            conn.commit()
+            self.saved += 1
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        """Save the writes of a task so a resumed run does not redo it."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            idx = WRITES_IDX_MAP.get(channel, idx)
+            rows.append((idx >= 0, (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel,
+                                    *self.serde.dumps_typed(value), task_path)))
+        with self._lock:
+            conn = self._connect()
+            for keep_first, row in rows:
+                # Regular writes are saved once; special ones (errors, interrupts) are replaced
+                verb = "INSERT OR IGNORE" if keep_first else "INSERT OR REPLACE"
+                conn.execute(f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+            conn.commit()
+
+    def delete_thread(self, thread_id):
+        """Drop a thread's checkpoints and writes."""
+        with self._lock:
+            conn = self._connect()
+            for table in ("checkpoints", "writes"):
+                conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            conn.commit()
+
+    def _prune(self, conn, now):
+        """Drop threads idle for longer than the TTL, then the oldest ones over max_threads."""
+        stale = [r[0] for r in conn.execute(
+            "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(saved_at) < ?", (now - self.ttl,)
+        )]
+        overflow = conn.execute("SELECT COUNT(DISTINCT thread_id) FROM checkpoints").fetchone()[0] - len(stale) - self.max_threads
+        if overflow > 0:
+            stale += [r[0] for r in conn.execute(
+                "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(saved_at) >= ?"
+                " ORDER BY MAX(saved_at) LIMIT ?", (now - self.ttl, overflow),
+            )]
+        for thread_id in stale:
+            for table in ("checkpoints", "writes"):
+                conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+        self.pruned += len(stale)
+
+    async def aget_tuple(self, config):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        tuples = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in tuples:
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id):
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def stats(self):
+        """Saved checkpoints, pruned threads and current size."""
+        with self._lock:
+            conn = self._connect()
+            threads = conn.execute("SELECT COUNT(DISTINCT thread_id) FROM checkpoints").fetchone()[0]
+            size = conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(checkpoint)), 0) + (SELECT COALESCE(SUM(LENGTH(value)), 0) FROM writes)"
+                " FROM checkpoints"
+            ).fetchone()[0]
+        return {"saved": self.saved, "pruned_threads": self.pruned, "threads": threads, "bytes": size,
+                "max_threads": self.max_threads}
+
+
+checkpoint_saver = SqliteCheckpointSaver() if CHECKPOINT_ENABLED else None
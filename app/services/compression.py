@@ -0,0 +1,134 @@
+import os
+import re
+import zlib
+import numpy as np
+
+CHARS_PER_TOKEN = 4
+SUMMARY_INPUT_TOKENS = int(os.environ.get("SUMMARY_INPUT_TOKENS", "1200"))
+SUMMARY_MAP_REDUCE_RATIO = float(os.environ.get("SUMMARY_MAP_REDUCE_RATIO", "3"))
+SUMMARY_MAX_CHUNKS = int(os.environ.get("SUMMARY_MAX_CHUNKS", "4"))
+POSITION_WEIGHT = 0.3
+SENTENCE_DIM = 2 ** 12
+
+_WORD_RE = re.compile(r"\w+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?”\"])\s+(?=[A-Z0-9“\"])")
+# Paragraphs that are page furniture rather than article text
+_BOILERPLATE_RE = re.compile(
+    r"^(advertisement|advert|sponsored( content)?|related( articles| stories)?:?|read more\b.*"
+    r"|(sign up|subscribe)\b.*|follow us\b.*|share (this|on)\b.*|click here\b.*"
+    r"|(image|photo|video|picture)( credit)?:.*|(copyright|©).*|all rights reserved.*"
+    r"|we use cookies\b.*|listen to (this|the) article.*|\d+ min(ute)? read)$",
+    re.I,
+)
+
+
+def approx_tokens(text):
+    """Cheap token estimate, close enough for budgeting prompts."""
+    return -(-len(text or "") // CHARS_PER_TOKEN)
+
+
+def strip_boilerplate(text):
+    """Drop boilerplate and repeated paragraphs from extracted article text."""
+    seen = set()
+    paragraphs = []
+    for paragraph in (text or "").split("\n"):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph or _BOILERPLATE_RE.match(paragraph):
+            continue
+        key = paragraph.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        paragraphs.append(paragraph)
+    return "\n".join(paragraphs)
+
+
+def split_sentences(text):
+    """Split text into sentences, keeping paragraph boundaries as splits."""
+    return [s for paragraph in text.split("\n") for s in _SENTENCE_RE.split(paragraph) if s.strip()]
+
+
+def _sentence_matrix(sentences):
+    """TF-IDF weighted, L2-normalized hashed bag-of-words rows."""
+    counts = np.zeros((len(sentences), SENTENCE_DIM), dtype=np.float32)
+    for row, sentence in enumerate(sentences):
+        for word in _WORD_RE.findall(sentence.lower()):
+            counts[row, zlib.crc32(word.encode("utf-8")) % SENTENCE_DIM] += 1.0
+    idf = np.log((1 + len(sentences)) / (1 + (counts > 0).sum(axis=0))) + 1.0
+    weighted = counts * idf
+    return weighted / np.maximum(np.linalg.norm(weighted, axis=1, keepdims=True), 1e-9)
+
+
+def rank_sentences(sentences):
+    """
+    Score sentences by centrality (cosine similarity to the document
+    centroid) plus a lead bias, since news puts the key facts first.
+    """
+    if not sentences:
+        return np.zeros(0)
+    matrix = _sentence_matrix(sentences)
+    centroid = matrix.mean(axis=0)
+    centrality = matrix @ (centroid / max(np.linalg.norm(centroid), 1e-9))
+    position = 1.0 / (1.0 + np.arange(len(sentences)))
+    return centrality + POSITION_WEIGHT * position
+
+
+def compress(text, budget=SUMMARY_INPUT_TOKENS):
+    """
+    Extractive compression: keep the best-ranked sentences that fit the
+    token budget, in their original order. Text within budget is returned
+    unchanged.
+    """
+    if approx_tokens(text) <= budget:
+        return text
+    sentences = split_sentences(text)
+    scores = rank_sentences(sentences)
+    kept, used = [], 0
+    for idx in np.argsort(-scores, kind="stable"):
+        cost = approx_tokens(sentences[idx]) + 1
+        if used + cost > budget:
+            continue
+        kept.append(idx)
+        used += cost
+    if not kept:
+        # A single sentence longer than the budget: truncate it
+        return sentences[0][:budget * CHARS_PER_TOKEN] if sentences else ""
+    return " ".join(sentences[idx] for idx in sorted(kept))
+
+
+def chunk(text, budget=SUMMARY_INPUT_TOKENS, max_chunks=SUMMARY_MAX_CHUNKS):
+    """
+    Split text into at most max_chunks consecutive parts of whole sentences,
+    each compressed to fit the budget.
+    """
+    sentences = split_sentences(text)
+    n_chunks = max(1, min(max_chunks, -(-approx_tokens(text) // budget)))
+    target = -(-sum(approx_tokens(s) + 1 for s in sentences) // n_chunks)
+    chunks, current, size = [], [], 0
+    for sentence in sentences:
+        cost = approx_tokens(sentence) + 1
+        if current and size + cost > target and len(chunks) < n_chunks - 1:
+            chunks.append(" ".join(current))
+            current, size = [], 0
+        current.append(sentence)
+        size += cost
+    if current:
+        chunks.append(" ".join(current))
+    return [compress(c, budget) for c in chunks]
+
+
+def prepare_content(text, budget=SUMMARY_INPUT_TOKENS, map_reduce_ratio=SUMMARY_MAP_REDUCE_RATIO, max_chunks=SUMMARY_MAX_CHUNKS):
+    """
+    Fit article text to the summarization budget.
+    Returns (content, chunks): chunks is None when the (possibly compressed)
+    content fits one prompt, or the list of per-chunk texts when the source
+    is long enough to be summarized with map-reduce.
+    """
+    text = strip_boilerplate(text)
+    tokens = approx_tokens(text)
+    if tokens <= budget:
+        return text, None
+    if tokens <= budget * map_reduce_ratio or max_chunks < 2:
+        return compress(text, budget), None
+    chunks = chunk(text, budget, max_chunks)
+    return "\n\n".join(chunks), chunks
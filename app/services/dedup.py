@@ -0,0 +1,67 @@
+import os
+import re
+import hashlib
+
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 8
+DEDUP_MAX_DISTANCE = int(os.environ.get("DEDUP_MAX_DISTANCE", "6"))
+
+_WORD_RE = re.compile(r"\w+")
+# Trailing " - Reuters" / " | AP News" style source attributions in headlines
+_SOURCE_SUFFIX_RE = re.compile(r"\s+[-|\u2013\u2014]\s+[^-|\u2013\u2014]{1,40}$")
+
+
+def normalize_headline(title):
+    """Strip the source attribution that outlets append to syndicated headlines."""
+    return _SOURCE_SUFFIX_RE.sub("", title or "")
+
+
+def _features(text):
+    """Character trigrams of the lowercased, whitespace-normalized words."""
+    text = " ".join(_WORD_RE.findall(text.lower()))
+    return [text[i:i + 3] for i in range(max(1, len(text) - 2))]
+
+
+def simhash(text):
+    """64-bit SimHash of a text's character trigrams."""
+    weights = [0] * SIMHASH_BITS
+    for feature in _features(text):
+        h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if weights[bit] > 0)
+
+
+def cluster_near_duplicates(texts, max_distance=DEDUP_MAX_DISTANCE):
+    """
+    Group texts whose SimHash signatures differ in at most max_distance bits.
+    Signatures are split into SIMHASH_BANDS bands (more than max_distance, so
+    any such pair shares at least one band) and only texts sharing a band are
+    compared, so the work grows with the number of candidates rather than
+    with all pairs. Returns clusters as lists of positions, in input order.
+    """
+    band_bits = SIMHASH_BITS // SIMHASH_BANDS
+    mask = (1 << band_bits) - 1
+    signatures = [simhash(t) for t in texts]
+    parent = list(range(len(texts)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    buckets = {}
+    for idx, sig in enumerate(signatures):
+        for band in range(SIMHASH_BANDS):
+            buckets.setdefault((band, sig >> (band * band_bits) & mask), []).append(idx)
+    for members in buckets.values():
+        for pos, i in enumerate(members):
+            for j in members[pos + 1:]:
+                if find(i) != find(j) and bin(signatures[i] ^ signatures[j]).count("1") <= max_distance:
+                    parent[find(j)] = find(i)
+
+    clusters = {}
+    for idx in range(len(texts)):
+        clusters.setdefault(find(idx), []).append(idx)
+    return sorted(clusters.values(), key=lambda c: c[0])
@@ -0,0 +1,78 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+DIGEST_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'digests.sqlite')
+DIGEST_MAX_ARTICLES = int(os.environ.get("DIGEST_MAX_ARTICLES", "30"))
+DIGEST_MAX_SEEN = 2000
+DIGEST_ARTICLE_FIELDS = ("title", "source", "url", "alternates", "summary", "matched_interests", "relevance")
+
+
+def digest_key(interests):
+    """Digests are shared by every user with the same interest set."""
+    return json.dumps(sorted({i.lower() for i in interests}))
+
+
+class DigestStore:
+    """
+    Persistent precomputed digests, one per interest set, stored in SQLite.
+    A digest keeps its summarized articles newest first, bounded by
+    `max_articles`, plus the URLs already processed (matched or not) so
+    later runs only classify and summarize new articles.
+    """
+
+    def __init__(self, path=DIGEST_FILE, max_articles=DIGEST_MAX_ARTICLES, max_seen=DIGEST_MAX_SEEN):
+        self.path = path
+        self.max_articles = max_articles
+        self.max_seen = max_seen
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS digests ("
+                " key TEXT PRIMARY KEY,"
+                " articles TEXT NOT NULL,"
+                " seen TEXT NOT NULL,"
+                " updated REAL NOT NULL)"
+            )
+        return self._conn
+
+    def _get(self, key):
+        row = self._connect().execute("SELECT articles, seen, updated FROM digests WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return {"articles": json.loads(row[0]), "seen": json.loads(row[1]), "updated": row[2]}
+
+    def get(self, key):
+        """Return {"articles", "seen", "updated"} for an interest set, or None."""
+        with self._lock:
+            return self._get(key)
+
+    def merge(self, key, articles, seen_urls):
+        """
+        Add newly summarized articles in front of the stored ones, record the
+        processed URLs and return the updated digest.
+        """
+        now = time.time()
+        with self._lock:
+            digest = self._get(key) or {"articles": [], "seen": []}
+            added = [{**{f: a.get(f) for f in DIGEST_ARTICLE_FIELDS}, "added": now} for a in articles]
+            urls = {a["url"] for a in added}
+            merged = (added + [a for a in digest["articles"] if a["url"] not in urls])[:self.max_articles]
+            seen_set = set(seen_urls)
+            seen = ([u for u in digest["seen"] if u not in seen_set] + list(seen_urls))[-self.max_seen:]
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?)",
+                (key, json.dumps(merged), json.dumps(seen), now),
+            )
+            conn.commit()
+        return {"articles": merged, "seen": seen, "updated": now}
+
+
+digest_store = DigestStore()
@@ -0,0 +1,355 @@
+import os
+import sys
+import time
+import heapq
+import random
+import asyncio
+import itertools
+import threading
+import httpx
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+
+LLM_INITIAL_CONCURRENCY = int(os.environ.get("LLM_INITIAL_CONCURRENCY", "8"))
+LLM_MIN_CONCURRENCY = int(os.environ.get("LLM_MIN_CONCURRENCY", "1"))
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "32"))
+LLM_LATENCY_TOLERANCE = float(os.environ.get("LLM_LATENCY_TOLERANCE", "2.0"))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_DELAY = float(os.environ.get("LLM_RETRY_BASE_DELAY", "0.5"))
+DECREASE_FACTOR = 0.7
+# The latency baseline drifts up 1% per sample, so it follows lasting changes
+BASELINE_DRIFT = 1.01
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_SUMMARY = 1
+PRIORITY_BULK = 2
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_SUMMARY: "summary", PRIORITY_BULK: "bulk"}
+
+
+def is_retryable(error):
+    """Rate limiting, server errors and dropped connections are worth retrying."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    # openai is only loaded once an LLM client exists, so it is not imported here
+    openai = sys.modules.get("openai")
+    if openai is not None and isinstance(error, openai.APIConnectionError):
+        return True
+    return isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError))
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "event", "loop", "future", "active", "enqueued")
+
+    def __init__(self, priority, seq, event=None, loop=None, future=None):
+        self.priority = priority
+        self.seq = seq
+        self.event = event
+        self.loop = loop
+        self.future = future
+        self.active = True
+        self.enqueued = time.perf_counter()
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class LLMScheduler:
+    """
+    Process-wide admission control for requests to the LLM server.
+    At most `limit` requests are in flight; waiting requests are admitted by
+    priority class, then arrival order, from threads and event loops alike.
+    The limit adapts AIMD-style: it grows by 1/limit per request answered
+    within `latency_tolerance` times the best latency seen for that kind of
+    call, and shrinks multiplicatively (at most once per latency window) when
+    latency degrades or the server throttles. Rate limits, 5xx responses and
+    connection errors are retried with jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = LLM_INITIAL_CONCURRENCY,
+        min_limit: int = LLM_MIN_CONCURRENCY,
+        max_limit: int = LLM_MAX_CONCURRENCY,
+        latency_tolerance: float = LLM_LATENCY_TOLERANCE,
+        max_retries: int = LLM_MAX_RETRIES,
+        retry_base_delay: float = LLM_RETRY_BASE_DELAY,
+    ):
+        self.initial_limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self.limit = self.initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.in_flight = 0
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.decreases = 0
+        self.wait_seconds = 0.0
+        self._lock = threading.Lock()
+        self._waiters = []
+        self._seq = itertools.count()
+        self._baselines = {}
+        self._last_decrease = 0.0
+
+    def bind(self, llm, priority: int):
+        """Wrap a chat model so all its calls go through this scheduler."""
+        return ScheduledLLM(llm, self, priority)
+
+    # Admission ---------------------------------------------------------------
+
+    def _admit_locked(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = heapq.heappop(self._waiters)
+            if not waiter.active:
+                continue
+            waiter.active = False
+            self.in_flight += 1
+            self.wait_seconds += time.perf_counter() - waiter.enqueued
+            if waiter.event is not None:
+                waiter.event.set()
+            else:
+                try:
+                    waiter.loop.call_soon_threadsafe(self._wake, waiter.future)
+                except RuntimeError:
+                    # The waiting loop is closed; nobody will use the slot
+                    self.in_flight -= 1
+
+    def _wake(self, future):
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def _enqueue_locked(self, priority, **kwargs):
+        if self.in_flight < int(self.limit) and not any(w.active for w in self._waiters):
+            self.in_flight += 1
+            return None
+        waiter = _Waiter(priority, next(self._seq), **kwargs)
+        heapq.heappush(self._waiters, waiter)
+        return waiter
+
+    def acquire(self, priority: int):
+        with self._lock:
+            waiter = self._enqueue_locked(priority, event=threading.Event())
+        if waiter is not None:
+            waiter.event.wait()
+
+    async def aacquire(self, priority: int):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            waiter = self._enqueue_locked(priority, loop=loop, future=loop.create_future())
+        if waiter is None:
+            return
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = not waiter.active
+                waiter.active = False
+            # A slot granted just before the cancellation must be handed back
+            if granted and waiter.future.done() and not waiter.future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            self._admit_locked()
+
+    # Adaptation --------------------------------------------------------------
+
+    def _decrease_locked(self, window):
+        now = time.monotonic()
+        if now - self._last_decrease < window:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit * DECREASE_FACTOR)
+        self.decreases += 1
+
+    def observe(self, kind: str, latency: float):
+        """Feed one successful call's latency into the limit."""
+        with self._lock:
+            self.requests += 1
+            baseline = min(latency, self._baselines.get(kind, latency) * BASELINE_DRIFT)
+            self._baselines[kind] = baseline
+            if latency > baseline * self.latency_tolerance:
+                self._decrease_locked(latency)
+            else:
+                self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            self._admit_locked()
+
+    def reset_adaptation(self):
+        """Forget the learned limit and latency baselines, keeping the counters."""
+        with self._lock:
+            self.limit = self.initial_limit
+            self._baselines.clear()
+            self._last_decrease = 0.0
+            self._admit_locked()
+
+    def observe_error(self, error, latency: float) -> bool:
+        """Record a failed call; returns whether it should be retried."""
+        retryable = is_retryable(error)
+        with self._lock:
+            if retryable:
+                self.throttled += 1
+                self._decrease_locked(latency)
+        return retryable
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay."""
+        return random.uniform(0, self.retry_base_delay * 2 ** attempt)
+
+    # Calls -------------------------------------------------------------------
+
+    def call(self, fn, priority: int, kind: str):
+        for attempt in range(self.max_retries + 1):
+            self.acquire(priority)
+            started = time.perf_counter()
+            try:
+                result = fn()
+            except Exception as e:
+                self.release()
+                if not self.observe_error(e, time.perf_counter() - started) or attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                time.sleep(self.backoff(attempt))
+                continue
+            self.release()
+            self.observe(kind, time.perf_counter() - started)
+            return result
+
+    async def acall(self, fn, priority: int, kind: str):
+        for attempt in range(self.max_retries + 1):
+            await self.aacquire(priority)
+            started = time.perf_counter()
+            try:
+                result = await fn()
+            except Exception as e:
+                self.release()
+                if not self.observe_error(e, time.perf_counter() - started) or attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(self.backoff(attempt))
+                continue
+            self.release()
+            self.observe(kind, time.perf_counter() - started)
+            return result
+
+    def stream(self, fn, priority: int, kind: str):
+        """
+        Stream chunks while holding a slot. Time to first chunk is the latency
+        signal; a failed stream is only retried if nothing was yielded yet.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.acquire(priority)
+            started = time.perf_counter()
+            emitted = False
+            try:
+                for chunk in fn():
+                    if not emitted:
+                        emitted = True
+                        self.observe(kind, time.perf_counter() - started)
+                    yield chunk
+                return
+            except Exception as e:
+                if not self.observe_error(e, time.perf_counter() - started) or emitted or attempt == self.max_retries:
+                    raise
+                self.retries += 1
+            finally:
+                self.release()
+            time.sleep(self.backoff(attempt))
+
+    async def astream(self, fn, priority: int, kind: str):
+        """Async variant of stream."""
+        for attempt in range(self.max_retries + 1):
+            await self.aacquire(priority)
+            started = time.perf_counter()
+            emitted = False
+            try:
+                async for chunk in fn():
+                    if not emitted:
+                        emitted = True
+                        self.observe(kind, time.perf_counter() - started)
+                    yield chunk
+                return
+            except Exception as e:
+                if not self.observe_error(e, time.perf_counter() - started) or emitted or attempt == self.max_retries:
+                    raise
+                self.retries += 1
+            finally:
+                self.release()
+            await asyncio.sleep(self.backoff(attempt))
+
+    def stats(self):
+        """Current limit, queue depth per priority class and counters."""
+        with self._lock:
+            queued = {name: 0 for name in PRIORITY_NAMES.values()}
+            for waiter in self._waiters:
+                if waiter.active:
+                    queued[PRIORITY_NAMES.get(waiter.priority, str(waiter.priority))] += 1
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "queued": sum(queued.values()),
+                **{f"queued_{name}": count for name, count in queued.items()},
+                "requests": self.requests,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "limit_decreases": self.decreases,
+                "wait_seconds_total": round(self.wait_seconds, 3),
+            }
+
+
+class ScheduledLLM:
+    """
+    Chat model proxy whose invoke/stream/batch calls (and async variants)
+    are admitted by an LLMScheduler under a fixed priority class.
+    """
+
+    def __init__(self, llm, scheduler: LLMScheduler, priority: int):
+        self.llm = llm
+        self.scheduler = scheduler
+        self.priority = priority
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    def _kind(self, mode):
+        return f"{PRIORITY_NAMES.get(self.priority, self.priority)}:{mode}"
+
+    def invoke(self, prompt, **kwargs):
+        return self.scheduler.call(lambda: self.llm.invoke(prompt, **kwargs), self.priority, self._kind("invoke"))
+
+    async def ainvoke(self, prompt, **kwargs):
+        return await self.scheduler.acall(lambda: self.llm.ainvoke(prompt, **kwargs), self.priority, self._kind("invoke"))
+
+    def stream(self, prompt, **kwargs):
+        return self.scheduler.stream(lambda: self.llm.stream(prompt, **kwargs), self.priority, self._kind("stream"))
+
+    def astream(self, prompt, **kwargs):
+        return self.scheduler.astream(lambda: self.llm.astream(prompt, **kwargs), self.priority, self._kind("stream"))
+
+    def batch(self, prompts, return_exceptions=False, **kwargs):
+        def one(prompt):
+            try:
+                return self.invoke(prompt, **kwargs)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                return e
+        if not prompts:
+            return []
+        with ContextThreadPoolExecutor(max_workers=len(prompts)) as executor:
+            return list(executor.map(one, prompts))
+
+    async def abatch(self, prompts, return_exceptions=False, **kwargs):
+        return list(await asyncio.gather(
+            *[self.ainvoke(prompt, **kwargs) for prompt in prompts], return_exceptions=return_exceptions
+        ))
+
+
+llm_scheduler = LLMScheduler()
@@ -1,46 +1,192 @@
 import json
 import os
+import re
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
 
-MEMORY_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'user_interests.json')
-
-def load_interests():
-    try:
-        with open(MEMORY_FILE, "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return []
-
-def add_interest(interest):
-    interests = load_interests()
-    
-    # Check if interest already exists (case-insensitive)
-    interest_lower = interest.lower()
-    for existing_interest in interests:
-        if existing_interest.lower() == interest_lower:
-            return  # Interest already exists, don't add duplicate
-    
-    # Add the interest with original capitalization
-    interests.append(interest)
-    with open(MEMORY_FILE, "w") as f:
-        json.dump(interests, f)
-
-def remove_interest(interest):
-    interests = load_interests()
-    
-    # First try exact match (case-sensitive)
-    if interest in interests:
-        interests.remove(interest)
-        with open(MEMORY_FILE, "w") as f:
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+MEMORY_FILE = os.path.join(DATA_DIR, 'user_interests.json')
+INTERESTS_DB_FILE = os.path.join(DATA_DIR, 'user_interests.sqlite')
+INTEREST_STORE = os.environ.get("INTEREST_STORE", "sqlite")
+DEFAULT_USER = "default"
+
+
+class InterestStore(ABC):
+    """Interface of the per-user interest backends."""
+
+    @abstractmethod
+    def load(self, user_id):
+        """The user's interests, in insertion order."""
+
+    @abstractmethod
+    def add(self, user_id, interest):
+        """Store an interest for the user, unless it has it already (case-insensitive)."""
+
+    @abstractmethod
+    def remove(self, user_id, interest):
+        """Drop an interest of the user (case-insensitive); returns whether it was stored."""
+
+    @abstractmethod
+    def users(self):
+        """Ids of the users with stored interests."""
+
+
+class JsonInterestStore(InterestStore):
+    """
+    Legacy backend: one JSON list per user, rewritten on every change.
+    The default user keeps the original data/user_interests.json file.
+    """
+
+    def __init__(self, path=MEMORY_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _path_for(self, user_id):
+        if user_id == DEFAULT_USER:
+            return self.path
+        safe_id = re.sub(r"[^\w.-]", "_", user_id)
+        root, ext = os.path.splitext(self.path)
+        return f"{root}.{safe_id}{ext}"
+
+    def _read(self, user_id):
+        try:
+            with open(self._path_for(user_id), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def _write(self, user_id, interests):
+        with open(self._path_for(user_id), "w") as f:
             json.dump(interests, f)
-        return True
-    
-    # If no exact match, try case-insensitive search
-    interest_lower = interest.lower()
-    for stored_interest in interests:
-        if stored_interest.lower() == interest_lower:
-            interests.remove(stored_interest)
-            with open(MEMORY_FILE, "w") as f:
-                json.dump(interests, f)
-            return True
-    
-    return False
\ No newline at end of file
+
+    def load(self, user_id):
+        with self._lock:
+            return self._read(user_id)
+
+    def add(self, user_id, interest):
+        with self._lock:
+            interests = self._read(user_id)
+            # Check if interest already exists (case-insensitive)
+            if any(existing.lower() == interest.lower() for existing in interests):
+                return
+            interests.append(interest)
+            self._write(user_id, interests)
+
+    def remove(self, user_id, interest):
+        with self._lock:
+            interests = self._read(user_id)
+            for stored_interest in interests:
+                if stored_interest.lower() == interest.lower():
+                    interests.remove(stored_interest)
+                    self._write(user_id, interests)
+                    return True
+            return False
+
+    def users(self):
+        # Sanitized file names are the user ids as far as this backend knows
+        root, ext = os.path.splitext(self.path)
+        prefix = os.path.basename(root) + "."
+        users = [DEFAULT_USER] if os.path.exists(self.path) else []
+        for name in sorted(os.listdir(os.path.dirname(self.path) or ".")):
+            if name.startswith(prefix) and name.endswith(ext) and len(name) > len(prefix) + len(ext):
+                users.append(name[len(prefix):-len(ext)])
+        return users
+
+
+class SQLiteInterestStore(InterestStore):
+    """
+    Default backend: SQLite in WAL mode with a case-insensitive unique index
+    per user. Adds and removes are single-row statements, and reads are served
+    from an in-process cache that is invalidated on every write. On first use
+    the legacy JSON list is migrated into the default user's namespace.
+    """
+
+    def __init__(self, path=INTERESTS_DB_FILE, legacy_json=MEMORY_FILE):
+        self.path = path
+        self.legacy_json = legacy_json
+        self._conn = None
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS interests ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " user_id TEXT NOT NULL,"
+                " interest TEXT NOT NULL);"
+                "CREATE UNIQUE INDEX IF NOT EXISTS interests_user_interest"
+                " ON interests (user_id, interest COLLATE NOCASE);"
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);"
+            )
+            self._migrate_json(conn)
+            self._conn = conn
+        return self._conn
+
+    def _migrate_json(self, conn):
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+            return
+        interests = JsonInterestStore(self.legacy_json).load(DEFAULT_USER) if self.legacy_json else []
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "INSERT OR IGNORE INTO interests (user_id, interest) VALUES (?, ?)",
+            [(DEFAULT_USER, interest) for interest in interests],
+        )
+        conn.execute("INSERT OR IGNORE INTO meta VALUES ('json_migrated', '1')")
+        conn.execute("COMMIT")
+
+    def load(self, user_id):
+        with self._lock:
+            if user_id not in self._cache:
+                rows = self._connect().execute(
+                    "SELECT interest FROM interests WHERE user_id = ? ORDER BY id", (user_id,)
+                ).fetchall()
+                self._cache[user_id] = [interest for (interest,) in rows]
+            return list(self._cache[user_id])
+
+    def add(self, user_id, interest):
+        with self._lock:
+            self._connect().execute(
+                "INSERT OR IGNORE INTO interests (user_id, interest) VALUES (?, ?)", (user_id, interest)
+            )
+            self._cache.pop(user_id, None)
+
+    def remove(self, user_id, interest):
+        with self._lock:
+            cursor = self._connect().execute(
+                "DELETE FROM interests WHERE user_id = ? AND interest = ? COLLATE NOCASE", (user_id, interest)
+            )
+            self._cache.pop(user_id, None)
+            return cursor.rowcount > 0
+
+    def users(self):
+        with self._lock:
+            rows = self._connect().execute("SELECT DISTINCT user_id FROM interests ORDER BY user_id").fetchall()
+        return [user_id for (user_id,) in rows]
+
+
+STORE_BACKENDS = {
+    "sqlite": SQLiteInterestStore,
+    "json": JsonInterestStore,
+}
+
+store = STORE_BACKENDS[INTEREST_STORE]()
+
+
+def load_interests(user_id=DEFAULT_USER):
+    return store.load(user_id)
+
+
+def add_interest(interest, user_id=DEFAULT_USER):
+    store.add(user_id, interest)
+
+
+def remove_interest(interest, user_id=DEFAULT_USER):
+    return store.remove(user_id, interest)
+
+
+def list_users():
+    return store.users()
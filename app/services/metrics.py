@@ -0,0 +1,225 @@
+import time
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional
+from langchain_core.callbacks import BaseCallbackHandler
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+# ===============================================================================
+# PER-NODE METRICS
+# ===============================================================================
+
+class NodeMetrics:
+    """
+    Measurements of one node execution. LLM callbacks and HTTP helpers add to
+    the NodeMetrics of the node running in their context, possibly from
+    worker threads, hence the lock.
+    """
+
+    def __init__(self, node: str):
+        self.node = node
+        self.started = time.perf_counter()
+        self.wall_s = 0.0
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.ttft_s = []
+        self.http_requests = 0
+        self.http_s = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                setattr(self, name, getattr(self, name) + amount)
+
+    def add_ttft(self, seconds: float):
+        with self._lock:
+            self.ttft_s.append(seconds)
+
+    def finish(self):
+        self.wall_s = time.perf_counter() - self.started
+
+    def as_dict(self) -> dict:
+        return {
+            "node": self.node,
+            "wall_ms": round(self.wall_s * 1000, 1),
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "ttft_ms": round(min(self.ttft_s) * 1000, 1) if self.ttft_s else None,
+            "http_requests": self.http_requests,
+            "http_ms": round(self.http_s * 1000, 1),
+        }
+
+
+current_node: ContextVar[Optional[NodeMetrics]] = ContextVar("current_node", default=None)
+
+
+def record_http(seconds: float):
+    """Attribute one HTTP request to the running node."""
+    metrics = current_node.get()
+    if metrics is not None:
+        metrics.add(http_requests=1, http_s=seconds)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Counts LLM calls, token usage and time-to-first-token per node."""
+
+    # Run in the caller's context so current_node is visible from async code too
+    run_inline = True
+
+    def __init__(self):
+        self._starts = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._starts[run_id] = (time.perf_counter(), current_node.get())
+        metrics = current_node.get()
+        if metrics is not None:
+            metrics.add(llm_calls=1)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        start = self._starts.get(run_id)
+        if start and start[1] is not None and token:
+            start[1].add_ttft(time.perf_counter() - start[0])
+            # Only the first token counts towards TTFT
+            self._starts[run_id] = (start[0], None)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._starts.pop(run_id, None)
+        metrics = current_node.get()
+        if metrics is None:
+            return
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt, completion = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+        if not usage:
+            for generations in response.generations:
+                for generation in generations:
+                    meta = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    prompt += meta.get("input_tokens", 0)
+                    completion += meta.get("output_tokens", 0)
+        metrics.add(prompt_tokens=prompt, completion_tokens=completion)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._starts.pop(run_id, None)
+
+
+metrics_callback = MetricsCallbackHandler()
+
+
+# ===============================================================================
+# PROCESS-WIDE AGGREGATION
+# ===============================================================================
+
+class Histogram:
+    """Cumulative-bucket latency histogram, Prometheus style."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total, result = 0, []
+        for le, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            result.append((le, total))
+        return result
+
+
+class MetricsRegistry:
+    """In-process aggregation of node metrics for export."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.node_latency = {}
+        self.ttft = {}
+        self.counters = {}
+        self.collectors = {}
+
+    def observe(self, metrics: NodeMetrics):
+        with self._lock:
+            self.node_latency.setdefault(metrics.node, Histogram()).observe(metrics.wall_s)
+            for ttft in metrics.ttft_s:
+                self.ttft.setdefault(metrics.node, Histogram()).observe(ttft)
+            for name, value in (
+                ("llm_calls_total", metrics.llm_calls),
+                ("prompt_tokens_total", metrics.prompt_tokens),
+                ("completion_tokens_total", metrics.completion_tokens),
+                ("http_requests_total", metrics.http_requests),
+                ("http_seconds_total", metrics.http_s),
+            ):
+                key = (name, metrics.node)
+                self.counters[key] = self.counters.get(key, 0) + value
+
+    def register_collector(self, name: str, fn):
+        """Add a callable returning a dict of extra stats to the JSON dump."""
+        self.collectors[name] = fn
+
+    def snapshot(self) -> dict:
+        """JSON-serializable dump of all aggregated metrics."""
+        with self._lock:
+            nodes = {}
+            for node, hist in self.node_latency.items():
+                nodes[node] = {
+                    "count": hist.count,
+                    "latency_seconds_sum": hist.sum,
+                    "latency_buckets": {str(le): n for le, n in hist.cumulative()},
+                }
+                if node in self.ttft:
+                    nodes[node]["ttft_seconds_sum"] = self.ttft[node].sum
+                    nodes[node]["ttft_count"] = self.ttft[node].count
+            for (name, node), value in self.counters.items():
+                nodes.setdefault(node, {})[name] = value
+            collectors = dict(self.collectors)
+        extra = {}
+        for name, fn in collectors.items():
+            try:
+                extra[name] = fn()
+            except Exception as e:
+                extra[name] = {"error": str(e)}
+        return {"nodes": nodes, **extra}
+
+    def prometheus(self) -> str:
+        """Render the aggregated metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for metric, hists, help_text in (
+                ("news_agent_node_latency_seconds", self.node_latency, "Wall time per graph node."),
+                ("news_agent_ttft_seconds", self.ttft, "Time to first streamed token."),
+            ):
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+                for node, hist in sorted(hists.items()):
+                    for le, count in hist.cumulative():
+                        lines.append(f'{metric}_bucket{{node="{node}",le="{le}"}} {count}')
+                    lines.append(f'{metric}_sum{{node="{node}"}} {hist.sum}')
+                    lines.append(f'{metric}_count{{node="{node}"}} {hist.count}')
+            names = sorted({name for name, _ in self.counters})
+            for name in names:
+                lines += [f"# TYPE news_agent_{name} counter"]
+                for (counter, node), value in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(f'news_agent_{name}{{node="{node}"}} {value}')
+            collectors = dict(self.collectors)
+        # Numeric collector stats (queue depths, hit rates...) become gauges
+        for collector, fn in sorted(collectors.items()):
+            try:
+                stats = fn()
+            except Exception:
+                continue
+            for key, value in sorted(stats.items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines += [f"# TYPE news_agent_{collector}_{key} gauge", f"news_agent_{collector}_{key} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
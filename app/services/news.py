@@ -1,31 +1,241 @@
 import os
-import requests
-from dotenv import load_dotenv
+import sys
+import json
+import time
+import asyncio
+import threading
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from services.http_client import HTTP_TIMEOUT, get_session, get_async_client
+from services.metrics import record_http
 
-load_dotenv()
 NEWS_API_KEY = os.environ.get("NEWS_API_KEY")
+NEWS_API_URL = "https://newsapi.org/v2/top-headlines"
+NEWS_API_MAX_PAGE_SIZE = 100
+NEWS_MAX_PAGES = int(os.environ.get("NEWS_MAX_PAGES", "3"))
+NEWS_RSS_FEEDS = [f.strip() for f in os.environ.get("NEWS_RSS_FEEDS", "").split(",") if f.strip()]
+NEWS_CACHE_TTL = int(os.environ.get("NEWS_CACHE_TTL", "300"))
 
-def fetch_news(page_size=15, language="en"):
-    """
-    Returns recent headlines (not filtered by topic).
-    """
-    url = "https://newsapi.org/v2/top-headlines"
-    params = {
-        "language": language,
-        "pageSize": page_size,
-        "apiKey": NEWS_API_KEY,
-    }
-    resp = requests.get(url, params=params)
-    data = resp.json()
+TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid", "ref", "cmpid"}
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+
+_response_cache = {}
+_response_cache_lock = threading.Lock()
+
+
+# ===============================================================================
+# RESPONSE CACHE
+# ===============================================================================
+
+def _cache_key(url, params):
+    return url + "?" + urlencode(sorted((params or {}).items()))
+
+
+def _cached_response(url, params):
+    with _response_cache_lock:
+        entry = _response_cache.get(_cache_key(url, params))
+    if entry and time.time() - entry[0] < NEWS_CACHE_TTL:
+        return entry[1]
+    return None
+
+
+def _store_response(url, params, body):
+    now = time.time()
+    with _response_cache_lock:
+        _response_cache[_cache_key(url, params)] = (now, body)
+        for key in [k for k, (ts, _) in _response_cache.items() if now - ts >= NEWS_CACHE_TTL]:
+            del _response_cache[key]
+
+
+def _get(url, params=None):
+    """GET a source through the TTL cache, returning the body text or None."""
+    body = _cached_response(url, params)
+    if body is not None:
+        return body
+    started = time.perf_counter()
+    try:
+        resp = get_session().get(url, params=params, timeout=HTTP_TIMEOUT)
+    except Exception as e:
+        print(f"[DEBUG] Error fetching {url}: {e}")
+        return None
+    finally:
+        record_http(time.perf_counter() - started)
+    if resp.status_code != 200:
+        print(f"[DEBUG] Error fetching {url}: HTTP {resp.status_code}")
+        return None
+    _store_response(url, params, resp.text)
+    return resp.text
+
+
+async def _aget(url, params=None):
+    """Async variant of _get using the shared pooled client."""
+    body = _cached_response(url, params)
+    if body is not None:
+        return body
+    started = time.perf_counter()
+    try:
+        resp = await get_async_client().get(url, params=params)
+    except Exception as e:
+        print(f"[DEBUG] Error fetching {url}: {e}")
+        return None
+    finally:
+        record_http(time.perf_counter() - started)
+    if resp.status_code != 200:
+        print(f"[DEBUG] Error fetching {url}: HTTP {resp.status_code}")
+        return None
+    _store_response(url, params, resp.text)
+    return resp.text
+
+
+# ===============================================================================
+# SOURCE PARSERS
+# ===============================================================================
+
+def _parse_date(value):
+    """Parse ISO 8601 or RFC 822 dates into an aware datetime, or None."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _parse_news_api(body):
+    """Parse a NewsAPI response into (published, article) pairs."""
+    data = json.loads(body)
     if data.get("status") != "ok":
         print("[DEBUG] Error in the News API:", data)
         return []
     news = []
     for a in data.get("articles", []):
-        news.append({
-            "title": a.get("title", ""),
-            "content": a.get("description", "") or "",
-            "url": a.get("url", ""),
-            "source": a.get("source", {}).get("name", ""),
-        })
+        news.append((_parse_date(a.get("publishedAt")), {
+            "title": a.get("title") or "",
+            "content": a.get("description") or "",
+            "url": a.get("url") or "",
+            # Interned: thousands of articles share a handful of source names
+            "source": sys.intern(a.get("source", {}).get("name", "") or ""),
+        }))
     return news
+
+
+def _parse_feed(body):
+    """Parse an RSS 2.0 or Atom feed into (published, article) pairs."""
+    try:
+        root = ET.fromstring(body)
+    except ET.ParseError as e:
+        print(f"[DEBUG] Error parsing feed: {e}")
+        return []
+    news = []
+    if root.tag == f"{ATOM_NS}feed":
+        source = sys.intern((root.findtext(f"{ATOM_NS}title") or "").strip())
+        for entry in root.iter(f"{ATOM_NS}entry"):
+            link = entry.find(f"{ATOM_NS}link[@rel='alternate']")
+            if link is None:
+                link = entry.find(f"{ATOM_NS}link")
+            news.append((_parse_date(entry.findtext(f"{ATOM_NS}updated") or entry.findtext(f"{ATOM_NS}published")), {
+                "title": (entry.findtext(f"{ATOM_NS}title") or "").strip(),
+                "content": (entry.findtext(f"{ATOM_NS}summary") or "").strip(),
+                "url": link.get("href", "") if link is not None else "",
+                "source": source,
+            }))
+    else:
+        channel = root.find("channel")
+        source = sys.intern(((channel.findtext("title") if channel is not None else "") or "").strip())
+        for item in root.iter("item"):
+            news.append((_parse_date(item.findtext("pubDate")), {
+                "title": (item.findtext("title") or "").strip(),
+                "content": (item.findtext("description") or "").strip(),
+                "url": (item.findtext("link") or "").strip(),
+                "source": source,
+            }))
+    return news
+
+
+# ===============================================================================
+# INGESTION
+# ===============================================================================
+
+def canonical_url(url):
+    """Normalize a URL for deduplication: host case, www., fragments and tracking params."""
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode([
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not (k.lower().startswith("utm_") or k.lower() in TRACKING_PARAMS)
+    ])
+    return urlunsplit(("https" if parts.scheme in ("http", "https") else parts.scheme, host, parts.path.rstrip("/"), query, ""))
+
+
+def _sources(page_size, language, feeds):
+    """List the (url, params, parser) requests needed to gather page_size articles."""
+    per_page = min(page_size, NEWS_API_MAX_PAGE_SIZE)
+    pages = min(NEWS_MAX_PAGES, -(-page_size // per_page))
+    sources = [
+        (NEWS_API_URL, {"language": language, "pageSize": per_page, "page": page, "apiKey": NEWS_API_KEY}, _parse_news_api)
+        for page in range(1, pages + 1)
+    ]
+    sources += [(feed, None, _parse_feed) for feed in feeds]
+    return sources
+
+
+def _merge(results, page_size):
+    """Merge parsed sources newest first, dropping duplicate canonical URLs."""
+    articles = [item for items in results for item in items]
+    oldest = datetime.min.replace(tzinfo=timezone.utc)
+    articles.sort(key=lambda item: item[0] or oldest, reverse=True)
+    seen = set()
+    news = []
+    for _, article in articles:
+        key = canonical_url(article["url"]) if article["url"] else article["title"]
+        if key in seen:
+            continue
+        seen.add(key)
+        news.append(article)
+        if len(news) == page_size:
+            break
+    return news
+
+
+def _parse_body(parser, body):
+    if body is None:
+        return []
+    try:
+        return parser(body)
+    except Exception as e:
+        print(f"[DEBUG] Error parsing news source: {e}")
+        return []
+
+
+def fetch_news(page_size=15, language="en", feeds=None):
+    """
+    Returns recent headlines (not filtered by topic).
+    NewsAPI pages and the configured RSS/Atom feeds are fetched concurrently,
+    served from the response cache while fresh, and merged into up to
+    page_size articles deduplicated by canonical URL.
+    """
+    sources = _sources(page_size, language, NEWS_RSS_FEEDS if feeds is None else feeds)
+    with ContextThreadPoolExecutor() as executor:
+        bodies = list(executor.map(lambda s: _get(s[0], s[1]), sources))
+    return _merge([_parse_body(parser, body) for (_, _, parser), body in zip(sources, bodies)], page_size)
+
+
+async def afetch_news(page_size=15, language="en", feeds=None):
+    """
+    Async variant of fetch_news using the shared pooled client.
+    """
+    sources = _sources(page_size, language, NEWS_RSS_FEEDS if feeds is None else feeds)
+    bodies = await asyncio.gather(*[_aget(url, params) for url, params, _ in sources])
+    return _merge([_parse_body(parser, body) for (_, _, parser), body in zip(sources, bodies)], page_size)
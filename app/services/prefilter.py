@@ -0,0 +1,124 @@
+import os
+import re
+import zlib
+import threading
+import numpy as np
+from collections import OrderedDict
+
+PREFILTER_DIM = 2 ** 14
+PREFILTER_LOW = float(os.environ.get("PREFILTER_LOW", "0.25"))
+# Scores are at most 1.0, so the default never accepts without the LLM
+PREFILTER_HIGH = float(os.environ.get("PREFILTER_HIGH", "1.1"))
+# Shorter interests ("AI", "EU") hide inside unrelated words too easily to be accepted
+PREFILTER_ACCEPT_MIN_CHARS = int(os.environ.get("PREFILTER_ACCEPT_MIN_CHARS", "4"))
+PREFILTER_MAX_INTERESTS = 4096
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def char_ngrams(text, n=3):
+    """Return the set of word-padded character n-grams of a text."""
+    grams = set()
+    for word in words(text):
+        padded = f" {word} "
+        for i in range(len(padded) - n + 1):
+            grams.add(padded[i:i + n])
+    return grams
+
+
+def words(text):
+    """Lowercased whole words of a text."""
+    return _WORD_RE.findall(text.lower())
+
+
+def article_text(article):
+    return f"{article.get('title') or ''} {article.get('content') or ''}"
+
+
+def whole_word_match(interest, article_words, min_chars=PREFILTER_ACCEPT_MIN_CHARS):
+    """Whether a long enough interest appears in the article as whole words, in order."""
+    needle = words(interest)
+    if not needle or len(interest.strip()) < min_chars:
+        return False
+    return any(article_words[i:i + len(needle)] == needle for i in range(len(article_words) - len(needle) + 1))
+
+
+def hash_vector(text, dim=PREFILTER_DIM):
+    """Binary hashed n-gram vector of a text."""
+    vec = np.zeros(dim, dtype=np.float32)
+    for gram in char_ngrams(text):
+        vec[zlib.crc32(gram.encode("utf-8")) % dim] = 1.0
+    return vec
+
+
+class InterestIndex:
+    """
+    Precomputed hashed n-gram vectors of interests, shared by all users.
+    Articles are scored against an interest list in one matrix product; the
+    score of an interest is the fraction of its n-grams present in the article.
+    Vectors are computed once per interest and kept in a bounded LRU, so a
+    changed interest list only vectorizes the newly added interests.
+    """
+
+    def __init__(self, dim=PREFILTER_DIM, max_interests=PREFILTER_MAX_INTERESTS):
+        self.dim = dim
+        self.max_interests = max_interests
+        self._vectors = OrderedDict()
+        self._lock = threading.Lock()
+
+    def matrix(self, interests):
+        """Return the (interests x dim) matrix, vectorizing only unseen interests."""
+        rows = []
+        with self._lock:
+            for interest in interests:
+                vec = self._vectors.get(interest)
+                if vec is None:
+                    vec = self._vectors[interest] = hash_vector(interest, self.dim)
+                else:
+                    self._vectors.move_to_end(interest)
+                rows.append(vec)
+            while len(self._vectors) > max(self.max_interests, len(interests)):
+                self._vectors.popitem(last=False)
+        if not rows:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack(rows)
+
+    def score(self, articles, interests):
+        """Return an (articles x interests) matrix of containment scores."""
+        if not articles or not interests:
+            return np.zeros((len(articles), len(interests)), dtype=np.float32)
+        matrix = self.matrix(interests)
+        docs = np.stack([
+            hash_vector(article_text(a), self.dim)
+            for a in articles
+        ])
+        return (docs @ matrix.T) / np.maximum(matrix.sum(axis=1), 1.0)
+
+    def split(self, articles, interests, low=None, high=None):
+        """
+        Partition articles by score band.
+        Returns (rejected, accepted, uncertain): rejected and uncertain are
+        lists of article positions, accepted maps positions to the interests
+        scoring at or above the high threshold that also appear in the
+        article as whole words. Articles with no such interest are uncertain.
+        """
+        low = PREFILTER_LOW if low is None else low
+        high = PREFILTER_HIGH if high is None else high
+        scores = self.score(articles, interests)
+        rejected, accepted, uncertain = [], {}, []
+        for idx, row in enumerate(scores):
+            if row.size == 0 or row.max() < low:
+                rejected.append(idx)
+                continue
+            matched = []
+            if row.max() >= high:
+                article_words = words(article_text(articles[idx]))
+                matched = [interests[j] for j in np.flatnonzero(row >= high) if whole_word_match(interests[j], article_words)]
+            if matched:
+                accepted[idx] = matched
+            else:
+                uncertain.append(idx)
+        return rejected, accepted, uncertain
+
+
+interest_index = InterestIndex()
@@ -0,0 +1,325 @@
+import os
+import re
+import time
+import asyncio
+import threading
+import weakref
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Iterator, NamedTuple, Optional
+from urllib.parse import urlsplit
+import httpx
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from services.http_client import HTTP_POOL_SIZE, get_session, get_async_client
+from services.article_cache import article_cache
+from services.metrics import record_http
+
+SCRAPE_TIMEOUT = float(os.environ.get("SCRAPE_TIMEOUT", "10"))
+SCRAPE_CONNECT_TIMEOUT = float(os.environ.get("SCRAPE_CONNECT_TIMEOUT", "3"))
+SCRAPE_PER_HOST = int(os.environ.get("SCRAPE_PER_HOST", "4"))
+SCRAPE_MAX_BYTES = int(os.environ.get("SCRAPE_MAX_BYTES", str(5 * 1024 * 1024)))
+SCRAPE_PROCESSES = int(os.environ.get("SCRAPE_PROCESSES", str(min(4, os.cpu_count() or 1))))
+ARTICLE_CACHE_ENABLED = os.environ.get("ARTICLE_CACHE_ENABLED", "1") == "1"
+
+_CHARSET_RE = re.compile(r"charset=[\"']?([\w.:-]+)", re.I)
+
+
+class ScrapeError(Exception):
+    pass
+
+
+class DeadlineReached(ScrapeError):
+    pass
+
+
+def check_deadline(deadline):
+    """Raise DeadlineReached once the absolute `deadline` (time.time()) has passed."""
+    if deadline is not None and time.time() >= deadline:
+        raise DeadlineReached("deadline reached before the download started")
+
+
+class ScrapeResult(NamedTuple):
+    url: str
+    content: Optional[str]
+    error: Optional[str] = None
+    cached: bool = False  # served from the article cache (fresh or stale)
+    elapsed: float = 0.0
+    skipped: bool = False  # not downloaded because the deadline had passed
+
+
+def browser_user_agent():
+    # newspaper (and lxml with it) is imported on first use to keep startup fast
+    from newspaper import Config
+    return Config().browser_user_agent
+
+
+def revalidation_headers(cached):
+    """Request headers for fetching an article, conditional when it is cached."""
+    headers = {"User-Agent": browser_user_agent()}
+    if cached:
+        _, etag, last_modified = cached
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+def unconditional_headers():
+    """
+    Headers for refetching a page that answered 304 although there is no
+    cached copy to serve: without HTML, extraction would download the page
+    itself, outside the timeouts and per-host limits.
+    """
+    return {**revalidation_headers(None), "Cache-Control": "no-cache"}
+
+
+def check_not_modified_body(status):
+    if status == 304:
+        raise ScrapeError("304 Not Modified without a cached copy")
+
+
+def extract_text(url, html):
+    """Extract the article text from a page. Runs in the extraction processes."""
+    from newspaper import Article
+    article = Article(url)
+    article.download(input_html=html)
+    article.parse()
+    return article.text
+
+
+def _decode(body, headers):
+    match = _CHARSET_RE.search(headers.get("Content-Type", ""))
+    try:
+        return body.decode(match.group(1) if match else "utf-8", errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+class Scraper:
+    """
+    Article scraping engine.
+    Pages are fetched through the shared keep-alive pools with at most
+    `per_host` concurrent requests per domain, a connect timeout and a hard
+    deadline on the whole download. HTML extraction, which is CPU-bound lxml
+    work, runs in a pool of `processes` worker processes (in the calling
+    thread when 0). Every URL yields a ScrapeResult carrying either the text
+    or the reason it failed; a cached copy is served when revalidation fails.
+    """
+
+    def __init__(
+        self,
+        per_host: int = SCRAPE_PER_HOST,
+        timeout: float = SCRAPE_TIMEOUT,
+        connect_timeout: float = SCRAPE_CONNECT_TIMEOUT,
+        max_bytes: int = SCRAPE_MAX_BYTES,
+        processes: int = SCRAPE_PROCESSES,
+        cache=article_cache if ARTICLE_CACHE_ENABLED else None,
+    ):
+        self.per_host = per_host
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_bytes = max_bytes
+        self.processes = processes
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._host_slots = {}
+        self._async_host_slots = weakref.WeakKeyDictionary()
+        self._pool = None
+
+    # Concurrency limits ----------------------------------------------------
+
+    def _host_slot(self, url):
+        host = (urlsplit(url).hostname or "").lower()
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+        return slot
+
+    def _async_host_slot(self, url):
+        # asyncio semaphores belong to one loop, so they are kept per loop
+        host = (urlsplit(url).hostname or "").lower()
+        slots = self._async_host_slots.setdefault(asyncio.get_running_loop(), {})
+        if host not in slots:
+            slots[host] = asyncio.Semaphore(self.per_host)
+        return slots[host]
+
+    # Extraction --------------------------------------------------------------
+
+    def _process_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processes, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _reset_pool(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def extract(self, url, html):
+        if self.processes <= 0:
+            return extract_text(url, html)
+        try:
+            return self._process_pool().submit(extract_text, url, html).result()
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory): start a new pool next time
+            self._reset_pool()
+            return extract_text(url, html)
+
+    async def aextract(self, url, html):
+        if self.processes <= 0:
+            return await asyncio.to_thread(extract_text, url, html)
+        try:
+            return await asyncio.wrap_future(self._process_pool().submit(extract_text, url, html))
+        except BrokenProcessPool:
+            self._reset_pool()
+            return await asyncio.to_thread(extract_text, url, html)
+
+    def warm_up(self):
+        """Import the extraction libraries and start the worker processes ahead of the first request."""
+        browser_user_agent()
+        if self.processes > 0:
+            pool = self._process_pool()
+            for future in [pool.submit(browser_user_agent) for _ in range(self.processes)]:
+                future.result()
+
+    def shutdown(self):
+        self._reset_pool()
+
+    # Fetching ----------------------------------------------------------------
+
+    def _read_body(self, chunks, started):
+        body = bytearray()
+        for chunk in chunks:
+            body += chunk
+            if len(body) > self.max_bytes:
+                raise ScrapeError(f"page larger than {self.max_bytes} bytes")
+            if time.perf_counter() - started > self.timeout:
+                raise ScrapeError(f"download exceeded {self.timeout}s")
+        return bytes(body)
+
+    def fetch(self, url, headers, deadline=None):
+        """
+        GET a page; returns (status, html, headers) with html None on 304.
+        No request is started once the deadline has passed.
+        """
+        with self._host_slot(url):
+            check_deadline(deadline)
+            started = time.perf_counter()
+            try:
+                resp = get_session().get(
+                    url, headers=headers, timeout=(self.connect_timeout, self.timeout), stream=True
+                )
+                try:
+                    if resp.status_code == 304:
+                        return 304, None, resp.headers
+                    resp.raise_for_status()
+                    body = self._read_body(resp.iter_content(64 * 1024), started)
+                    return resp.status_code, _decode(body, resp.headers), resp.headers
+                finally:
+                    resp.close()
+            finally:
+                record_http(time.perf_counter() - started)
+
+    async def afetch(self, url, headers, deadline=None):
+        """Async variant of fetch."""
+        async with self._async_host_slot(url):
+            check_deadline(deadline)
+            started = time.perf_counter()
+
+            async def download():
+                timeout = httpx.Timeout(self.timeout, connect=self.connect_timeout)
+                async with get_async_client().stream("GET", url, headers=headers, timeout=timeout) as resp:
+                    if resp.status_code == 304:
+                        return 304, None, resp.headers
+                    resp.raise_for_status()
+                    body = bytearray()
+                    async for chunk in resp.aiter_bytes():
+                        body += chunk
+                        if len(body) > self.max_bytes:
+                            raise ScrapeError(f"page larger than {self.max_bytes} bytes")
+                    return resp.status_code, _decode(bytes(body), resp.headers), resp.headers
+
+            try:
+                return await asyncio.wait_for(download(), self.timeout)
+            except asyncio.TimeoutError:
+                raise ScrapeError(f"download exceeded {self.timeout}s")
+            finally:
+                record_http(time.perf_counter() - started)
+
+    # Scraping ----------------------------------------------------------------
+
+    def _failed(self, url, cached, error, started):
+        if isinstance(error, DeadlineReached):
+            return ScrapeResult(url, None, str(error), elapsed=time.perf_counter() - started, skipped=True)
+        message = str(error) if isinstance(error, ScrapeError) else f"{type(error).__name__}: {error}"
+        # Serve the stale copy rather than nothing if revalidation failed
+        return ScrapeResult(
+            url, cached[0] if cached else None, message, cached=bool(cached), elapsed=time.perf_counter() - started
+        )
+
+    def _parsed(self, url, text, headers, started):
+        if not text:
+            return ScrapeResult(url, None, "no article text found", elapsed=time.perf_counter() - started)
+        if self.cache:
+            self.cache.put(url, text, headers.get("ETag"), headers.get("Last-Modified"))
+        return ScrapeResult(url, text, elapsed=time.perf_counter() - started)
+
+    def _not_modified(self, url, cached, started):
+        self.cache.touch(url)
+        return ScrapeResult(url, cached[0], cached=True, elapsed=time.perf_counter() - started)
+
+    def scrape(self, url, deadline=None) -> ScrapeResult:
+        """Download and extract one article, unless the deadline passes first."""
+        started = time.perf_counter()
+        cached = self.cache.get(url) if self.cache else None
+        try:
+            status, html, headers = self.fetch(url, revalidation_headers(cached), deadline)
+            if status == 304 and cached:
+                return self._not_modified(url, cached, started)
+            if status == 304:
+                status, html, headers = self.fetch(url, unconditional_headers(), deadline)
+                check_not_modified_body(status)
+            return self._parsed(url, self.extract(url, html), headers, started)
+        except Exception as e:
+            return self._failed(url, cached, e, started)
+
+    async def ascrape(self, url, deadline=None) -> ScrapeResult:
+        """Async variant of scrape."""
+        started = time.perf_counter()
+        cached = self.cache.get(url) if self.cache else None
+        try:
+            status, html, headers = await self.afetch(url, revalidation_headers(cached), deadline)
+            if status == 304 and cached:
+                return self._not_modified(url, cached, started)
+            if status == 304:
+                status, html, headers = await self.afetch(url, unconditional_headers(), deadline)
+                check_not_modified_body(status)
+            return self._parsed(url, await self.aextract(url, html), headers, started)
+        except Exception as e:
+            return self._failed(url, cached, e, started)
+
+    def scrape_stream(self, urls, deadline=None) -> Iterator[ScrapeResult]:
+        """
+        Scrape URLs concurrently, in the given order, yielding results as
+        they finish. Downloads not started by the deadline are skipped.
+        """
+        if not urls:
+            return
+        with ContextThreadPoolExecutor(max_workers=min(len(urls), HTTP_POOL_SIZE)) as executor:
+            for future in as_completed([executor.submit(self.scrape, url, deadline) for url in urls]):
+                yield future.result()
+
+    async def ascrape_stream(self, urls, deadline=None) -> AsyncIterator[ScrapeResult]:
+        """Async variant of scrape_stream."""
+        for next_done in asyncio.as_completed([self.ascrape(url, deadline) for url in urls]):
+            yield await next_done
+
+
+scraper = Scraper()
@@ -0,0 +1,78 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+SUMMARY_CACHE_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'summary_cache.sqlite')
+SUMMARY_CACHE_MAX_ENTRIES = int(os.environ.get("SUMMARY_CACHE_MAX_ENTRIES", "5000"))
+
+
+def summary_key(content, prompt_template, model_id):
+    """Hash of the article content and everything that shapes its summary."""
+    raw = "\0".join([model_id or "", prompt_template, content])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """
+    Persistent cache of generated article summaries stored in SQLite.
+    Keys include the prompt template and model, so changing either simply
+    stops matching old entries, which then age out through LRU eviction
+    once the cache exceeds `max_entries`.
+    """
+
+    def __init__(self, path=SUMMARY_CACHE_FILE, max_entries=SUMMARY_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS summaries ("
+                " key TEXT PRIMARY KEY,"
+                " summary TEXT NOT NULL,"
+                " used_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS summaries_used_at ON summaries (used_at)")
+        return self._conn
+
+    def get(self, key):
+        """Return the cached summary for a key, or None."""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT summary FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE summaries SET used_at = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            self.hits += 1
+        return row[0]
+
+    def put(self, key, summary):
+        """Store a summary and evict the least recently used entries over the bound."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("INSERT OR REPLACE INTO summaries VALUES (?, ?, ?)", (key, summary, time.time()))
+            overflow = conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM summaries WHERE key IN (SELECT key FROM summaries ORDER BY used_at LIMIT ?)",
+                    (overflow,),
+                )
+            conn.commit()
+
+    def stats(self):
+        """Hit/miss counters and current size."""
+        with self._lock:
+            entries = self._connect().execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "max_entries": self.max_entries}
+
+
+summary_cache = SummaryCache()
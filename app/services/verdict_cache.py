@@ -0,0 +1,127 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+VERDICT_CACHE_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'verdict_cache.sqlite')
+VERDICT_CACHE_MAX_ENTRIES = int(os.environ.get("VERDICT_CACHE_MAX_ENTRIES", "50000"))
+VERDICT_CACHE_TTL = int(os.environ.get("VERDICT_CACHE_TTL", str(24 * 3600)))
+
+VERDICTS_TABLE = (
+    "CREATE TABLE IF NOT EXISTS {table} ("
+    " article TEXT NOT NULL,"
+    " interest TEXT NOT NULL,"
+    " score REAL NOT NULL,"
+    " reason TEXT,"
+    " created_at REAL NOT NULL,"
+    " used_at REAL NOT NULL,"
+    " PRIMARY KEY (article, interest))"
+)
+
+
+def article_key(article):
+    """Hash identifying an article by URL and the content it was classified on."""
+    raw = "\n".join([article.get("url") or "", article.get("title") or "", article.get("content") or ""])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class VerdictCache:
+    """
+    Persistent cache of article-vs-interest verdicts stored in SQLite.
+    A verdict is a relevance score in [0, 1] with the LLM reply; the yes/no
+    verdicts of older versions are migrated to scores 1.0/0.0. Entries are keyed
+    per interest, expire after `ttl` seconds and the least recently used
+    ones are evicted once the cache exceeds `max_entries`.
+    """
+
+    def __init__(self, path=VERDICT_CACHE_FILE, max_entries=VERDICT_CACHE_MAX_ENTRIES, ttl=VERDICT_CACHE_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(VERDICTS_TABLE.format(table="verdicts"))
+            self._migrate_yes_no(self._conn)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS verdicts_used_at ON verdicts (used_at)")
+        return self._conn
+
+    def _migrate_yes_no(self, conn):
+        """Move tables of older versions, with an integer yes/no verdict column, to the score column."""
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(verdicts)")]
+        if "score" in columns:
+            return
+        conn.execute(VERDICTS_TABLE.format(table="verdicts_scored"))
+        conn.execute(
+            "INSERT INTO verdicts_scored SELECT article, interest, CAST(verdict AS REAL), reason, created_at, used_at"
+            " FROM verdicts"
+        )
+        conn.execute("DROP TABLE verdicts")
+        conn.execute("ALTER TABLE verdicts_scored RENAME TO verdicts")
+        conn.commit()
+
+    def get_many(self, key, interests):
+        """Return {interest: (score, reason)} for the cached, unexpired interests."""
+        if not interests:
+            return {}
+        now = time.time()
+        by_lower = {i.lower(): i for i in interests}
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT interest, score, reason FROM verdicts WHERE article = ? AND created_at >= ?"
+                f" AND interest IN ({','.join('?' * len(by_lower))})",
+                (key, now - self.ttl, *by_lower),
+            ).fetchall()
+            if rows:
+                conn.executemany(
+                    "UPDATE verdicts SET used_at = ? WHERE article = ? AND interest = ?",
+                    [(now, key, interest) for interest, _, _ in rows],
+                )
+                conn.commit()
+            self.hits += len(rows)
+            self.misses += len(by_lower) - len(rows)
+        return {by_lower[interest]: (score, reason) for interest, score, reason in rows}
+
+    def put_many(self, key, verdicts):
+        """Store {interest: (score, reason)} for an article and enforce the size bound."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?, ?, ?)",
+                [(key, interest.lower(), float(score), reason, now, now) for interest, (score, reason) in verdicts.items()],
+            )
+            conn.execute("DELETE FROM verdicts WHERE created_at < ?", (now - self.ttl,))
+            overflow = conn.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM verdicts WHERE rowid IN (SELECT rowid FROM verdicts ORDER BY used_at LIMIT ?)",
+                    (overflow,),
+                )
+                self.evictions += overflow
+            conn.commit()
+
+    def stats(self):
+        """Hit/miss counters and current size, for sizing the cache."""
+        with self._lock:
+            entries = self._connect().execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "max_entries": self.max_entries,
+        }
+
+
+verdict_cache = VerdictCache()
@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+
+import agents.agent_graph as agent_graph
+from agents.agent_graph import AppContext
+
+
+def test_app_context_builds_lazily_and_reports_readiness(monkeypatch):
+    built = []
+    monkeypatch.setattr(agent_graph, "build_llm", lambda: built.append("llm") or SimpleNamespace())
+    monkeypatch.setattr(agent_graph, "build_graph", lambda llm, async_nodes=False, **kwargs: built.append(async_nodes) or object())
+    monkeypatch.setattr(agent_graph, "scraper", SimpleNamespace(warm_up=lambda: built.append("scraper")))
+    context = AppContext()
+    assert built == [] and context.status()["state"] == "cold"
+
+    graph = context.graph
+    assert built == ["llm", False] and context.graph is graph
+
+    assert context.warm_up()
+    status = context.status()
+    assert built == ["llm", False, True, "scraper"]
+    assert status["ready"] and status["state"] == "ready"
+    assert list(status["steps"]) == ["llm", "graph", "async_graph", "scraper"]
+
+
+def test_app_context_reports_a_broken_llm_config(monkeypatch):
+    def broken():
+        raise ValueError("missing model")
+
+    monkeypatch.setattr(agent_graph, "build_llm", broken)
+    context = AppContext()
+    assert not context.warm_up()
+    status = context.status()
+    assert not status["ready"] and status["state"] == "failed"
+    assert status["error"] == "llm: missing model"
+    assert context.stats()["ready"] == 0
@@ -0,0 +1,35 @@
+import os
+from types import SimpleNamespace
+
+import services.scraper as scraper_module
+from services.article_cache import ArticleCache
+
+def test_put_get_and_size_eviction(tmp_path):
+    cache = ArticleCache(path=str(tmp_path / "articles.sqlite"), max_bytes=1000)
+    cache.put("https://a", "first article", etag='"a1"')
+    assert cache.get("https://a") == ("first article", '"a1"', None)
+
+    cache.put("https://b", os.urandom(600).hex())
+    assert cache.get("https://a") is not None
+
+    third = os.urandom(600).hex()
+    cache.put("https://c", third)
+    assert cache.get("https://a") is None
+    assert cache.get("https://b") is None
+    assert cache.get("https://c")[0] == third
+
+
+def test_scraper_revalidates(monkeypatch, tmp_path):
+    cache = ArticleCache(path=str(tmp_path / "articles.sqlite"))
+    body = "The first heatwave of the summer starts today across most of the country. " * 5
+    cache.put("https://a", body, etag='"v1"')
+    calls = []
+
+    def fake_get(url, headers, timeout, stream):
+        calls.append(headers)
+        return SimpleNamespace(status_code=304, headers={}, close=lambda: None)
+
+    monkeypatch.setattr(scraper_module, "get_session", lambda: SimpleNamespace(get=fake_get))
+    result = scraper_module.Scraper(cache=cache, processes=0).scrape("https://a")
+    assert result.content == body and result.cached and result.error is None
+    assert calls[0]["If-None-Match"] == '"v1"'
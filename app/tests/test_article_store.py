@@ -0,0 +1,35 @@
+import agents.tools as tools
+from services.article_store import ArticleStore
+from services.scraper import ScrapeResult
+
+
+def test_put_assigns_ids_and_replaces_bodies():
+    store = ArticleStore()
+    a = store.put({"url": "https://a"}, "raw text")
+    b = store.put({"url": "https://b"}, "other")
+    assert a["id"] != b["id"] and store.content(a) == "raw text"
+
+    prepared = store.put(a, "short", ["s", "t"])
+    assert prepared is a and store.content(a) == "short" and store.chunks(a) == ["s", "t"]
+    assert len(store) == 2 and store.stats()["chars"] == len("short" + "st" + "other")
+    assert store.content({"url": "https://c"}) is None
+
+
+def test_scraped_text_stays_out_of_the_state():
+    news = [
+        {"title": "A", "content": "description", "url": "https://a", "source": "A"},
+        {"title": "B", "content": "description", "url": "https://b", "source": "B"},
+    ]
+    results = {
+        "https://a": ScrapeResult("https://a", "paragraph\n\n" * 50),
+        "https://b": ScrapeResult("https://b", None, "HTTPError: 403"),
+    }
+    state = tools.prepare_content_node(tools.scrape_results_to_state({"news": news}, results))
+
+    store = state["article_store"]
+    a, b = state["news"]
+    # The dicts keep the feed description; the page text is only in the store
+    assert a["content"] == "description" and "id" in a and "chunks" not in a
+    assert store.content(a).startswith("paragraph")
+    assert "id" not in b and b["scrape_error"] == "HTTPError: 403"
+    assert state["compression_stats"]["articles"] == 1
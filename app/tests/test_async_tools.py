@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import json
+from types import SimpleNamespace
+
+import agents.async_tools as async_tools
+import agents.tools as tools
+from services.article_store import article_store
+
+
+class FakeAsyncLLM:
+    model_name = "fake-model"
+
+    async def ainvoke(self, prompt):
+        return SimpleNamespace(content=json.dumps([{"id": 0, "interests": ["Tesla"]}, {"id": 1, "interests": []}]))
+
+    async def astream(self, prompt):
+        for word in ["Short", "summary."]:
+            await asyncio.sleep(0)
+            yield SimpleNamespace(content=word + " ")
+
+
+def test_async_filter_and_summarize(monkeypatch):
+    monkeypatch.setattr(tools, "load_interests", lambda user_id: ["Tesla"])
+    events = []
+    monkeypatch.setattr(async_tools, "get_stream_writer", lambda: events.append)
+    llm = FakeAsyncLLM()
+    news = [
+        {"title": "Tesla opens new factory", "content": "", "url": "https://a", "source": "A"},
+        {"title": "Rain expected tomorrow", "content": "", "url": "https://b", "source": "B"},
+    ]
+    filter_node = async_tools.build_async_tools_filter_news_node(llm, batch_size=8, prefilter=False, cache=None)
+    state = asyncio.run(filter_node({"news": news}))
+    assert [n["url"] for n in state["news"]] == ["https://a"]
+
+    state["news"][0] = article_store(state).put(state["news"][0], "Tesla opened a factory.")
+    summarize_node = async_tools.build_async_summarize_node(llm, max_in_flight=2, cache=None)
+    state = asyncio.run(summarize_node(state))
+    assert state["news"][0]["summary"] == "Short summary. "
+    assert events[-1]["summary_delta"] == {"op": "done", "idx": 0, "total": 1, "text": "Short summary. "}
+
+
+class ThreadRecordingCache:
+    """Dict-backed summary/verdict cache noting which threads touch it."""
+
+    def __init__(self):
+        self.data = {}
+        self.threads = set()
+
+    def get(self, key):
+        self.threads.add(threading.get_ident())
+        return self.data.get(key)
+
+    def put(self, key, value):
+        self.threads.add(threading.get_ident())
+        self.data[key] = value
+
+    def get_many(self, key, interests):
+        self.threads.add(threading.get_ident())
+        return {}
+
+    def put_many(self, key, verdicts):
+        self.threads.add(threading.get_ident())
+
+    def stats(self):
+        return {}
+
+
+def test_async_nodes_keep_cache_io_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(tools, "load_interests", lambda user_id: ["Tesla"])
+    monkeypatch.setattr(async_tools, "get_stream_writer", lambda: lambda event: None)
+    llm = FakeAsyncLLM()
+    verdicts, summaries = ThreadRecordingCache(), ThreadRecordingCache()
+    news = [
+        {"title": "Tesla opens new factory", "content": "", "url": "https://a", "source": "A"},
+        {"title": "Rain expected tomorrow", "content": "", "url": "https://b", "source": "B"},
+    ]
+
+    async def run():
+        loop_thread = threading.get_ident()
+        filter_node = async_tools.build_async_tools_filter_news_node(llm, batch_size=8, prefilter=False, cache=verdicts)
+        state = await filter_node({"news": news})
+        state["news"][0] = article_store(state).put(state["news"][0], "Tesla opened a factory.")
+        summarize_node = async_tools.build_async_summarize_node(llm, max_in_flight=2, cache=summaries)
+        state = await summarize_node(state)
+        return loop_thread, state
+
+    loop_thread, state = asyncio.run(run())
+    assert state["news"][0]["summary"] == "Short summary. "
+    assert list(summaries.data.values()) == ["Short summary. "]
+    assert verdicts.threads and summaries.threads
+    assert loop_thread not in verdicts.threads | summaries.threads
@@ -0,0 +1,117 @@
+import re
+import json
+from types import SimpleNamespace
+
+import agents.tools as tools
+import agents.batch_digest as batch_digest
+from services.scraper import ScrapeResult
+
+NEWS = [
+    {"title": "AI chips", "content": "d", "url": "https://a/1", "source": "A"},
+    {"title": "Football final", "content": "d", "url": "https://a/2", "source": "A"},
+    {"title": "Local bakery", "content": "d", "url": "https://a/3", "source": "A"},
+]
+
+
+class FakeLLM:
+    """Scores an article 9 for every interest its title mentions and summarizes it in one chunk."""
+
+    model_name = "fake-model"
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        interests = re.findall(r"^- (.*)$", prompt[0]["content"], re.M)
+        titles = re.findall(r"\[(\d+)\] Title: (.*)", prompt[-1]["content"])
+        return SimpleNamespace(content=json.dumps([
+            {"id": int(i), "scores": {x: 9 if x.lower() in t.lower() else 0 for x in interests}} for i, t in titles
+        ]))
+
+    def stream(self, prompt):
+        yield SimpleNamespace(content="Summary of " + prompt[-1]["content"].rsplit("\n", 1)[-1])
+
+
+class FakeScraper:
+    def __init__(self):
+        self.urls = []
+
+    def scrape_stream(self, urls, deadline=None):
+        self.urls += urls
+        return (ScrapeResult(url, f"text of {url}") for url in urls)
+
+
+def runner(monkeypatch, fetches, llm=None, **kwargs):
+    monkeypatch.setattr(tools, "fetch_news", lambda **kwargs: fetches.append(1) or [dict(n) for n in NEWS])
+    scraper = FakeScraper()
+    monkeypatch.setattr(batch_digest, "scraper", scraper)
+    return batch_digest.BatchDigestRunner(
+        llm or FakeLLM(), workers=2, chunk_size=2, scheduler=None, verdicts_cache=None, summaries_cache=None, **kwargs
+    ), scraper
+
+
+def test_batch_shares_news_and_scrapes_and_resumes(monkeypatch, tmp_path):
+    users = [
+        {"user_id": "u1", "interests": ["AI"]},
+        {"user_id": "u2", "interests": ["AI", "football"]},
+        {"user_id": "u3", "interests": ["football"]},
+    ]
+    output = tmp_path / "digests.jsonl"
+    output.write_text(json.dumps({"user_id": "u1", "status": "ok"}) + "\n" + '{"user_id": "u2", "sta')
+    fetches = []
+    batch, scraper = runner(monkeypatch, fetches)
+    stats = batch.run(users, str(output))
+
+    assert (stats["ok"], stats["failed"], stats["resumed"]) == (2, 0, 1)
+    assert len(fetches) == 1
+    # u2 and u3 share one chunk: the football article is scraped once for both
+    assert sorted(scraper.urls) == ["https://a/1", "https://a/2"]
+    records = {r["user_id"]: r for r in map(json.loads, output.read_text().splitlines()[2:])}
+    assert [a["url"] for a in records["u2"]["articles"]] == ["https://a/1", "https://a/2"]
+    assert records["u3"]["articles"][0]["summary"] == "Summary of text of https://a/2"
+    assert records["u3"]["matched"] == 1 and records["u3"]["interests"] == ["football"]
+    assert {"filter_news_ms", "summarize_ms", "total_ms", "elapsed_ms"} <= set(records["u3"]["timing"])
+
+    # Everyone is done: a second run does nothing
+    batch, scraper = runner(monkeypatch, fetches)
+    assert batch.run(users, str(output))["resumed"] == 3
+    assert len(fetches) == 1
+
+
+def test_batch_records_stored_interests_and_leaves_digests_alone(monkeypatch, tmp_path):
+    monkeypatch.setattr(tools, "load_interests", lambda user_id: ["AI"])
+    monkeypatch.setattr(tools, "digest_store", None)  # any digest store access would fail the user
+    output = tmp_path / "digests.jsonl"
+    batch, _ = runner(monkeypatch, [])
+    assert batch.run([{"user_id": "u1"}], str(output))["ok"] == 1
+
+    record = json.loads(output.read_text())
+    assert record["interests"] == ["AI"]
+    assert [a["url"] for a in record["articles"]] == ["https://a/1"]
+
+
+def test_read_users_skips_bad_lines(tmp_path):
+    path = tmp_path / "users.jsonl"
+    path.write_text('{"user_id": "a"}\nnot json\n{"interests": ["x"]}\n\n{"user_id": "a", "interests": ["y"]}\n')
+    assert batch_digest.read_users(str(path)) == [{"user_id": "a", "interests": ["y"]}]
+
+
+def test_shared_filter_classifies_the_union_once(monkeypatch, tmp_path):
+    users = [
+        {"user_id": "u1", "interests": ["AI"]},
+        {"user_id": "u2", "interests": ["ai", "Football"]},
+        {"user_id": "u3", "interests": ["football"]},
+    ]
+    outputs = {}
+    for shared in (True, False):
+        llm = FakeLLM()
+        batch, _ = runner(monkeypatch, [], llm, shared=shared, prefilter=False)
+        output = tmp_path / f"shared-{shared}.jsonl"
+        batch.run(users, str(output))
+        records = sorted(map(json.loads, output.read_text().splitlines()), key=lambda r: r["user_id"])
+        outputs[shared] = ([[a["matched_interests"] for a in r["articles"]] for r in records], llm.calls)
+
+    assert outputs[True][0] == outputs[False][0] == [[["AI"]], [["ai"], ["Football"]], [["football"]]]
+    # One classification of the distinct interests instead of one per user
+    assert (outputs[True][1], outputs[False][1]) == (1, 3)
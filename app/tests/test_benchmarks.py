@@ -0,0 +1,64 @@
+import sys
+import json
+import subprocess
+from benchmarks.stubs import BENCH_INTERESTS, fake_reply, synthetic_article
+from agents.tools import batch_prompt, parse_batch_verdicts, interest_prompt, parse_relevance, matched_from_scores
+
+
+def test_fake_llm_answers_pipeline_prompts():
+    articles = [synthetic_article(i, "http://stub") for i in range(4)]
+    articles = [{"title": a["title"], "content": a["description"]} for a in articles]
+    verdicts = parse_batch_verdicts(fake_reply(batch_prompt(articles, BENCH_INTERESTS)), BENCH_INTERESTS, 4)
+    assert [matched_from_scores(v, BENCH_INTERESTS) for v in verdicts] == [
+        ["climate change"], ["football"], ["artificial intelligence"], []
+    ]
+    scores = parse_relevance(fake_reply(interest_prompt(articles[1], BENCH_INTERESTS)), BENCH_INTERESTS)
+    assert matched_from_scores(scores, BENCH_INTERESTS) == ["football"]
+    # Deterministic summaries
+    assert fake_reply([{"role": "user", "content": "x"}]) == fake_reply([{"role": "user", "content": "x"}])
+
+
+def test_benchmark_runs_offline(tmp_path):
+    output = tmp_path / "bench.json"
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.run", "--articles", "4", "--concurrency", "2",
+         "--warmup", "0", "--token-latency-ms", "0", "--prefill-latency-ms", "0", "--output", str(output)],
+        check=True, capture_output=True, timeout=240,
+    )
+    results = json.loads(output.read_text())
+    assert [cell["mode"] for cell in results["cells"]] == ["sync", "async"]
+    for cell in results["cells"]:
+        assert (cell["articles"], cell["concurrency"], cell["requests"]) == (4, 2, 2)
+        assert cell["first_summary_p50_s"] is not None
+        assert cell["stages"]["summarize"]["llm_calls_total"] > 0
+        # Three of the four stories match an interest and get scraped, per request
+        assert cell["stages"]["scrape_content"]["http_requests_total"] == 6
+    comparison, = results["async_vs_sync"]
+    assert (comparison["articles"], comparison["concurrency"]) == (4, 2)
+    assert comparison["latency_p50_ratio"] > 0 and comparison["throughput_ratio"] > 0
+
+
+def test_benchmark_runs_pipelined(tmp_path):
+    output = tmp_path / "bench.json"
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.run", "--articles", "4", "--concurrency", "1", "--pipelined", "--modes", "sync",
+         "--warmup", "0", "--token-latency-ms", "0", "--prefill-latency-ms", "0", "--output", str(output)],
+        check=True, capture_output=True, timeout=240,
+    )
+    cell, = json.loads(output.read_text())["cells"]
+    assert cell["first_summary_p50_s"] is not None
+    assert cell["stages"]["pipeline"]["http_requests_total"] == 3
+    assert "summarize" not in cell["stages"]
+
+
+def test_startup_profile_keeps_heavy_imports_lazy(tmp_path):
+    output = tmp_path / "startup.json"
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--modules", "agents.agent_graph", "--repeat", "1",
+         "--skip-warmup", "--output", str(output)],
+        check=True, capture_output=True, timeout=240,
+    )
+    profile, = json.loads(output.read_text())["imports"]
+    assert profile["module"] == "agents.agent_graph"
+    assert profile["eager_lazy_modules"] == []
+    assert profile["slowest"][0]["module"] == "agents.agent_graph"
@@ -0,0 +1,106 @@
+import pickle
+import pytest
+from langgraph.graph import StateGraph, END
+
+from agents.state_types import State
+from agents.agent_graph import make_node, prepare_run, finish_run
+from services.article_store import ArticleStore, article_store
+from services.checkpoint_store import CHECKPOINT_DURABILITY, SqliteCheckpointSaver, thread_config
+
+
+def build_test_graph(saver, calls, fail_first_summary=True):
+    def fetch(state):
+        calls.append("fetch")
+        state["news"] = [article_store(state).put({"title": "AI"}, "scraped text")]
+        return state
+
+    def summarize(state):
+        calls.append("summarize")
+        if fail_first_summary and calls.count("summarize") == 1:
+            raise RuntimeError("LLM server went away")
+        store = article_store(state)
+        state["news"] = [{**n, "summary": "Summary of " + store.content(n)} for n in state["news"]]
+        return state
+
+    graph = StateGraph(State)
+    graph.add_node("fetch_news", make_node(fetch, "fetch_news"))
+    graph.add_node("summarize", make_node(summarize, "summarize"))
+    graph.add_edge("fetch_news", "summarize")
+    graph.add_edge("summarize", END)
+    graph.set_entry_point("fetch_news")
+    return graph.compile(checkpointer=saver)
+
+
+def test_failed_run_resumes_after_the_last_completed_node(tmp_path):
+    saver = SqliteCheckpointSaver(path=str(tmp_path / "checkpoints.sqlite"))
+    calls = []
+    graph = build_test_graph(saver, calls)
+    inputs = {"user_input": "Show me the news", "deadline": 1.0}
+
+    run_input, config = prepare_run(graph, inputs, "alice:news")
+    try:
+        graph.invoke(run_input, config, durability=CHECKPOINT_DURABILITY)
+    except RuntimeError:
+        pass
+
+    # The retry skips fetching, gets the new deadline and reads the checkpointed article body
+    run_input, config = prepare_run(graph, {**inputs, "deadline": 2.0}, "alice:news")
+    assert run_input is None
+    state = graph.invoke(run_input, config, durability=CHECKPOINT_DURABILITY)
+    assert calls == ["fetch", "summarize", "summarize"]
+    assert state["news"][0]["summary"] == "Summary of scraped text"
+    assert state["deadline"] == 2.0 and state["visited_nodes"] == ["fetch_news", "summarize"]
+
+    finish_run(graph, config)
+    assert saver.get_tuple(thread_config("alice:news")) is None
+    assert prepare_run(graph, inputs, "alice:news")[0] is inputs
+
+
+def test_saver_keeps_the_latest_checkpoint_and_prunes_threads(tmp_path):
+    saver = SqliteCheckpointSaver(path=str(tmp_path / "checkpoints.sqlite"), max_threads=2)
+    calls = []
+    graph = build_test_graph(saver, calls, fail_first_summary=False)
+    for thread_id in ("a", "b", "c"):
+        graph.invoke({"user_input": "Show me the news"}, thread_config(thread_id))
+        assert len(list(saver.list(thread_config(thread_id)))) == 1
+
+    assert saver.get_tuple(thread_config("a")) is None
+    assert saver.stats()["threads"] == 2 and saver.stats()["pruned_threads"] == 1
+
+    saver.ttl = 0
+    graph.invoke({"user_input": "Show me the news"}, thread_config("d"))
+    assert [t.config["configurable"]["thread_id"] for t in saver.list(None)] == ["d"]
+
+
+def test_article_store_is_checkpointed_without_pickle(tmp_path):
+    serde = SqliteCheckpointSaver(path=str(tmp_path / "checkpoints.sqlite")).serde
+    store = ArticleStore()
+    a = store.put({"title": "A"}, "prepared", ["one", "two"])
+    type_, data = serde.dumps_typed({"article_store": store})
+    assert type_ == "msgpack"
+
+    restored = serde.loads_typed((type_, data))["article_store"]
+    assert isinstance(restored, ArticleStore)
+    assert restored.content(a) == "prepared" and restored.chunks(a) == ["one", "two"]
+    assert restored.put({"title": "B"}, "new")["id"] != a["id"]
+    with pytest.raises(NotImplementedError):
+        serde.loads_typed(("pickle", pickle.dumps(store._asdict())))
+
+
+def test_expired_run_is_started_over_instead_of_resumed(tmp_path):
+    saver = SqliteCheckpointSaver(path=str(tmp_path / "checkpoints.sqlite"), ttl=3600)
+    calls = []
+    graph = build_test_graph(saver, calls)
+    inputs = {"user_input": "Show me the news"}
+
+    run_input, config = prepare_run(graph, inputs, "alice:news")
+    with pytest.raises(RuntimeError):
+        graph.invoke(run_input, config, durability=CHECKPOINT_DURABILITY)
+    # The run was interrupted two hours ago and nothing has been saved since
+    saver._connect().execute("UPDATE checkpoints SET saved_at = saved_at - 7200")
+
+    run_input, config = prepare_run(graph, inputs, "alice:news")
+    assert run_input is inputs
+    assert saver.stats()["threads"] == 0
+    graph.invoke(run_input, config, durability=CHECKPOINT_DURABILITY)
+    assert calls == ["fetch", "summarize", "fetch", "summarize"]
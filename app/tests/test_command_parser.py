@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+from agents.command_parser import fast_parse, parse_command_node
+
+
+class CountingLLM:
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        return SimpleNamespace(content=self.reply)
+
+
+def test_fast_path_resolves_trivial_commands():
+    assert fast_parse("Show interests") == ({"action": "list_interests"}, 1.0)
+    assert fast_parse("Show me the news") == ({"action": "fetch_news"}, 1.0)
+    assert fast_parse("Add Tesla") == ({"action": "store_interest", "interest": "Tesla"}, 1.0)
+    assert fast_parse("Remove artificial intelligence from my interests.") == (
+        {"action": "remove_interest", "interest": "artificial intelligence"}, 1.0
+    )
+    assert fast_parse("Hello") == (None, 0.0)
+
+
+def test_llm_fallback_is_memoized():
+    llm = CountingLLM("{'action': 'unknown'}")
+    node = parse_command_node(llm)
+
+    assert node({"user_input": "Add Tesla"})["parse_path"] == "fast_path"
+    assert llm.calls == 0
+
+    first = node({"user_input": "Hello  there"})
+    second = node({"user_input": "Hello there!"})
+    assert (first["action"], first["parse_path"]) == ("unknown", "llm")
+    assert (second["action"], second["parse_path"]) == ("unknown", "memo")
+    assert llm.calls == 1
+
+
+def test_llm_reply_only_sets_command_fields():
+    llm = CountingLLM("{'action': 'list_interests', 'user_id': 'bob', 'interests': ['Crypto']}")
+    node = parse_command_node(llm)
+
+    state = node({"user_input": "which topics do i follow", "user_id": "alice"})
+    assert state["action"] == "list_interests"
+    assert state["user_id"] == "alice" and "interests" not in state
+    assert node({"user_input": "which topics do i follow", "user_id": "carol"})["user_id"] == "carol"
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import agents.tools as tools
+from services.article_store import ArticleStore
+from services.compression import approx_tokens, compress, prepare_content, strip_boilerplate
+
+
+def make_article(n_sentences):
+    return "\n".join(
+        f"Sentence {i} reports that the council approved the harbor budget for the city of Valencia."
+        for i in range(n_sentences)
+    )
+
+
+def test_strip_boilerplate_drops_furniture_and_repeats():
+    text = "Advertisement\nThe mayor spoke.\nRead more: other story\nThe mayor spoke.\nSign up for our newsletter\nVotes follow."
+    assert strip_boilerplate(text) == "The mayor spoke.\nVotes follow."
+
+
+def test_compress_fits_budget_and_keeps_order():
+    text = make_article(40)
+    compressed = compress(text, budget=200)
+    assert approx_tokens(compressed) <= 200
+    # Lead sentence is kept and the original order preserved
+    assert compressed.startswith("Sentence 0 ")
+    numbers = [int(s.split()[1]) for s in compressed.split(". ") if s]
+    assert numbers == sorted(numbers)
+
+
+def test_short_content_is_untouched():
+    assert prepare_content("Short article.", budget=200) == ("Short article.", None)
+
+
+def test_long_content_is_split_for_map_reduce():
+    content, chunks = prepare_content(make_article(200), budget=200, map_reduce_ratio=3, max_chunks=4)
+    assert len(chunks) == 4
+    assert all(approx_tokens(c) <= 200 for c in chunks)
+    assert content == "\n\n".join(chunks)
+
+
+class FakeMapReduceLLM:
+    model_name = "fake-model"
+
+    def __init__(self):
+        self.prompts = []
+
+    def batch(self, prompts, return_exceptions=False):
+        self.prompts += prompts
+        return [SimpleNamespace(content=f"part {i}") for i in range(len(prompts))]
+
+    def stream(self, prompt):
+        self.prompts.append(prompt)
+        yield SimpleNamespace(content="combined")
+
+
+def test_summarize_uses_map_reduce_for_chunked_articles(monkeypatch):
+    monkeypatch.setattr(tools, "get_stream_writer", lambda: lambda event: None)
+    llm = FakeMapReduceLLM()
+    store = ArticleStore()
+    news = [store.put({"title": "A", "url": "https://a", "source": "A"}, "one\n\ntwo", ["one", "two"])]
+    state = tools.build_summarize_node(llm, cache=None)({"news": news, "article_store": store})
+
+    assert state["news"][0]["summary"] == "combined"
+    assert len(llm.prompts) == 3
+    assert "part 0\n\npart 1" in llm.prompts[-1][0]["content"]
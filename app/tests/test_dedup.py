@@ -0,0 +1,31 @@
+from services.dedup import cluster_near_duplicates, normalize_headline, simhash
+
+import agents.tools as tools
+
+
+def test_simhash_is_stable_and_close_for_near_duplicates():
+    a = simhash("Tesla opens new gigafactory in Berlin amid protests from residents")
+    b = simhash("Tesla opens new gigafactory in Berlin amid protests from local residents")
+    c = simhash("Heavy rain expected across the region")
+    assert a == simhash("Tesla opens new gigafactory in Berlin amid protests from residents")
+    assert bin(a ^ b).count("1") <= 6 < bin(a ^ c).count("1")
+
+
+def test_normalize_headline_strips_source_suffix():
+    assert normalize_headline("Tesla opens new gigafactory in Berlin - Reuters") == "Tesla opens new gigafactory in Berlin"
+    assert normalize_headline("Fed holds rates steady | AP News") == "Fed holds rates steady"
+
+
+def test_dedup_node_keeps_one_representative_per_story():
+    description = "The carmaker started production at its first European plant on Tuesday."
+    news = [
+        {"title": "Tesla opens new gigafactory in Berlin - Reuters", "content": description, "url": "https://a", "source": "Reuters"},
+        {"title": "Heavy rain expected across the region", "content": "", "url": "https://b", "source": "B"},
+        {"title": "Tesla opens new gigafactory in Berlin | AP News", "content": description + " Protests continue.", "url": "https://c", "source": "AP"},
+    ]
+    state = tools.dedup_news_node({"news": news})
+
+    assert [n["url"] for n in state["news"]] == ["https://c", "https://b"]
+    assert state["news"][0]["alternates"] == [{"title": news[0]["title"], "url": "https://a", "source": "Reuters"}]
+    assert state["dedup_stats"] == {"articles": 3, "clusters": 2}
+    assert cluster_near_duplicates(["a b c", "x y z", "a b c"]) == [[0, 2], [1]]
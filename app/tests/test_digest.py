@@ -0,0 +1,88 @@
+import agents.tools as tools
+import agents.digest_scheduler as digest_scheduler
+from agents.command_parser import fast_parse
+from services.article_store import ArticleStore
+from services.digest_store import DigestStore, digest_key
+from services.memory import JsonInterestStore, SQLiteInterestStore
+
+
+def article(i, summary="s"):
+    return {"title": f"T{i}", "url": f"https://x.com/{i}", "source": "X", "content": "c", "summary": summary}
+
+
+def test_merge_adds_new_articles_in_front_and_bounds_size(tmp_path):
+    store = DigestStore(str(tmp_path / "d.sqlite"), max_articles=3)
+    key = digest_key(["AI", "weather"])
+    store.merge(key, [article(1), article(2)], ["x.com/1", "x.com/2"])
+    digest = store.merge(key, [article(3), article(4)], ["x.com/3", "x.com/4", "x.com/5"])
+
+    assert [a["title"] for a in digest["articles"]] == ["T3", "T4", "T1"]
+    assert digest["seen"] == ["x.com/1", "x.com/2", "x.com/3", "x.com/4", "x.com/5"]
+    assert store.get(digest_key(["weather", "ai"]))["articles"] == digest["articles"]
+
+
+def test_digest_nodes_serve_and_update_incrementally(monkeypatch, tmp_path):
+    store = DigestStore(str(tmp_path / "d.sqlite"))
+    monkeypatch.setattr(tools, "digest_store", store)
+    monkeypatch.setattr(tools, "load_interests", lambda user_id: ["AI"])
+
+    # No digest yet: the pipeline runs
+    assert not tools.serve_digest_node({"user_id": "u"}).get("digest_served")
+    bodies = ArticleStore()
+    state = {
+        "user_id": "u",
+        "news": [bodies.put(article(1), "text"), bodies.put(article(2, summary=""), "text"), article(3)],
+        "all_news_filtered": [article(1), article(2), article(3), article(4)],
+        "article_store": bodies,
+    }
+    state = tools.store_digest_node(state)
+    assert [a["title"] for a in state["news"]] == ["T1"]
+    assert state["digest_stats"]["added"] == 1
+
+    # Failed summaries and unscraped articles are retried, the rest skipped
+    news = [article(i) for i in range(1, 6)] + [{**article(6), "url": None}]
+    state = tools.skip_seen_news_node({"user_id": "u", "news": news})
+    assert [a["title"] for a in state["news"]] == ["T2", "T3", "T5", "T6"]
+    assert state["digest_stats"] == {"new": 4, "skipped": 2}
+
+    served = tools.serve_digest_node({"user_id": "u"})
+    assert served["digest_served"] and [a["title"] for a in served["news"]] == ["T1"]
+    assert not tools.serve_digest_node({"user_id": "u", "refresh": True}).get("digest_served")
+
+
+def test_refresh_commands_bypass_digest():
+    assert fast_parse("refresh news") == ({"action": "fetch_news", "refresh": True}, 1.0)
+    assert fast_parse("Show me fresh news") == ({"action": "fetch_news", "refresh": True}, 1.0)
+    assert fast_parse("Show me the news") == ({"action": "fetch_news"}, 1.0)
+
+
+def test_interest_stores_list_users(tmp_path):
+    sqlite_store = SQLiteInterestStore(str(tmp_path / "i.sqlite"), legacy_json=None)
+    json_store = JsonInterestStore(str(tmp_path / "user_interests.json"))
+    for store in (sqlite_store, json_store):
+        store.add("default", "AI")
+        store.add("alice", "AI")
+        assert sorted(store.users()) == ["alice", "default"]
+
+
+class FakeGraph:
+    checkpointer = None
+
+    def __init__(self):
+        self.inputs = []
+
+    def invoke(self, inputs, config=None, durability=None):
+        self.inputs.append(inputs)
+
+
+def test_scheduler_runs_once_per_interest_set(monkeypatch):
+    interests = {"alice": ["AI", "Weather"], "bob": ["weather", "ai"], "carol": ["Sports"], "dave": []}
+    monkeypatch.setattr(digest_scheduler, "list_users", lambda: list(interests))
+    monkeypatch.setattr(digest_scheduler, "load_interests", lambda user_id: interests[user_id])
+    graph = FakeGraph()
+    scheduler = digest_scheduler.DigestScheduler(graph, interval=60)
+    scheduler.refresh_all()
+
+    assert [i["user_id"] for i in graph.inputs] == ["alice", "carol"]
+    assert all(i["refresh"] for i in graph.inputs)
+    assert scheduler.stats()["runs"] == 2
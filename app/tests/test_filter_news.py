@@ -0,0 +1,153 @@
+import json
+import time
+import sqlite3
+from types import SimpleNamespace
+
+import agents.tools as tools
+import services.prefilter as prefilter
+from services.verdict_cache import VerdictCache
+
+
+class FakeLLM:
+    """Minimal stand-in for ChatOpenAI returning canned replies."""
+
+    def __init__(self, replies):
+        self.replies = replies if callable(replies) else list(replies)
+        self.prompts = []
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        if callable(self.replies):
+            return SimpleNamespace(content=self.replies(prompt))
+        return SimpleNamespace(content=self.replies.pop(0))
+
+
+def keyword_reply(prompt):
+    """Per-article reply that depends only on the prompt, safe under threads."""
+    system, user = prompt[0]["content"], prompt[1]["content"]
+    if "Tesla opens" in user and "Tesla" in system:
+        return "yes, tesla"
+    if "Rain" in user and "weather" in system:
+        return "yes, weather"
+    return "no"
+
+
+NEWS = [
+    {"title": "Tesla opens new factory", "content": "", "url": "https://a", "source": "A"},
+    {"title": "Rain expected tomorrow", "content": "", "url": "https://b", "source": "B"},
+    {"title": "Local bakery wins prize", "content": "", "url": "https://c", "source": "C"},
+]
+
+
+def test_batch_filter_uses_one_call(monkeypatch):
+    monkeypatch.setattr(tools, "load_interests", lambda user_id: ["Tesla", "weather"])
+    reply = json.dumps([
+        {"id": 0, "interests": ["tesla"]},
+        {"id": 1, "interests": ["weather"]},
+        {"id": 2, "interests": []},
+    ])
+    llm = FakeLLM([reply])
+    state = tools.build_tools_filter_news_node(llm, batch_size=8, prefilter=False, cache=None)({"news": NEWS})
+
+    assert len(llm.prompts) == 1
+    assert [n["matched_interests"] for n in state["all_news_filtered"]] == [["Tesla"], ["weather"], []]
+    assert [n["url"] for n in state["news"]] == ["https://a", "https://b"]
+
+
+def test_batch_filter_falls_back_per_article(monkeypatch):
+    monkeypatch.setattr(tools, "load_interests", lambda user_id: ["Tesla"])
+    llm = FakeLLM(["not json", "yes, tesla", "no", "no"])
+    state = tools.build_tools_filter_news_node(llm, batch_size=8, prefilter=False, cache=None)({"news": NEWS})
+
+    assert len(llm.prompts) == 4
+    assert [n["url"] for n in state["news"]] == ["https://a"]
+
+
+def test_prefilter_skips_llm_for_clear_cases(monkeypatch):
+    monkeypatch.setattr(prefilter, "PREFILTER_HIGH", 1.0)
+    monkeypatch.setattr(tools, "load_interests", lambda user_id: ["Tesla"])
+    llm = FakeLLM([])
+    state = tools.build_tools_filter_news_node(llm, batch_size=1, prefilter=True, cache=None)({"news": NEWS})
+
+    assert llm.prompts == []
+    assert [n["url"] for n in state["news"]] == ["https://a"]
+    assert state["prefilter_stats"] == {"rejected": 2, "accepted": 1, "sent_to_llm": 0, "llm_calls_saved": 3}
+
+
+def test_verdict_cache_only_classifies_new_interest(monkeypatch, tmp_path):
+    cache = VerdictCache(path=str(tmp_path / "verdicts.sqlite"))
+    monkeypatch.setattr(tools, "load_interests", lambda user_id: ["Tesla"])
+    llm = FakeLLM(keyword_reply)
+    node = tools.build_tools_filter_news_node(llm, batch_size=1, prefilter=False, cache=cache)
+    node({"news": NEWS})
+    assert len(llm.prompts) == 3
+
+    node({"news": NEWS})
+    assert len(llm.prompts) == 3
+    assert cache.stats()["hits"] == 3
+
+    monkeypatch.setattr(tools, "load_interests", lambda user_id: ["Tesla", "weather"])
+    state = node({"news": NEWS})
+    assert len(llm.prompts) == 6
+    assert all("Tesla" not in p[0]["content"] for p in llm.prompts[3:])
+    assert [n["matched_interests"] for n in state["all_news_filtered"]] == [["Tesla"], ["weather"], []]
+
+
+def test_verdict_cache_migrates_yes_no_verdicts_to_scores(tmp_path):
+    path = str(tmp_path / "verdicts.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE verdicts (article TEXT NOT NULL, interest TEXT NOT NULL, verdict INTEGER NOT NULL,"
+        " reason TEXT, created_at REAL NOT NULL, used_at REAL NOT NULL, PRIMARY KEY (article, interest))"
+    )
+    conn.execute("INSERT INTO verdicts VALUES ('a', 'tesla', 1, 'yes', ?, ?)", (time.time(), time.time()))
+    conn.commit()
+    conn.close()
+
+    cache = VerdictCache(path=path)
+    assert cache.get_many("a", ["Tesla"]) == {"Tesla": (1.0, "yes")}
+    cache.put_many("b", {"Tesla": (0.75, None)})
+    assert cache.get_many("b", ["Tesla"]) == {"Tesla": (0.75, None)}
+    columns = {row[1]: row[2] for row in sqlite3.connect(path).execute("PRAGMA table_info(verdicts)")}
+    assert columns["score"] == "REAL" and "verdict" not in columns
+
+
+def test_relevance_scores_rank_news_and_top_k_skips(monkeypatch):
+    monkeypatch.setattr(tools, "load_interests", lambda user_id: ["Tesla", "weather"])
+    reply = json.dumps([
+        {"id": 0, "scores": {"Tesla": 6, "weather": 0}},
+        {"id": 1, "scores": {"Tesla": 0, "weather": 9}},
+        {"id": 2, "scores": {"Tesla": 3, "weather": 2}},
+    ])
+    node = tools.build_tools_filter_news_node(FakeLLM([reply]), batch_size=8, prefilter=False, cache=None, top_k=1)
+    state = node({"news": NEWS})
+
+    assert [n["relevance"] for n in state["all_news_filtered"]] == [0.6, 0.9, 0.3]
+    assert [n["matched_interests"] for n in state["all_news_filtered"]] == [["Tesla"], ["weather"], []]
+    assert [n["url"] for n in state["news"]] == ["https://b", "https://a"]
+    assert [n.get("skipped") for n in state["news"]] == [None, "top_k"]
+
+
+def test_parse_relevance_reads_scores_and_yes_no():
+    assert tools.parse_relevance('Sure: {"tesla": 8, "Weather": 12, "other": 5}', ["Tesla", "weather"]) == {
+        "Tesla": 0.8, "weather": 1.0,
+    }
+    assert tools.parse_relevance("yes, weather", ["Tesla", "weather"]) == {"weather": 1.0}
+    assert tools.parse_relevance("no", ["Tesla"]) == {}
+
+
+def test_user_filter_derives_matches_from_union_scores():
+    union = tools.InterestUnion([["Tesla", "weather"], ["tesla", "Bakeries"]])
+    assert union.interests == ["Tesla", "weather", "Bakeries"]
+    assert union.mask(["TESLA", "bakeries"]) == 0b101
+
+    shared = [
+        {**NEWS[0], "relevance_scores": {"Tesla": 0.8, "weather": 0.0, "Bakeries": 0.1}},
+        {**NEWS[1], "relevance_scores": {"Tesla": 0.0, "weather": 0.9, "Bakeries": 0.0}},
+        {**NEWS[2], "relevance_scores": {"Tesla": 0.0, "weather": 0.2, "Bakeries": 0.7}},
+    ]
+    state = tools.user_filter({"interests": ["tesla", "Bakeries"]}, shared, union, top_k=0)
+
+    assert [n["matched_interests"] for n in state["all_news_filtered"]] == [["tesla"], [], ["Bakeries"]]
+    assert state["all_news_filtered"][1]["relevance_scores"] == {"tesla": 0.0, "Bakeries": 0.0}
+    assert [n["url"] for n in state["news"]] == ["https://a", "https://c"]
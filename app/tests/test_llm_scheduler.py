@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+import pytest
+from services.llm_scheduler import LLMScheduler, PRIORITY_INTERACTIVE, PRIORITY_BULK
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class FakeLLM:
+    model_name = "fake"
+
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.calls = 0
+
+    def _maybe_fail(self):
+        self.calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+
+    def invoke(self, prompt):
+        self._maybe_fail()
+        return f"reply to {prompt}"
+
+    async def ainvoke(self, prompt):
+        self._maybe_fail()
+        return f"reply to {prompt}"
+
+    def stream(self, prompt):
+        self._maybe_fail()
+        yield "a"
+        yield "b"
+
+
+def scheduler(**kwargs):
+    return LLMScheduler(**{"initial_limit": 2, "max_limit": 4, "retry_base_delay": 0.001, **kwargs})
+
+
+def test_waiters_are_admitted_by_priority():
+    sched = scheduler(initial_limit=1, max_limit=1)
+    sched.acquire(PRIORITY_BULK)
+    order = []
+
+    def worker(priority, name):
+        sched.acquire(priority)
+        order.append(name)
+        sched.release()
+
+    threads = [threading.Thread(target=worker, args=(PRIORITY_BULK, "bulk"))]
+    threads[0].start()
+    while sched.stats()["queued_bulk"] < 1:
+        time.sleep(0.001)
+    threads.append(threading.Thread(target=worker, args=(PRIORITY_INTERACTIVE, "interactive")))
+    threads[1].start()
+    while sched.stats()["queued_interactive"] < 1:
+        time.sleep(0.001)
+
+    assert sched.stats()["queued"] == 2
+    sched.release()
+    for t in threads:
+        t.join()
+    assert order == ["interactive", "bulk"]
+    assert sched.stats()["in_flight"] == 0
+
+
+def test_limit_grows_when_fast_and_shrinks_when_latency_degrades():
+    sched = scheduler()
+    for _ in range(10):
+        sched.observe("k", 0.1)
+    assert sched.limit == 4  # capped at max_limit
+
+    sched.observe("k", 1.0)
+    assert sched.limit == pytest.approx(4 * 0.7)
+    assert sched.stats()["limit_decreases"] == 1
+
+    sched.reset_adaptation()
+    assert sched.limit == 2 and sched.stats()["requests"] == 11
+    sched.observe("k", 1.0)  # the baseline was forgotten, so this is not slow
+    assert sched.limit > 2
+
+
+def test_retries_throttling_but_not_client_errors():
+    sched = scheduler()
+    llm = FakeLLM([StatusError(429), StatusError(503)])
+    assert sched.bind(llm, PRIORITY_BULK).invoke("p") == "reply to p"
+    assert llm.calls == 3
+    assert sched.stats()["retries"] == 2
+    assert sched.stats()["throttled"] == 2
+
+    llm = FakeLLM([StatusError(400)])
+    with pytest.raises(StatusError):
+        sched.bind(llm, PRIORITY_BULK).invoke("p")
+    assert llm.calls == 1
+    assert sched.stats()["in_flight"] == 0
+
+
+def test_stream_and_batch_go_through_the_scheduler():
+    sched = scheduler()
+    scheduled = sched.bind(FakeLLM([StatusError(429)]), PRIORITY_BULK)
+    assert list(scheduled.stream("p")) == ["a", "b"]
+    assert scheduled.model_name == "fake"
+
+    replies = sched.bind(FakeLLM([StatusError(400)]), PRIORITY_BULK).batch(["x"], return_exceptions=True)
+    assert isinstance(replies[0], StatusError)
+    assert sched.stats()["in_flight"] == 0
+
+
+def test_async_calls_share_the_limit():
+    sched = scheduler(initial_limit=1, max_limit=1)
+    running, peak = 0, 0
+
+    class SlowLLM:
+        async def ainvoke(self, prompt):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return prompt
+
+    async def main():
+        scheduled = sched.bind(SlowLLM(), PRIORITY_BULK)
+        waiter = asyncio.create_task(scheduled.ainvoke("cancelled"))
+        await sched.aacquire(PRIORITY_BULK)
+        sched.release()
+        waiter.cancel()
+        return await scheduled.abatch(["a", "b", "c"])
+
+    assert asyncio.run(main()) == ["a", "b", "c"]
+    assert peak == 1
+    assert sched.stats()["in_flight"] == 0
@@ -0,0 +1,46 @@
+import json
+import pytest
+
+from services.memory import DEFAULT_USER, InterestStore, SQLiteInterestStore
+
+
+def test_sqlite_store_migrates_json_and_namespaces_users(tmp_path):
+    legacy = tmp_path / "user_interests.json"
+    legacy.write_text(json.dumps(["Tesla", "weather"]))
+    store = SQLiteInterestStore(path=str(tmp_path / "interests.sqlite"), legacy_json=str(legacy))
+
+    assert store.load(DEFAULT_USER) == ["Tesla", "weather"]
+    assert store.load("alice") == []
+
+    store.add("alice", "Tesla")
+    store.add("alice", "TESLA")
+    assert store.load("alice") == ["Tesla"]
+    assert store.remove("alice", "tesla") is True
+    assert store.remove("alice", "tesla") is False
+    assert store.load(DEFAULT_USER) == ["Tesla", "weather"]
+
+
+def test_json_migration_runs_once(tmp_path):
+    legacy = tmp_path / "user_interests.json"
+    legacy.write_text(json.dumps(["Tesla"]))
+    path = str(tmp_path / "interests.sqlite")
+    store = SQLiteInterestStore(path=path, legacy_json=str(legacy))
+    store.remove(DEFAULT_USER, "Tesla")
+
+    reopened = SQLiteInterestStore(path=path, legacy_json=str(legacy))
+    assert reopened.load(DEFAULT_USER) == []
+
+
+def test_incomplete_backend_fails_when_instantiated():
+    class NoRemoveStore(InterestStore):
+        def load(self, user_id):
+            return []
+
+        def add(self, user_id, interest):
+            pass
+
+        def users(self):
+            return []
+
+    with pytest.raises(TypeError):
+        NoRemoveStore()
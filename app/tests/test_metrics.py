@@ -0,0 +1,51 @@
+from services.metrics import MetricsRegistry, NodeMetrics, current_node, record_http, metrics_callback
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.messages import AIMessage
+
+
+def test_record_http_attributes_to_current_node():
+    metrics = NodeMetrics("fetch_news")
+    token = current_node.set(metrics)
+    try:
+        record_http(0.2)
+        record_http(0.3)
+    finally:
+        current_node.reset(token)
+    record_http(1.0)  # No node running: ignored
+    assert metrics.http_requests == 2
+    assert round(metrics.http_s, 3) == 0.5
+
+
+def test_callback_counts_calls_tokens_and_ttft():
+    metrics = NodeMetrics("summarize")
+    token = current_node.set(metrics)
+    try:
+        metrics_callback.on_chat_model_start({}, [[]], run_id="run-1")
+        metrics_callback.on_llm_new_token("Hello", run_id="run-1")
+        metrics_callback.on_llm_new_token(" world", run_id="run-1")
+        message = AIMessage(content="Hello world", usage_metadata={"input_tokens": 12, "output_tokens": 2, "total_tokens": 14})
+        metrics_callback.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]), run_id="run-1")
+    finally:
+        current_node.reset(token)
+    assert metrics.llm_calls == 1
+    assert (metrics.prompt_tokens, metrics.completion_tokens) == (12, 2)
+    assert len(metrics.ttft_s) == 1
+
+
+def test_registry_exports_prometheus_and_json():
+    registry = MetricsRegistry()
+    metrics = NodeMetrics("filter_news")
+    metrics.add(llm_calls=3, prompt_tokens=100, completion_tokens=10)
+    metrics.finish()
+    registry.observe(metrics)
+    registry.register_collector("verdict_cache", lambda: {"hits": 1})
+
+    text = registry.prometheus()
+    assert 'news_agent_node_latency_seconds_count{node="filter_news"} 1' in text
+    assert 'news_agent_llm_calls_total{node="filter_news"} 3' in text
+    assert 'le="+Inf"' in text
+
+    snapshot = registry.snapshot()
+    assert snapshot["nodes"]["filter_news"]["count"] == 1
+    assert snapshot["nodes"]["filter_news"]["prompt_tokens_total"] == 100
+    assert snapshot["verdict_cache"] == {"hits": 1}
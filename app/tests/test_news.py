@@ -1,9 +1,47 @@
-from services.news import fetch_news
+import json
+
+import services.news as news_service
+from services.news import fetch_news, canonical_url
+
+RSS = """<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Wire</title>
+<item><title>Tesla opens factory</title><link>http://www.example.com/tesla/?utm_source=rss</link>
+<description>Syndicated</description><pubDate>Mon, 06 Jan 2025 10:00:00 GMT</pubDate></item>
+<item><title>Older story</title><link>https://example.com/old</link>
+<pubDate>Sun, 05 Jan 2025 10:00:00 GMT</pubDate></item>
+</channel></rss>"""
+
+NEWS_API = json.dumps({"status": "ok", "articles": [{
+    "title": "Tesla opens factory", "description": "From the API", "url": "https://example.com/tesla",
+    "source": {"name": "API"}, "publishedAt": "2025-01-06T11:00:00Z",
+}, {
+    "title": "Removed story", "description": None, "url": None,
+    "source": {"name": "API"}, "publishedAt": "2025-01-04T11:00:00Z",
+}]})
+
 
 def test_fetch_news():
     articles = fetch_news(language="en", page_size=5)
     for n in articles:
         print(n["title"])
 
+
+def test_canonical_url_drops_tracking_and_www():
+    assert canonical_url("http://www.Example.com/a/?utm_source=x&id=3#top") == "https://example.com/a?id=3"
+    assert canonical_url(None) == ""
+
+
+def test_sources_are_merged_and_deduplicated(monkeypatch):
+    bodies = {news_service.NEWS_API_URL: NEWS_API, "https://feed": RSS}
+    monkeypatch.setattr(news_service, "_get", lambda url, params=None: bodies[url])
+    articles = fetch_news(page_size=5, feeds=["https://feed"])
+
+    assert articles == [
+        {"title": "Tesla opens factory", "content": "From the API", "url": "https://example.com/tesla", "source": "API"},
+        {"title": "Older story", "content": "", "url": "https://example.com/old", "source": "Wire"},
+        {"title": "Removed story", "content": "", "url": "", "source": "API"},
+    ]
+
+
 if __name__ == "__main__":
     test_fetch_news()
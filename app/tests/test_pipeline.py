@@ -0,0 +1,153 @@
+import re
+import json
+import time
+import asyncio
+from types import SimpleNamespace
+import pytest
+
+import agents.tools as tools
+import agents.pipeline as pipeline
+from services.scraper import ScrapeResult
+from services.verdict_cache import VerdictCache
+
+NEWS = [
+    {"title": "AI slow", "content": "d", "url": "https://slow/1", "source": "S"},
+    {"title": "Weather", "content": "d", "url": "https://a/2", "source": "A"},
+    {"title": "AI fast", "content": "d", "url": "https://a/3", "source": "A"},
+    {"title": "AI broken", "content": "d", "url": "https://a/4", "source": "A"},
+]
+
+
+class FakeLLM:
+    """Matches titles mentioning AI and streams 'Summary of <text>'."""
+
+    model_name = "fake-model"
+
+    def _verdicts(self, prompt):
+        titles = re.findall(r"\[(\d+)\] Title: (.*)", prompt[-1]["content"])
+        return SimpleNamespace(content=json.dumps(
+            [{"id": int(i), "interests": ["AI"] if "AI" in t else []} for i, t in titles]
+        ))
+
+    def invoke(self, prompt):
+        return self._verdicts(prompt)
+
+    async def ainvoke(self, prompt):
+        return self._verdicts(prompt)
+
+    def stream(self, prompt):
+        yield SimpleNamespace(content="Summary of " + prompt[-1]["content"].rsplit("\n", 1)[-1])
+
+    async def astream(self, prompt):
+        yield SimpleNamespace(content="Summary of " + prompt[-1]["content"].rsplit("\n", 1)[-1])
+
+
+class FakeScraper:
+    def _result(self, url):
+        if "/4" in url:
+            return ScrapeResult(url, None, "HTTP 500")
+        return ScrapeResult(url, f"text of {url}")
+
+    def scrape(self, url, deadline=None):
+        if "slow" in url:
+            time.sleep(0.3)
+        return self._result(url)
+
+    async def ascrape(self, url, deadline=None):
+        if "slow" in url:
+            await asyncio.sleep(0.3)
+        return self._result(url)
+
+
+def setup(monkeypatch):
+    events = []
+    monkeypatch.setattr(pipeline, "get_stream_writer", lambda: events.append)
+    monkeypatch.setattr(pipeline, "scraper", FakeScraper())
+    monkeypatch.setattr(tools, "load_interests", lambda user_id: ["AI"])
+    kwargs = dict(batch_size=2, prefilter=False, verdicts_cache=None, summaries_cache=None)
+    return events, kwargs
+
+
+def check(state, events):
+    assert [n["title"] for n in state["all_news_filtered"]] == [n["title"] for n in NEWS]
+    assert [n["title"] for n in state["news"]] == ["AI slow", "AI fast", "AI broken"]
+    assert [n["summary"] for n in state["news"]] == [
+        "Summary of text of https://slow/1",
+        "Summary of text of https://a/3",
+        "Content not available for summary",
+    ]
+    assert state["news"][2]["scrape_error"] == "HTTP 500"
+    assert state["scrape_stats"]["ok"] == 2 and state["scrape_stats"]["failed"] == 1
+    assert state["visited_nodes"][-4:] == list(pipeline.PIPELINE_STAGES)
+    assert len([e for e in events if "filter_verdict" in e]) == 4
+    # The fast article's summary is done before the slow page finishes downloading
+    order = [
+        ("done", e["summary_delta"]["idx"]) if "summary_delta" in e else ("scraped", e["scrape_progress"]["url"])
+        for e in events if "summary_delta" in e and e["summary_delta"]["op"] == "done" or "scrape_progress" in e
+    ]
+    assert order.index(("done", 2)) < order.index(("scraped", "https://slow/1"))
+
+
+def test_pipeline_overlaps_stages_and_fills_state(monkeypatch):
+    events, kwargs = setup(monkeypatch)
+    node = pipeline.build_pipeline_node(FakeLLM(), FakeLLM(), scrape_workers=2, max_in_flight=2, **kwargs)
+    check(node({"news": [dict(n) for n in NEWS], "visited_nodes": ["pipeline"]}), events)
+
+
+def test_async_pipeline_matches_sync(monkeypatch):
+    events, kwargs = setup(monkeypatch)
+    node = pipeline.build_async_pipeline_node(FakeLLM(), FakeLLM(), scrape_workers=2, max_in_flight=2, **kwargs)
+    check(asyncio.run(node({"news": [dict(n) for n in NEWS], "visited_nodes": ["pipeline"]})), events)
+
+
+class ScoringLLM(FakeLLM):
+    """Scores AI articles by title length so the longest title ranks first."""
+
+    def _verdicts(self, prompt):
+        titles = re.findall(r"\[(\d+)\] Title: (.*)", prompt[-1]["content"])
+        return SimpleNamespace(content=json.dumps(
+            [{"id": int(i), "scores": {"AI": len(t) if "AI" in t else 0}} for i, t in titles]
+        ))
+
+
+def test_pipeline_top_k_scrapes_only_the_most_relevant(monkeypatch):
+    events, kwargs = setup(monkeypatch)
+    node = pipeline.build_pipeline_node(ScoringLLM(), FakeLLM(), scrape_workers=2, max_in_flight=2, top_k=1, **kwargs)
+    state = node({"news": [dict(n) for n in NEWS], "visited_nodes": ["pipeline"]})
+
+    assert [n["title"] for n in state["news"]] == ["AI broken", "AI slow", "AI fast"]
+    assert [n.get("skipped") for n in state["news"]] == [None, "top_k", "top_k"]
+    assert state["news"][1]["summary"] == tools.SKIPPED_SUMMARIES["top_k"]
+    assert [e["scrape_progress"]["url"] for e in events if "scrape_progress" in e] == ["https://a/4"]
+
+
+class CountingLLM(FakeLLM):
+    def __init__(self):
+        self.calls = 0
+
+    def _verdicts(self, prompt):
+        self.calls += 1
+        return super()._verdicts(prompt)
+
+
+class BrokenScraper(FakeScraper):
+    def scrape(self, url, deadline=None):
+        raise ConnectionError("network down")
+
+
+def test_pipeline_verdicts_survive_a_failed_run(monkeypatch, tmp_path):
+    events, kwargs = setup(monkeypatch)
+    kwargs["verdicts_cache"] = VerdictCache(path=str(tmp_path / "verdicts.sqlite"))
+    monkeypatch.setattr(pipeline, "scraper", BrokenScraper())
+    llm = CountingLLM()
+    node = pipeline.build_pipeline_node(llm, FakeLLM(), scrape_workers=2, max_in_flight=2, **kwargs)
+    with pytest.raises(ConnectionError):
+        node({"news": [dict(n) for n in NEWS], "visited_nodes": ["pipeline"]})
+    assert llm.calls == 2
+
+    # The retried run reuses every classification
+    monkeypatch.setattr(pipeline, "scraper", FakeScraper())
+    state = node({"news": [dict(n) for n in NEWS], "visited_nodes": ["pipeline"]})
+    assert llm.calls == 2
+    assert [n["title"] for n in state["news"]] == ["AI slow", "AI fast", "AI broken"]
+    assert state["verdict_cache_stats"]["hits"] == 4
@@ -0,0 +1,49 @@
+from services.prefilter import InterestIndex
+
+
+ARTICLES = [
+    {"title": "Tesla recalls 10,000 cars", "content": ""},
+    {"title": "Heatwave: weather warnings issued", "content": ""},
+    {"title": "Local bakery wins prize", "content": ""},
+    {"title": "Teslin river floods", "content": ""},
+]
+
+
+def test_split_by_score_band():
+    index = InterestIndex()
+    rejected, accepted, uncertain = index.split(ARTICLES, ["Tesla", "weather"], low=0.25, high=1.0)
+
+    assert accepted == {0: ["Tesla"], 1: ["weather"]}
+    assert rejected == [2]
+    assert uncertain == [3]
+
+
+def test_short_interests_inside_other_words_are_not_accepted():
+    index = InterestIndex()
+    articles = [{"title": "Dubai aims to expand airport", "content": ""}, {"title": "Teslas sold out", "content": ""}]
+    rejected, accepted, uncertain = index.split(articles, ["AI", "Tesla"], low=0.25, high=1.0)
+
+    assert accepted == {} and uncertain == [0, 1]
+    assert index.split(ARTICLES, ["Tesla"])[1] == {}  # auto-accept is off by default
+
+
+def test_paraphrased_titles_are_rejected():
+    # These match their interests for the LLM, but share almost no n-grams with them
+    articles = [
+        {"title": "Global warming pushes sea temperatures to record highs", "content": ""},
+        {"title": "Musk's electric carmaker recalls vehicles", "content": ""},
+        {"title": "Premier League title race tightens", "content": ""},
+    ]
+    interests = ["climate change", "Tesla", "football"]
+    assert InterestIndex().split(articles, interests, low=0.25) == ([0, 1, 2], {}, [])
+
+
+def test_vectors_are_reused_across_interest_lists():
+    index = InterestIndex(max_interests=2)
+    index.matrix(["Tesla", "weather"])
+    tesla_vector = index._vectors["Tesla"]
+    index.matrix(["Tesla", "tennis"])
+
+    assert index._vectors["Tesla"] is tesla_vector
+    assert "weather" not in index._vectors
+    assert index.score(ARTICLES, ["Tesla", "tennis"]).shape == (4, 2)
@@ -0,0 +1,128 @@
+import time
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import agents.tools as tools
+import services.scraper as scraper_module
+from benchmarks.stubs import NewsStubServer
+from services.article_cache import ArticleCache
+from services.scraper import Scraper
+
+
+def test_scrape_stream_reports_each_url():
+    server = NewsStubServer(paragraphs=4).start()
+    try:
+        urls = [f"{server.url}/articles/{i}" for i in range(3)] + [f"{server.url}/missing"]
+        results = {r.url: r for r in Scraper(processes=0, cache=None).scrape_stream(urls)}
+    finally:
+        server.stop()
+    assert all(results[u].content and results[u].error is None for u in urls[:3])
+    assert results[urls[3]].content is None
+    assert "404" in results[urls[3]].error
+
+
+def test_async_scrape_with_process_pool():
+    server = NewsStubServer(paragraphs=4).start()
+    scraper = Scraper(processes=1, cache=None)
+
+    async def run():
+        return [r async for r in scraper.ascrape_stream([f"{server.url}/articles/{i}" for i in range(2)])]
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        scraper.shutdown()
+        server.stop()
+    assert len(results) == 2
+    assert all("about" in r.content for r in results)
+
+
+def test_per_host_concurrency_cap(monkeypatch):
+    active, peak = {}, {}
+    lock = threading.Lock()
+
+    def fake_get(url, headers, timeout, stream):
+        host = url.split("/")[2]
+        with lock:
+            active[host] = active.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), active[host])
+        time.sleep(0.05)
+        with lock:
+            active[host] -= 1
+        return SimpleNamespace(status_code=200, headers={}, iter_content=lambda size: [b"<html></html>"], close=lambda: None, raise_for_status=lambda: None)
+
+    monkeypatch.setattr(scraper_module, "get_session", lambda: SimpleNamespace(get=fake_get))
+    monkeypatch.setattr(scraper_module, "extract_text", lambda url, html: "text")
+    urls = [f"https://a.com/{i}" for i in range(6)] + [f"https://b.com/{i}" for i in range(6)]
+    results = list(Scraper(per_host=2, processes=0, cache=None).scrape_stream(urls))
+    assert len(results) == 12
+    assert peak == {"a.com": 2, "b.com": 2}
+
+
+def test_failures_are_reported_and_stale_copy_served(monkeypatch, tmp_path):
+    cache = ArticleCache(path=str(tmp_path / "articles.sqlite"))
+    cache.put("https://a/stale", "old text")
+
+    def fake_get(url, headers, timeout, stream):
+        raise ConnectionError("refused")
+
+    monkeypatch.setattr(scraper_module, "get_session", lambda: SimpleNamespace(get=fake_get))
+    scraper = Scraper(processes=0, cache=cache)
+    stale, missing = scraper.scrape("https://a/stale"), scraper.scrape("https://a/new")
+    assert (stale.content, stale.cached) == ("old text", True)
+    assert stale.error == "ConnectionError: refused"
+    assert missing.content is None and missing.error == "ConnectionError: refused"
+
+
+def test_not_modified_without_cached_copy_is_refetched(monkeypatch):
+    requests = []
+
+    def fake_get(url, headers, timeout, stream):
+        requests.append(headers)
+        status = 304 if len(requests) == 1 or "/gone" in url else 200
+        return SimpleNamespace(status_code=status, headers={}, iter_content=lambda size: [b"<html></html>"], close=lambda: None, raise_for_status=lambda: None)
+
+    extracted = []
+    monkeypatch.setattr(scraper_module, "get_session", lambda: SimpleNamespace(get=fake_get))
+    monkeypatch.setattr(scraper_module, "extract_text", lambda url, html: extracted.append(html) or "text")
+    scraper = Scraper(processes=0, cache=None)
+    assert scraper.scrape("https://a/1").content == "text"
+    assert len(requests) == 2 and requests[1]["Cache-Control"] == "no-cache"
+
+    gone = scraper.scrape("https://a/gone")
+    assert gone.content is None and gone.error == "304 Not Modified without a cached copy"
+    assert extracted == ["<html></html>"]
+
+
+def test_oversized_pages_fail(monkeypatch):
+    def fake_get(url, headers, timeout, stream):
+        return SimpleNamespace(status_code=200, headers={}, iter_content=lambda size: [b"x" * 600] * 2, close=lambda: None, raise_for_status=lambda: None)
+
+    monkeypatch.setattr(scraper_module, "get_session", lambda: SimpleNamespace(get=fake_get))
+    result = Scraper(max_bytes=1000, processes=0, cache=None).scrape("https://a")
+    assert result.content is None and "larger than 1000 bytes" in result.error
+
+
+def test_scrape_node_records_errors_and_progress(monkeypatch):
+    events = []
+    results = {
+        "https://a": scraper_module.ScrapeResult("https://a", "text"),
+        "https://b": scraper_module.ScrapeResult("https://b", None, "HTTPError: 403"),
+    }
+    monkeypatch.setattr(tools, "get_stream_writer", lambda: events.append)
+    monkeypatch.setattr(tools, "scraper", SimpleNamespace(scrape_stream=lambda urls, deadline=None: (results[u] for u in urls)))
+    state = tools.scrape_content_node({"news": [{"url": "https://a"}, {"url": "https://b"}]})
+
+    assert [n["scrape_error"] for n in state["news"]] == [None, "HTTPError: 403"]
+    assert state["scrape_stats"]["failed"] == 1 and state["scrape_stats"]["errors"] == {"https://b": "HTTPError: 403"}
+    assert [e["scrape_progress"]["done"] for e in events] == [1, 2]
+
+
+def test_scrape_past_deadline_is_skipped_without_a_request(monkeypatch):
+    def fake_get(url, **kwargs):
+        raise AssertionError("no request expected past the deadline")
+
+    monkeypatch.setattr(scraper_module, "get_session", lambda: SimpleNamespace(get=fake_get))
+    result = Scraper(processes=0, cache=None).scrape("https://a", deadline=time.time() - 1)
+    assert result.skipped and result.content is None
@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+
+import agents.tools as tools
+from services.article_store import ArticleStore
+from services.summary_cache import SummaryCache
+
+
+class FakeStreamingLLM:
+    """Streams a fixed summary word by word for any prompt."""
+
+    model_name = "fake-model"
+
+    def __init__(self):
+        self.calls = 0
+
+    def stream(self, prompt):
+        self.calls += 1
+        article = prompt[-1]["content"].rsplit("\n", 1)[-1]
+        for word in f"Summary of {article}".split():
+            yield SimpleNamespace(content=word + " ")
+
+
+def scraped_state(news):
+    """State whose articles have their "content" stored as the scraped text."""
+    store = ArticleStore()
+    return {"news": [store.put(n, n["content"]) if n.get("content") else n for n in news], "article_store": store}
+
+
+def test_concurrent_summaries_keep_article_order(monkeypatch):
+    events = []
+    monkeypatch.setattr(tools, "get_stream_writer", lambda: events.append)
+    news = [
+        {"title": "A", "content": "alpha", "url": "https://a", "source": "A"},
+        {"title": "B", "content": None, "url": "https://b", "source": "B"},
+        {"title": "C", "content": "gamma", "url": "https://c", "source": "C"},
+    ]
+    state = tools.build_summarize_node(FakeStreamingLLM(), max_in_flight=3, cache=None)(scraped_state(news))
+
+    assert [n["summary"] for n in state["news"]] == [
+        "Summary of alpha ",
+        "Content not available for summary",
+        "Summary of gamma ",
+    ]
+    deltas = [e["summary_delta"] for e in events]
+    assert all(d["total"] == 3 for d in deltas)
+    assert sorted(d["idx"] for d in deltas if d["op"] == "done") == [0, 1, 2]
+    for idx in (0, 2):
+        ops = [d["op"] for d in deltas if d["idx"] == idx]
+        assert ops[0] == "start" and ops[-1] == "done"
+        streamed = "".join(d["text"] for d in deltas if d["idx"] == idx and d["op"] == "append")
+        assert state["news"][idx]["summary"].startswith(streamed)
+
+
+def test_token_appends_are_coalesced():
+    events = []
+    news = [{"title": "A", "content": "alpha", "url": "https://a", "source": "A"}]
+    progress = tools.SummaryProgress(news, events.append, max_fps=1)
+    for token in ["one ", "two ", "three "]:
+        progress.add_token(0, token)
+    progress.complete(0)
+
+    assert [e["summary_delta"]["op"] for e in events] == ["start", "append", "done"]
+    assert events[1]["summary_delta"]["text"] == "one "
+    assert events[-1]["summary_delta"]["text"] == "one two three "
+
+
+def test_cached_summary_skips_model(monkeypatch, tmp_path):
+    events = []
+    monkeypatch.setattr(tools, "get_stream_writer", lambda: events.append)
+    cache = SummaryCache(path=str(tmp_path / "summaries.sqlite"))
+    llm = FakeStreamingLLM()
+    node = tools.build_summarize_node(llm, max_in_flight=2, cache=cache)
+
+    node(scraped_state([{"title": "A", "content": "alpha", "url": "https://a", "source": "A"}]))
+    assert llm.calls == 1
+
+    state = node(scraped_state([{"title": "A2", "content": "alpha", "url": "https://a2", "source": "A"}]))
+    assert llm.calls == 1
+    assert state["news"][0]["summary"] == "Summary of alpha "
+    assert cache.stats()["hits"] == 1
+
+    llm.model_name = "other-model"
+    tools.build_summarize_node(llm, max_in_flight=2, cache=cache)(scraped_state([{"title": "A", "content": "alpha", "url": "https://a", "source": "A"}]))
+    assert llm.calls == 2